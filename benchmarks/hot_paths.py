@@ -0,0 +1,210 @@
+"""
+Benchmarks the access-check and retrieval hot paths fully offline.
+
+A synthetic corpus, users, roles and conditions are generated at the requested
+scale and embedded with the deterministic HashingEmbedder into a
+LocalVectorStore, so runs are reproducible and comparable across versions.
+Results are printed as JSON and optionally written to --output.
+
+    python benchmarks/hot_paths.py --entities 10000 --conditions 100 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from gatecraft import Gatecraft, SemanticCondition  # noqa: E402
+from gatecraft.core.policy import AccessControlPolicy  # noqa: E402
+from gatecraft.db.hashing_embedder import HashingEmbedder  # noqa: E402
+from gatecraft.db.local_vector_store import LocalVectorStore  # noqa: E402
+
+TOPICS = [
+    'cat', 'dog', 'bird', 'finance', 'health', 'sports', 'music', 'travel', 'cooking', 'law',
+    'weather', 'science', 'history', 'movies', 'gaming', 'fashion', 'politics', 'space', 'cars', 'art',
+]
+FILLER = ['the', 'a', 'with', 'about', 'report', 'guide', 'notes', 'summary', 'review', 'story']
+
+
+def generate_document(rng):
+    topics = rng.sample(TOPICS, k=2)
+    words = [rng.choice(topics) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(12)]
+    return ' '.join(words)
+
+
+def build(args):
+    rng = random.Random(args.seed)
+    embedder = HashingEmbedder(dimension=args.dimension, seed=args.seed)
+    vector_store = LocalVectorStore(
+        dimension=args.dimension,
+        embed_function=embedder.embed,
+        embedding_model=embedder.embedding_model
+    )
+    gc = Gatecraft(vector_store=vector_store, similarity_threshold=0.0)
+
+    roles = [gc.create_role(role_id, f"role {role_id}") for role_id in range(args.roles)]
+    for condition_id in range(args.conditions):
+        condition = SemanticCondition(
+            rng.choice(TOPICS),
+            threshold=rng.uniform(0.1, 0.4),
+            inverse=rng.random() < args.inverse_ratio
+        )
+        gc.add_condition_to_role(roles[condition_id % len(roles)], condition)
+
+    users = []
+    for user_id in range(args.users):
+        user = gc.create_user(user_id, f"user {user_id}")
+        for role in rng.sample(roles, k=min(args.roles_per_user, len(roles))):
+            gc.assign_role(user, role)
+        users.append(user)
+
+    documents = [generate_document(rng) for _ in range(args.entities)]
+    return gc, users, documents, rng
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        'p50_us': 1e6 * samples[len(samples) // 2],
+        'p99_us': 1e6 * samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        'mean_us': 1e6 * statistics.fmean(samples),
+        'samples': len(samples),
+    }
+
+
+def time_calls(func, calls):
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run(args):
+    if args.trace_memory:
+        tracemalloc.start()
+
+    gc, users, documents, rng = build(args)
+
+    start = time.perf_counter()
+    if args.bulk:
+        gc.add_entities(enumerate(documents))
+    else:
+        for entity_id, document in enumerate(documents):
+            gc.add_entity(entity_id, document)
+    ingest_seconds = time.perf_counter() - start
+
+    checks = [(rng.choice(users), rng.randrange(args.entities)) for _ in range(args.checks)]
+    queries = [(generate_document(rng), args.top_k) for _ in range(args.queries)]
+
+    # Warm up caches and lazily built state before timing
+    for user, entity_id in checks[:10]:
+        gc.is_access_allowed(user, entity_id)
+
+    indexed = time_calls(gc.is_access_allowed, checks)
+
+    # The same checks without the materialized access index
+    unindexed_policy = AccessControlPolicy(gc.semantic_db)
+    unindexed = time_calls(
+        lambda user, entity_id: unindexed_policy.is_access_allowed(user, gc.entities[entity_id]),
+        checks
+    )
+
+    batch = list(range(min(args.batch_size, args.entities)))
+    many = time_calls(gc.is_access_allowed_many, [(user, batch) for user in users[:args.queries]])
+
+    retrieve = time_calls(gc.retrieve_entities, queries)
+    retrieve_accessible = time_calls(
+        gc.retrieve_accessible_entities,
+        [(rng.choice(users), query, top_k) for query, top_k in queries]
+    )
+
+    results = {
+        'parameters': vars(args),
+        'environment': environment(),
+        'add_entity': {
+            'documents': args.entities,
+            'seconds': ingest_seconds,
+            'documents_per_second': args.entities / ingest_seconds if ingest_seconds else None,
+        },
+        'is_access_allowed': percentiles(indexed),
+        'is_access_allowed_unindexed': percentiles(unindexed),
+        'is_access_allowed_many': dict(percentiles(many), batch_size=len(batch)),
+        'retrieve_entities': percentiles(retrieve),
+        'retrieve_accessible_entities': percentiles(retrieve_accessible),
+        'embedding_cache': gc.semantic_db.cache_stats(),
+        'memory': memory(args.trace_memory),
+    }
+    return results
+
+
+def memory(traced):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024
+    report = {'max_rss_mb': max_rss / 1024}
+    if traced:
+        report['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return report
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entities', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--roles', type=int, default=10)
+    parser.add_argument('--roles-per-user', type=int, default=3)
+    parser.add_argument('--conditions', type=int, default=20)
+    parser.add_argument('--inverse-ratio', type=float, default=0.3)
+    parser.add_argument('--dimension', type=int, default=256)
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bulk', action='store_true', help='ingest with add_entities')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also report the tracemalloc peak (slows every benchmark down)')
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
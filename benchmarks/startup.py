@@ -0,0 +1,95 @@
+"""
+Measures the import time of gatecraft and the construction time of Gatecraft.
+
+Both are measured in fresh interpreters so that module caching doesn't hide
+regressions. Exits with status 1 when a budget given on the command line is
+exceeded or when a lazily imported backend module is loaded eagerly.
+
+    python benchmarks/startup.py --runs 10 --max-import-ms 300 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backends that must not be imported until they are used
+LAZY_MODULES = ('openai', 'pinecone', 'dotenv', 'aiohttp')
+
+IMPORT_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+import gatecraft
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+''' % (LAZY_MODULES,)
+
+CONSTRUCT_SNIPPET = '''
+import json, sys, time
+from gatecraft import Gatecraft
+from gatecraft.db.pinecone_vector_store import PineconeVectorStore
+from gatecraft.db.local_vector_store import LocalVectorStore
+start = time.perf_counter()
+Gatecraft(vector_store=LocalVectorStore(dimension=1536))
+local = time.perf_counter() - start
+start = time.perf_counter()
+Gatecraft(vector_store=PineconeVectorStore('key', 'us-east-1', 'index'))
+pinecone = time.perf_counter() - start
+print(json.dumps({'local_seconds': local, 'pinecone_seconds': pinecone,
+                  'loaded': [m for m in %r if m in sys.modules]}))
+''' % (LAZY_MODULES,)
+
+
+def run_snippet(snippet):
+    output = subprocess.run(
+        [sys.executable, '-c', snippet], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs):
+    imports = [run_snippet(IMPORT_SNIPPET) for _ in range(runs)]
+    constructions = [run_snippet(CONSTRUCT_SNIPPET) for _ in range(runs)]
+    return {
+        'runs': runs,
+        'import_ms_median': 1000 * statistics.median(r['seconds'] for r in imports),
+        'import_ms_min': 1000 * min(r['seconds'] for r in imports),
+        'construct_local_ms_median': 1000 * statistics.median(r['local_seconds'] for r in constructions),
+        'construct_pinecone_ms_median': 1000 * statistics.median(r['pinecone_seconds'] for r in constructions),
+        'eagerly_loaded': sorted(set(imports[0]['loaded']) | set(constructions[0]['loaded'])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float)
+    parser.add_argument('--max-construct-ms', type=float)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+
+    failures = []
+    if results['eagerly_loaded']:
+        failures.append(f"eagerly imported: {', '.join(results['eagerly_loaded'])}")
+    if args.max_import_ms is not None and results['import_ms_median'] > args.max_import_ms:
+        failures.append(f"import took {results['import_ms_median']:.1f} ms")
+    construct_ms = max(results['construct_local_ms_median'], results['construct_pinecone_ms_median'])
+    if args.max_construct_ms is not None and construct_ms > args.max_construct_ms:
+        failures.append(f"construction took {construct_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1,5 @@
 from .gatecraft import Gatecraft
 from .utils.semantic_condition import SemanticCondition
+from .utils.conditions import AndCondition, NotCondition, OrCondition
+from .utils.lexical_condition import KeywordCondition, RegexCondition
+from .utils.metadata_condition import MetadataCondition, OwnerCondition
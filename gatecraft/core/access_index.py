@@ -0,0 +1,169 @@
+import json
+
+import numpy as np
+
+
+class AccessIndex(metaclass=type):
+    """
+    Materialized condition verdicts over entities.
+
+    Every entity id is given a dense row number, and every condition (identified
+    by its index_key()) owns a column made of two bitsets over those rows: the
+    verdict bits and the bits telling which verdicts are known. Looking up a
+    verdict is a couple of bit operations and never touches embeddings.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.entity_ids = []
+        self.columns = {}
+        self._free_rows = []
+
+    def add_entity(self, entity_id):
+        """Returns the row of entity_id, allocating one if needed."""
+        row = self.rows.get(entity_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self.entity_ids[row] = entity_id
+            else:
+                row = len(self.entity_ids)
+                self.entity_ids.append(entity_id)
+            self.rows[entity_id] = row
+        return row
+
+    def remove_entity(self, entity_id):
+        row = self.rows.pop(entity_id, None)
+        if row is None:
+            return
+        for bits, known in self.columns.values():
+            _clear_bit(bits, row)
+            _clear_bit(known, row)
+        self.entity_ids[row] = None
+        self._free_rows.append(row)
+
+    def has_column(self, key):
+        return key in self.columns
+
+    def add_column(self, key):
+        if key not in self.columns:
+            self.columns[key] = (bytearray(), bytearray())
+
+    def discard_column(self, key):
+        self.columns.pop(key, None)
+
+    def set(self, key, entity_id, verdict):
+        bits, known = self.columns[key]
+        row = self.add_entity(entity_id)
+        _set_bit(known, row)
+        if verdict:
+            _set_bit(bits, row)
+        else:
+            _clear_bit(bits, row)
+
+    def forget(self, key, entity_id):
+        """Marks the verdict of a condition for an entity as unknown."""
+        row = self.rows.get(entity_id)
+        if row is not None and key in self.columns:
+            _clear_bit(self.columns[key][1], row)
+
+    def lookup(self, key, entity_id):
+        """Returns the stored verdict, or None if it isn't known."""
+        column = self.columns.get(key)
+        row = self.rows.get(entity_id)
+        if column is None or row is None or not _get_bit(column[1], row):
+            return None
+        return _get_bit(column[0], row)
+
+    def is_known(self, key, entity_id):
+        return self.lookup(key, entity_id) is not None
+
+    def verdict_matrix(self, keys, entity_ids):
+        """
+        Returns an entities x keys boolean matrix of verdicts, or None if any
+        of them is missing from the index.
+        """
+        if any(key is None for key in keys):
+            return None
+        rows = np.fromiter((self.rows.get(entity_id, -1) for entity_id in entity_ids),
+                           dtype=np.int64, count=len(entity_ids))
+        if (rows < 0).any():
+            return None
+        matrix = np.zeros((len(rows), len(keys)), dtype=bool)
+        for j, key in enumerate(keys):
+            column = self.columns.get(key)
+            if column is None or not _gather_bits(column[1], rows).all():
+                return None
+            matrix[:, j] = _gather_bits(column[0], rows)
+        return matrix
+
+    def save(self, path):
+        """Writes the index to an .npz file."""
+        n_bytes = (len(self.entity_ids) + 7) // 8
+        keys = list(self.columns)
+        bits = np.zeros((len(keys), n_bytes), dtype=np.uint8)
+        known = np.zeros((len(keys), n_bytes), dtype=np.uint8)
+        for j, key in enumerate(keys):
+            # Bitsets grow in doubling steps, so they may be longer than needed
+            column_bits, column_known = (bytes(bitset[:n_bytes]) for bitset in self.columns[key])
+            bits[j, :len(column_bits)] = np.frombuffer(column_bits, dtype=np.uint8)
+            known[j, :len(column_known)] = np.frombuffer(column_known, dtype=np.uint8)
+        header = json.dumps({'keys': keys, 'entity_ids': self.entity_ids})
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, header=np.array(header), bits=bits, known=known)
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save()."""
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            bits = data['bits']
+            known = data['known']
+        index.entity_ids = header['entity_ids']
+        for row, entity_id in enumerate(index.entity_ids):
+            if entity_id is None:
+                index._free_rows.append(row)
+            else:
+                index.rows[entity_id] = row
+        for j, key in enumerate(header['keys']):
+            index.columns[key_from_json(key)] = (bytearray(bits[j].tobytes()), bytearray(known[j].tobytes()))
+        return index
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def key_from_json(value):
+    """Turns an index key read back from JSON, whose (nested) tuples became lists, into a key."""
+    return tuple(key_from_json(item) for item in value) if isinstance(value, list) else value
+
+
+def _grow(bitset, row):
+    needed = (row >> 3) + 1
+    if len(bitset) < needed:
+        bitset.extend(bytes(max(needed - len(bitset), len(bitset))))
+
+
+def _set_bit(bitset, row):
+    _grow(bitset, row)
+    bitset[row >> 3] |= 1 << (row & 7)
+
+
+def _clear_bit(bitset, row):
+    if (row >> 3) < len(bitset):
+        bitset[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+
+def _get_bit(bitset, row):
+    return (row >> 3) < len(bitset) and bool(bitset[row >> 3] >> (row & 7) & 1)
+
+
+def _gather_bits(bitset, rows):
+    # Vectorized _get_bit over an array of rows
+    data = np.frombuffer(bytes(bitset), dtype=np.uint8)
+    byte_rows = rows >> 3
+    inside = byte_rows < len(data)
+    values = np.zeros(len(rows), dtype=bool)
+    values[inside] = (data[byte_rows[inside]] >> (rows[inside] & 7)) & 1
+    return values
@@ -0,0 +1,296 @@
+import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from gatecraft.core.compiled_policy import CompiledPolicy
+
+
+class AccessAuditResult(metaclass=type):
+    """
+    Sparse users x entities access matrix in coordinate form: allowed pair k
+    is (user_ids[user_rows[k]], entity_ids[entity_rows[k]]).
+    """
+
+    def __init__(self, user_ids, entity_ids, user_rows, entity_rows):
+        self.user_ids = user_ids
+        self.entity_ids = entity_ids
+        self.user_rows = user_rows
+        self.entity_rows = entity_rows
+
+    def __len__(self):
+        return len(self.user_rows)
+
+    def pairs(self):
+        """Yields the allowed (user_id, entity_id) pairs."""
+        for user_row, entity_row in zip(self.user_rows.tolist(), self.entity_rows.tolist()):
+            yield self.user_ids[user_row], self.entity_ids[entity_row]
+
+    def to_dense(self):
+        matrix = np.zeros((len(self.user_ids), len(self.entity_ids)), dtype=bool)
+        matrix[self.user_rows, self.entity_rows] = True
+        return matrix
+
+    def to_scipy(self):
+        from scipy.sparse import coo_matrix
+
+        data = np.ones(len(self.user_rows), dtype=bool)
+        shape = (len(self.user_ids), len(self.entity_ids))
+        return coo_matrix((data, (self.user_rows, self.entity_rows)), shape=shape).tocsr()
+
+    def to_csv(self, path):
+        with _CsvWriter(path) as writer:
+            writer.write(self.user_ids, self.entity_ids, self.user_rows, self.entity_rows)
+
+
+def audit_access(policy, users, entities, max_workers=None, shard_size=4096, output=None):
+    """
+    Computes which users can access which entities.
+
+    The conditions of every role involved are compiled once. Entity embeddings
+    are normalized into a float32 matrix in a memory-mapped scratch file that
+    worker processes map read-only, so each worker only receives the bounds of
+    its shard. Pairs whose similarity falls within the float32 error bound of a
+    threshold are settled in the parent with the exact similarity, so the
+    result matches is_access_allowed. If output is a .csv or .parquet path,
+    allowed pairs are streamed there as shards complete.
+    """
+    users = list(users)
+    entities = list(entities)
+    user_ids = [user.user_id for user in users]
+    entity_ids = [entity.entity_id for entity in entities]
+
+    roles = {}
+    for user in users:
+        for role in user.get_roles():
+            roles.setdefault(role.index, role)
+    roles = [roles[index] for index in sorted(roles)]
+    role_rows = {role.index: row for row, role in enumerate(roles)}
+    compiled = CompiledPolicy(roles, policy.database)
+    # Verdicts are computed once per entity for all users
+    if any(getattr(condition, 'user_dependent', False) for condition in compiled.conditions):
+        raise ValueError("audit_access can't evaluate conditions that depend on the user, like OwnerCondition.")
+
+    user_roles = np.zeros((len(users), len(roles)), dtype=np.int32)
+    for row, user in enumerate(users):
+        for role in user.get_roles():
+            user_roles[row, role_rows[role.index]] = 1
+    reduction = (compiled.regular, compiled.inverse, compiled.inverse_counts, user_roles)
+
+    writer = _open_writer(output) if output is not None else None
+    user_chunks = []
+    entity_chunks = []
+
+    def collect(entity_rows, user_rows):
+        if writer is not None:
+            writer.write(user_ids, entity_ids, user_rows, entity_rows)
+        user_chunks.append(user_rows)
+        entity_chunks.append(entity_rows)
+
+    try:
+        if not entities or not users or not compiled.conditions:
+            pass
+        elif _is_vectorizable(compiled, policy.database, entities) and len(entities) > shard_size:
+            _audit_in_workers(compiled, policy.database, entities, reduction,
+                              max_workers, shard_size, collect)
+        else:
+            for start in range(0, len(entities), shard_size):
+                shard = entities[start:start + shard_size]
+                allowed = _allowed(compiled.verdict_matrix(None, shard), *reduction)
+                entity_rows, user_rows = np.nonzero(allowed)
+                collect((entity_rows + start).astype(np.int32), user_rows.astype(np.int32))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    user_rows = np.concatenate(user_chunks) if user_chunks else np.zeros(0, dtype=np.int32)
+    entity_rows = np.concatenate(entity_chunks) if entity_chunks else np.zeros(0, dtype=np.int32)
+    order = np.lexsort((entity_rows, user_rows))
+    return AccessAuditResult(user_ids, entity_ids, user_rows[order], entity_rows[order])
+
+
+def _is_vectorizable(compiled, database, entities):
+    if not compiled.semantic_columns:
+        return True
+    if compiled.term_matrix is None:
+        return False
+    dimension = compiled.term_matrix.shape[1]
+    return all(np.shape(embedding) == (dimension,)
+               for embedding in database.get_embeddings([entities[0].data]))
+
+
+def _audit_in_workers(compiled, database, entities, reduction, max_workers, shard_size, collect):
+    scratch = tempfile.mkdtemp(prefix='gatecraft-audit-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        dimension = compiled.term_matrix.shape[1] if compiled.term_matrix is not None else 0
+        embeddings_path = os.path.join(scratch, 'embeddings.f32')
+        embeddings = np.memmap(embeddings_path, dtype=np.float32, mode='w+',
+                               shape=(len(entities), max(dimension, 1)))
+        zero_norm = np.zeros(len(entities), dtype=bool)
+
+        # Verdicts of conditions that can't be vectorized are computed here
+        other_path = os.path.join(scratch, 'other.bool')
+        others = np.memmap(other_path, dtype=bool, mode='w+',
+                           shape=(len(entities), max(len(compiled.other_columns), 1)))
+
+        for start in range(0, len(entities), shard_size):
+            shard = entities[start:start + shard_size]
+            if dimension:
+                stacked = np.stack(database.get_embeddings([entity.data for entity in shard])).astype(np.float64)
+                norms = np.linalg.norm(stacked, axis=1)
+                zero_norm[start:start + len(shard)] = norms == 0
+                safe_norms = np.where(norms == 0, 1.0, norms)
+                embeddings[start:start + len(shard)] = stacked / safe_norms[:, None]
+            for k, column in enumerate(compiled.other_columns):
+                condition = compiled.conditions[column]
+                others[start:start + len(shard), k] = [
+                    condition.evaluate(None, entity, database) for entity in shard
+                ]
+        embeddings.flush()
+        others.flush()
+        del embeddings, others
+
+        terms = None
+        if dimension:
+            terms = (compiled.term_matrix, compiled.thresholds, compiled.term_inverse,
+                     compiled.tolerance, bool((compiled.term_norms == 0).any()))
+        state = {
+            'embeddings': (embeddings_path, (len(entities), max(dimension, 1))),
+            'others': (other_path, (len(entities), max(len(compiled.other_columns), 1))),
+            'zero_norm': zero_norm,
+            'terms': terms,
+            'n_conditions': len(compiled.conditions),
+            'semantic_columns': compiled.semantic_columns,
+            'other_columns': compiled.other_columns,
+            'reduction': reduction,
+        }
+
+        uncertain = []
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(state,)) as executor:
+            futures = [
+                executor.submit(_audit_shard, start, min(start + shard_size, len(entities)))
+                for start in range(0, len(entities), shard_size)
+            ]
+            for future in as_completed(futures):
+                entity_rows, user_rows, shard_uncertain = future.result()
+                collect(entity_rows, user_rows)
+                uncertain.extend(shard_uncertain)
+
+        # Borderline entities are decided with the exact similarity
+        if uncertain:
+            uncertain.sort()
+            shard = [entities[row] for row in uncertain]
+            allowed = _allowed(compiled.verdict_matrix(None, shard), *reduction)
+            rows, user_rows = np.nonzero(allowed)
+            collect(np.array(uncertain, dtype=np.int32)[rows], user_rows.astype(np.int32))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+_worker_state = {}
+
+
+def _init_worker(state):
+    path, shape = state['embeddings']
+    state['embeddings'] = np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+    path, shape = state['others']
+    state['others'] = np.memmap(path, dtype=bool, mode='r', shape=shape)
+    _worker_state.update(state)
+
+
+def _audit_shard(start, stop):
+    state = _worker_state
+    verdicts = np.zeros((stop - start, state['n_conditions']), dtype=bool)
+    uncertain = np.zeros(stop - start, dtype=bool)
+
+    if state['terms'] is not None:
+        term_matrix, thresholds, term_inverse, tolerance, zero_terms = state['terms']
+        similarities = (state['embeddings'][start:stop] @ term_matrix.T).astype(np.float64)
+        verdicts[:, state['semantic_columns']] = np.where(
+            term_inverse, similarities < thresholds, similarities >= thresholds
+        )
+        uncertain |= (np.abs(similarities - thresholds) <= tolerance).any(axis=1)
+        uncertain |= (~np.isfinite(similarities)).any(axis=1)
+        uncertain |= state['zero_norm'][start:stop]
+        uncertain |= zero_terms
+    if state['other_columns']:
+        verdicts[:, state['other_columns']] = state['others'][start:stop, :len(state['other_columns'])]
+
+    allowed = _allowed(verdicts, *state['reduction'])
+    allowed[uncertain] = False
+    entity_rows, user_rows = np.nonzero(allowed)
+    return ((entity_rows + start).astype(np.int32), user_rows.astype(np.int32),
+            (np.nonzero(uncertain)[0] + start).tolist())
+
+
+def _allowed(verdicts, regular, inverse, inverse_counts, user_roles):
+    # Same any-regular / all-inverse reduction as CompiledPolicy.evaluate,
+    # followed by any-role per user
+    matched = verdicts.astype(np.int32)
+    role_ok = (matched @ regular.T > 0) | ((matched @ inverse.T == inverse_counts) & (inverse_counts > 0))
+    return role_ok.astype(np.int32) @ user_roles.T > 0
+
+
+def _open_writer(path):
+    if str(path).endswith('.parquet'):
+        return _ParquetWriter(path)
+    return _CsvWriter(path)
+
+
+class _CsvWriter(metaclass=type):
+
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['user_id', 'entity_id'])
+
+    def write(self, user_ids, entity_ids, user_rows, entity_rows):
+        self._writer.writerows(
+            (user_ids[u], entity_ids[e]) for u, e in zip(user_rows.tolist(), entity_rows.tolist())
+        )
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ParquetWriter(metaclass=type):
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet audit results requires pyarrow.")
+        self._pyarrow = pyarrow
+        self._path = path
+        self._writer = None
+
+    def write(self, user_ids, entity_ids, user_rows, entity_rows):
+        pa = self._pyarrow
+        table = pa.table({
+            'user_id': [user_ids[u] for u in user_rows.tolist()],
+            'entity_id': [entity_ids[e] for e in entity_rows.tolist()],
+        })
+        if self._writer is None:
+            self._writer = pa.parquet.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,149 @@
+import numpy as np
+
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class CompiledPolicy(metaclass=type):
+    """
+    Matrix form of the conditions of a set of roles.
+
+    The terms of all SemanticConditions are stacked into a normalized float32
+    term matrix with per-row thresholds, so that a batch of entities is checked
+    with a single entities x terms matmul. Similarities that land within the
+    float32 rounding error of a threshold are re-checked with the database's
+    own similarity, which keeps every verdict identical to
+    AccessControlPolicy.is_access_allowed. Subclasses of SemanticCondition
+    that override evaluate or decide are evaluated one by one. roles are
+    Role objects or plain lists of conditions.
+    """
+
+    def __init__(self, roles, database):
+        self.database = database
+        self.conditions = []
+        positions = {}
+        role_columns = []
+
+        for role in roles:
+            regular = []
+            inverse = []
+            conditions = role.get_conditions() if hasattr(role, 'get_conditions') else role
+            for condition in conditions:
+                if id(condition) not in positions:
+                    positions[id(condition)] = len(self.conditions)
+                    self.conditions.append(condition)
+                column = positions[id(condition)]
+                (inverse if condition.inverse else regular).append(column)
+            role_columns.append((regular, inverse))
+
+        # Role membership as counts, so a condition repeated in a role still
+        # has to match once per occurrence like in the scalar loop
+        n_roles, n_conditions = len(role_columns), len(self.conditions)
+        self.regular = np.zeros((n_roles, n_conditions), dtype=np.int32)
+        self.inverse = np.zeros((n_roles, n_conditions), dtype=np.int32)
+        for row, (regular, inverse) in enumerate(role_columns):
+            np.add.at(self.regular[row], regular, 1)
+            np.add.at(self.inverse[row], inverse, 1)
+        self.inverse_counts = self.inverse.sum(axis=1)
+
+        self.semantic_columns = [
+            column for column, condition in enumerate(self.conditions)
+            if _vectorizable(condition)
+        ]
+        semantic = set(self.semantic_columns)
+        self.other_columns = [column for column in range(n_conditions) if column not in semantic]
+        self._compile_terms()
+
+    def _compile_terms(self):
+        self.term_matrix = None
+        self.term_embeddings = []
+        for column in self.semantic_columns:
+            condition = self.conditions[column]
+            if condition.term_embedding is None:
+                condition.term_embedding = self.database.get_embedding(condition.term)
+            self.term_embeddings.append(np.asarray(condition.term_embedding))
+
+        if not self.term_embeddings or len({e.shape for e in self.term_embeddings}) != 1:
+            return
+
+        terms = np.stack(self.term_embeddings).astype(np.float64)
+        self.term_norms = np.linalg.norm(terms, axis=1)
+        safe_norms = np.where(self.term_norms == 0, 1.0, self.term_norms)
+        self.term_matrix = (terms / safe_norms[:, None]).astype(np.float32)
+        self.thresholds = np.array(
+            [self.conditions[column].threshold for column in self.semantic_columns],
+            dtype=np.float64
+        )
+        self.term_inverse = np.array(
+            [self.conditions[column].inverse for column in self.semantic_columns],
+            dtype=bool
+        )
+        # Bound on the float32 dot product error of two unit vectors
+        self.tolerance = (self.term_matrix.shape[1] + 8) * float(np.finfo(np.float32).eps)
+
+    def evaluate(self, user, entities, verdicts=None):
+        """
+        Returns one access verdict per entity. verdicts, if given, is a
+        precomputed entities x conditions matrix from verdict_matrix().
+        """
+        entities = list(entities)
+        if not entities or not self.conditions:
+            return [False] * len(entities)
+        if verdicts is None:
+            verdicts = self.verdict_matrix(user, entities)
+
+        # Any regular condition of a role, or all of its inverse conditions
+        matched = verdicts.astype(np.int32)
+        regular_ok = matched @ self.regular.T > 0
+        inverse_ok = (matched @ self.inverse.T == self.inverse_counts) & (self.inverse_counts > 0)
+        return (regular_ok | inverse_ok).any(axis=1).tolist()
+
+    def verdict_matrix(self, user, entities):
+        """
+        Returns the entities x conditions matrix of condition verdicts.
+        """
+        verdicts = np.zeros((len(entities), len(self.conditions)), dtype=bool)
+        if self.semantic_columns:
+            verdicts[:, self.semantic_columns] = self._semantic_verdicts(entities)
+        for column in self.other_columns:
+            condition = self.conditions[column]
+            verdicts[:, column] = [condition.evaluate(user, entity, self.database) for entity in entities]
+        return verdicts
+
+    def _semantic_verdicts(self, entities):
+        entity_embeddings = self.database.get_embeddings([entity.data for entity in entities])
+        shapes = {np.shape(e) for e in entity_embeddings}
+        if self.term_matrix is None or shapes != {self.term_matrix.shape[1:]}:
+            # Variable-length embeddings can't be stacked: use the scalar path
+            return np.array([
+                [self._exact_verdict(k, embedding) for k in range(len(self.semantic_columns))]
+                for embedding in entity_embeddings
+            ], dtype=bool).reshape(len(entities), len(self.semantic_columns))
+
+        stacked = np.stack(entity_embeddings).astype(np.float64)
+        entity_norms = np.linalg.norm(stacked, axis=1)
+        safe_norms = np.where(entity_norms == 0, 1.0, entity_norms)
+        normalized = (stacked / safe_norms[:, None]).astype(np.float32)
+        similarities = (normalized @ self.term_matrix.T).astype(np.float64)
+
+        # SemanticCondition.decide over the whole matrix
+        verdicts = np.where(self.term_inverse, similarities < self.thresholds,
+                            similarities >= self.thresholds)
+
+        # Re-check borderline and degenerate pairs with the exact similarity
+        uncertain = np.abs(similarities - self.thresholds) <= self.tolerance
+        uncertain |= ~np.isfinite(similarities)
+        uncertain[entity_norms == 0, :] = True
+        uncertain[:, self.term_norms == 0] = True
+        for row, k in zip(*np.nonzero(uncertain)):
+            verdicts[row, k] = self._exact_verdict(k, entity_embeddings[row])
+        return verdicts
+
+    def _exact_verdict(self, k, entity_embedding):
+        condition = self.conditions[self.semantic_columns[k]]
+        similarity = self.database.compute_similarity(condition.term_embedding, entity_embedding)
+        return condition.decide(similarity)
+
+
+def _vectorizable(condition):
+    return (isinstance(condition, SemanticCondition) and condition.similarity_based
+            and type(condition).decide is SemanticCondition.decide)
@@ -3,8 +3,27 @@ class Entity(metaclass=type):
     Represents a data entity in the system.
     """
 
+    __slots__ = ('entity_id', 'data', '_metadata')
+
     def __init__(self, entity_id, data, metadata=None):
         self.entity_id = entity_id
         self.data = data
-        self.metadata = metadata if metadata else {} 
-        
\ No newline at end of file
+        # A plain dict of its own, even when built from read-only metadata
+        self._metadata = dict(metadata) if metadata else None
+
+    @property
+    def metadata(self):
+        # The metadata dict is only allocated when it is used
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata if metadata else None
+
+    @property
+    def metadata_or_none(self):
+        """The metadata, or None when the entity has none, without allocating."""
+        return self._metadata or None
+        
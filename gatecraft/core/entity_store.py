@@ -0,0 +1,172 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections.abc import MutableMapping
+from types import MappingProxyType
+
+from gatecraft.core.entity import Entity
+
+HASH_SIZE = 16
+
+_NO_METADATA = MappingProxyType({})
+
+
+def content_hash(data):
+    """Digest of an entity text, used to detect changed content."""
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=HASH_SIZE).digest()
+
+
+class EntityStore(MutableMapping):
+    """
+    Columnar mapping of entity ids to entities.
+
+    Every entity id gets a dense row number; texts are kept in a list indexed
+    by row (or offloaded to a text_store), and metadata only for the rows that
+    have any. Entity objects are built on access, so only the columns stay
+    resident. Every write gives the entity a new version number, which lets
+    caches detect re-added entities, and records a hash of its text.
+
+    The entities it returns are detached copies with read-only metadata;
+    metadata is changed by storing the entity again (add_entity or
+    upsert_entities), which also bumps its version.
+    """
+
+    def __init__(self, text_store=None):
+        self.text_store = text_store
+        self._rows = {}
+        self._ids = []
+        self._texts = []
+        self._metadata = {}
+        self._free_rows = []
+        self._versions = array('Q')
+        self._last_version = 0
+        self._hashes = bytearray()
+
+    def row(self, entity_id):
+        """Returns the dense row number of entity_id."""
+        return self._rows[entity_id]
+
+    def entity_id(self, row):
+        return self._ids[row]
+
+    def version(self, entity_id):
+        return self._versions[self._rows[entity_id]]
+
+    def text_hash(self, entity_id):
+        """Returns the content_hash() of the stored text of entity_id."""
+        start = self._rows[entity_id] * HASH_SIZE
+        return bytes(self._hashes[start:start + HASH_SIZE])
+
+    def metadata(self, entity_id):
+        """Returns the metadata of entity_id (None if it has none) without loading its text."""
+        metadata = self._metadata.get(self._rows[entity_id])
+        return None if metadata is None else MappingProxyType(metadata)
+
+    def __getitem__(self, entity_id):
+        row = self._rows[entity_id]
+        if self.text_store is not None:
+            data = self.text_store.get(row)
+        else:
+            data = self._texts[row]
+        entity = Entity(entity_id, data)
+        metadata = self._metadata.get(row)
+        entity._metadata = _NO_METADATA if metadata is None else MappingProxyType(metadata)
+        return entity
+
+    def __setitem__(self, entity_id, entity):
+        row = self._rows.get(entity_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._ids[row] = entity_id
+            else:
+                row = len(self._ids)
+                self._ids.append(entity_id)
+                self._texts.append(None)
+                self._versions.append(0)
+                self._hashes.extend(bytes(HASH_SIZE))
+            self._rows[entity_id] = row
+
+        self._last_version += 1
+        self._versions[row] = self._last_version
+        self._hashes[row * HASH_SIZE:(row + 1) * HASH_SIZE] = content_hash(entity.data)
+
+        if self.text_store is not None:
+            self.text_store.put(row, entity.data)
+        else:
+            self._texts[row] = entity.data
+
+        metadata = entity.metadata_or_none
+        if metadata:
+            # A copy, so later changes to the caller's dict need another write
+            self._metadata[row] = dict(metadata)
+        else:
+            self._metadata.pop(row, None)
+
+    def __delitem__(self, entity_id):
+        row = self._rows.pop(entity_id)
+        if self.text_store is not None:
+            self.text_store.delete(row)
+        self._texts[row] = None
+        self._ids[row] = None
+        self._metadata.pop(row, None)
+        self._free_rows.append(row)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class SqliteTextStore(metaclass=type):
+    """
+    Keeps entity texts in a sqlite file, keyed by entity row. Writes are
+    committed every commit_every changes and on flush() / close().
+    """
+
+    def __init__(self, path, commit_every=1000):
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS texts (row INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+        self._connection.commit()
+
+    def get(self, row):
+        with self._lock:
+            result = self._connection.execute('SELECT data FROM texts WHERE row = ?', (row,)).fetchone()
+        if result is None:
+            raise KeyError(row)
+        return result[0]
+
+    def put(self, row, data):
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO texts (row, data) VALUES (?, ?)', (row, data))
+            self._changed()
+
+    def delete(self, row):
+        with self._lock:
+            self._connection.execute('DELETE FROM texts WHERE row = ?', (row,))
+            self._changed()
+
+    def flush(self):
+        with self._lock:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+
+    def _changed(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._connection.commit()
+            self._uncommitted = 0
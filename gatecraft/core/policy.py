@@ -1,6 +1,13 @@
+from collections import OrderedDict
+
 from gatecraft.core.user import User
+from gatecraft.core.role import Role
 from gatecraft.core.entity import Entity
 from gatecraft.db.semantic_database import SemanticDatabase
+from gatecraft.core.compiled_policy import CompiledPolicy
+from gatecraft.core.access_index import AccessIndex
+from gatecraft.core.policy_plan import PolicyPlan
+from gatecraft.utils.instrumentation import instrumented
 
 
 class AccessControlPolicy:
@@ -8,37 +15,115 @@ class AccessControlPolicy:
     Implements the access control policy logic.
     """
 
-    def __init__(self, database):
+    def __init__(self, database, access_index=None, max_plans=1024):
         self.database = database
+        self.access_index = access_index if access_index is not None else AccessIndex()
+        self.indexed_conditions = {}
+        self.max_plans = max_plans
+        self._plans = OrderedDict()
+        self._compiled = OrderedDict()
 
+    @instrumented('policy.is_access_allowed')
     def is_access_allowed(self, user, entity):
         """
         Determines if a user has access to an entity.
-        Returns True if:
+        Returns True if, for at least one role:
         1. At least one regular condition matches OR
         2. All inverse conditions match
         """
-        for role in user.get_roles():
-            regular_conditions = []
-            inverse_conditions = []
-            
-            # Separate regular and inverse conditions
-            for condition in role.get_conditions():
-                if condition.inverse:
-                    inverse_conditions.append(condition)
-                else:
-                    regular_conditions.append(condition)
-            
-            # If there are regular conditions, at least one must match
-            if regular_conditions:
-                for condition in regular_conditions:
-                    if condition.evaluate(user, entity, self.database):
-                        return True
-            
-            # If there are inverse conditions, all must match
-            if inverse_conditions:
-                if all(condition.evaluate(user, entity, self.database) 
-                      for condition in inverse_conditions):
-                    return True
-                    
-        return False
+        return self.plan(user).evaluate(user, entity, self)
+
+    def plan(self, user):
+        """
+        Returns the evaluation plan of the user's role configuration. Plans are
+        cached per role set and rebuilt when any role's conditions change.
+        """
+        return self._cached(self._plans, user, lambda: PolicyPlan(user.get_roles()))
+
+    def is_materialized(self, condition, entity):
+        """
+        Tells whether the verdict of condition for entity is in the access index.
+        """
+        key = condition.index_key()
+        return key is not None and self.access_index.is_known(key, entity.entity_id)
+
+    def compile(self, user):
+        """
+        Compiles the conditions of the user's roles into a CompiledPolicy,
+        cached per role set like plan().
+        """
+        return self._cached(self._compiled, user, lambda: CompiledPolicy(user.get_roles(), self.database))
+
+    def _cached(self, cache, user, build):
+        # LRU cache keyed by role set, invalidated by the registry epoch
+        registry = user.registry
+        epoch = registry.epoch if registry is not None else 0
+        cached = cache.get(user.role_bits)
+        if cached is not None and cached[0] is registry and cached[1] == epoch:
+            cache.move_to_end(user.role_bits)
+            return cached[2]
+
+        value = build()
+        cache[user.role_bits] = (registry, epoch, value)
+        if len(cache) > self.max_plans:
+            cache.popitem(last=False)
+        return value
+
+    def is_access_allowed_many(self, user, entities):
+        """
+        Determines access to many entities at once with the same semantics
+        as is_access_allowed. Returns one boolean per entity.
+        """
+        entities = list(entities)
+        compiled = self.compile(user)
+        verdicts = self.access_index.verdict_matrix(
+            [condition.index_key() for condition in compiled.conditions],
+            [entity.entity_id for entity in entities]
+        )
+        return compiled.evaluate(user, entities, verdicts)
+
+    def index_condition(self, condition, entities):
+        """
+        Materializes the verdicts of a condition for the given entities and
+        keeps the condition to index entities added later.
+        """
+        key = condition.index_key()
+        if key is None:
+            return
+        self.indexed_conditions.setdefault(key, condition)
+        self.access_index.add_column(key)
+
+        missing = [entity for entity in entities if not self.access_index.is_known(key, entity.entity_id)]
+        if missing:
+            verdicts = self._verdict_matrix([condition], missing)
+            for entity, verdict in zip(missing, verdicts[:, 0]):
+                self.access_index.set(key, entity.entity_id, verdict)
+
+    def index_entities(self, entities):
+        """
+        Materializes the verdicts of every indexed condition for the given
+        entities, replacing whatever was stored for them before.
+        """
+        entities = list(entities)
+        for entity in entities:
+            self.access_index.add_entity(entity.entity_id)
+            # Columns without a live condition can't be refreshed
+            for key in self.access_index.columns:
+                if key not in self.indexed_conditions:
+                    self.access_index.forget(key, entity.entity_id)
+
+        if not entities or not self.indexed_conditions:
+            return
+        keys = list(self.indexed_conditions)
+        verdicts = self._verdict_matrix([self.indexed_conditions[key] for key in keys], entities)
+        for j, key in enumerate(keys):
+            for i, entity in enumerate(entities):
+                self.access_index.set(key, entity.entity_id, verdicts[i, j])
+
+    def remove_entity(self, entity_id):
+        self.access_index.remove_entity(entity_id)
+
+    def _verdict_matrix(self, conditions, entities):
+        # A single condition list is enough to reuse the compiled evaluation;
+        # creating a Role here would bump the role versions on every ingest
+        return CompiledPolicy([list(conditions)], self.database).verdict_matrix(None, entities)
@@ -0,0 +1,112 @@
+from gatecraft.utils.conditions import _cost
+from gatecraft.utils.instrumentation import count, span
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class PolicyPlan(metaclass=type):
+    """
+    Evaluation plan for one configuration of roles.
+
+    Conditions are deduplicated (by index_key(), or by identity when a
+    condition has none) and roles with identical condition sets are merged.
+    Roles and conditions are ordered by estimated cost so the verdict is
+    usually decided by the cheapest checks, and during one evaluation every
+    condition is decided at most once and every distinct term is compared
+    with the entity at most once. Conditions of cost 0 (metadata, keyword
+    and regex checks) of all roles are tried before any embedding is needed.
+    """
+
+    def __init__(self, roles):
+        self.conditions = {}
+        role_sets = {}
+        for role in roles:
+            regular = frozenset(self._add(c) for c in role.get_conditions() if not c.inverse)
+            inverse = frozenset(self._add(c) for c in role.get_conditions() if c.inverse)
+            # A role without conditions can never grant access
+            if regular or inverse:
+                role_sets.setdefault((regular, inverse), None)
+
+        self.costs = costs = {key: _cost(condition) for key, condition in self.conditions.items()}
+        self.roles = sorted(
+            (
+                (sorted(regular, key=costs.get), sorted(inverse, key=costs.get))
+                for regular, inverse in role_sets
+            ),
+            # Roles that can grant access with one cheap regular check go first
+            key=lambda role: min((costs[key] for key in role[0]), default=float('inf'))
+            if role[0] else max(costs[key] for key in role[1])
+        )
+
+    def _add(self, condition):
+        key = condition.index_key()
+        if key is None:
+            key = ('object', id(condition))
+        self.conditions.setdefault(key, condition)
+        return key
+
+    def evaluate(self, user, entity, policy):
+        """
+        Returns True if any role grants access: one of its regular conditions
+        matches, or it has inverse conditions and all of them match.
+        """
+        evaluation = _Evaluation(self, user, entity, policy)
+        costs = self.costs
+        # The first pass only decides what cheap conditions can decide;
+        # verdicts are memoized, so the second pass doesn't repeat them
+        for limit in (0, float('inf')):
+            for regular, inverse in self.roles:
+                for key in regular:
+                    if costs[key] <= limit and evaluation.verdict(key):
+                        return True
+                if inverse and costs[inverse[-1]] <= limit and all(evaluation.verdict(key) for key in inverse):
+                    return True
+        return False
+
+
+class _Evaluation(metaclass=type):
+    """
+    Memoized verdicts of one plan for one entity.
+    """
+
+    def __init__(self, plan, user, entity, policy):
+        self.plan = plan
+        self.user = user
+        self.entity = entity
+        self.policy = policy
+        self.verdicts = {}
+        self.similarities = {}
+        self.entity_embedding = None
+
+    def verdict(self, key):
+        verdict = self.verdicts.get(key)
+        if verdict is None:
+            verdict = self._decide(key)
+            self.verdicts[key] = verdict
+        return verdict
+
+    def _decide(self, key):
+        # Materialized verdicts are served from the access index
+        if key[0] != 'object':
+            verdict = self.policy.access_index.lookup(key, self.entity.entity_id)
+            if verdict is not None:
+                count('access_index.hits')
+                return verdict
+
+        condition = self.plan.conditions[key]
+        if not isinstance(condition, SemanticCondition) or not condition.similarity_based:
+            return condition.evaluate(self.user, self.entity, self.policy.database)
+
+        with span('condition.evaluate'):
+            return self._semantic_verdict(condition)
+
+    def _semantic_verdict(self, condition):
+        similarity = self.similarities.get(condition.term)
+        if similarity is None:
+            database = self.policy.database
+            if condition.term_embedding is None:
+                condition.term_embedding = database.get_embedding(condition.term)
+            if self.entity_embedding is None:
+                self.entity_embedding = database.get_embedding(self.entity.data)
+            similarity = database.compute_similarity(condition.term_embedding, self.entity_embedding)
+            self.similarities[condition.term] = similarity
+        return condition.decide(similarity)
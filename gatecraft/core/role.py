@@ -1,18 +1,60 @@
+class RoleRegistry(metaclass=type):
+    """
+    Gives the roles of one Gatecraft dense integer indices, which lets users
+    keep their role membership as a bitset instead of a set of objects.
+    epoch is bumped whenever the conditions of any of its roles change, so
+    cached evaluation plans can be invalidated. Registries are independent,
+    so separate Gatecraft instances never share indices or epochs.
+    """
+
+    def __init__(self):
+        self.roles = []
+        self.epoch = 0
+
+    def register(self, role):
+        """Gives role the next index of this registry."""
+        if role.registry is not None:
+            raise ValueError(f"Role {role.name} is already registered.")
+        role.registry = self
+        role.index = len(self.roles)
+        self.roles.append(role)
+        return role.index
+
+    def __getitem__(self, index):
+        return self.roles[index]
+
+    def __len__(self):
+        return len(self.roles)
 
 
 class Role(metaclass=type):
     """
     Represents a role assigned to users.
+
+    Roles created by a Gatecraft are registered in its RoleRegistry. Roles
+    created directly stay unregistered until they are first given to a user,
+    who registers them in its own registry. version only counts the
+    condition changes of this role.
     """
 
-    def __init__(self, role_id, name):
+    __slots__ = ('role_id', 'name', 'conditions', 'index', 'version', 'registry')
+
+    def __init__(self, role_id, name, registry=None):
         self.role_id = role_id
         self.name = name
         self.conditions = []
+        self.version = 0
+        self.registry = None
+        self.index = None
+        if registry is not None:
+            registry.register(self)
 
     def add_condition(self, condition):
         self.conditions.append(condition)
+        self.version += 1
+        if self.registry is not None:
+            self.registry.epoch += 1
 
     def get_conditions(self):
-        return self.conditions 
-    
\ No newline at end of file
+        return self.conditions
+
@@ -0,0 +1,333 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from gatecraft.core.access_index import AccessIndex, key_from_json
+from gatecraft.core.entity import Entity
+from gatecraft.core.role import Role
+from gatecraft.core.user import User
+from gatecraft.utils.conditions import AndCondition, NotCondition, OrCondition
+from gatecraft.utils.lexical_condition import KeywordCondition, RegexCondition
+from gatecraft.utils.metadata_condition import MetadataCondition, OwnerCondition
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+MAGIC = b'GCSNAP01'
+# Blocks start on cache-line boundaries so they can be mapped as arrays
+ALIGNMENT = 64
+
+
+def save_snapshot(gatecraft, path, chunk_size=4096, reembed=False):
+    """
+    Writes users, roles, conditions, entities, embeddings and the access index
+    of a Gatecraft instance to a single file.
+
+    The file is a JSON header followed by aligned binary blocks: one float32
+    matrix holding the entity embeddings and then the condition term
+    embeddings, and the bitsets of the access index. Entity embeddings come
+    from the embedding cache or, once evicted from it, from the vector store.
+    Embeddings that neither has raise a ValueError unless reembed is set, as
+    re-embedding a corpus can mean millions of embedding calls.
+    """
+    database = gatecraft.semantic_db
+    entity_ids = list(gatecraft.entities)
+    entities = [gatecraft.entities[entity_id] for entity_id in entity_ids]
+
+    role_ids = {role.index: role_id for role_id, role in gatecraft.roles.items()}
+    conditions = []
+    positions = {}
+
+    def condition_position(condition):
+        if id(condition) not in positions:
+            # Parts of composite conditions come first so they can be decoded in order
+            for part in _parts(condition):
+                condition_position(part)
+            positions[id(condition)] = len(conditions)
+            conditions.append(condition)
+        return positions[id(condition)]
+
+    roles = [
+        {'role_id': role_id, 'name': role.name,
+         'conditions': [condition_position(condition) for condition in role.get_conditions()]}
+        for role_id, role in gatecraft.roles.items()
+    ]
+    users = []
+    for user in gatecraft.users.values():
+        unknown = [role.name for role in user.get_roles() if role.index not in role_ids]
+        if unknown:
+            raise ValueError(f"User {user.user_id} has roles that aren't registered: {unknown}.")
+        users.append({'user_id': user.user_id, 'name': user.name,
+                      'roles': [role_ids[index] for index in user.role_indices()]})
+    indexed = {
+        json.dumps(list(key)): condition_position(condition)
+        for key, condition in gatecraft.policy.indexed_conditions.items()
+    }
+
+    # Term embeddings are stored after the entity embeddings in the same block
+    terms = [condition for condition in conditions if isinstance(condition, SemanticCondition)]
+    term_rows = {}
+    for condition in terms:
+        if condition.term_embedding is None:
+            condition.term_embedding = database.get_embedding(condition.term)
+        term_rows[id(condition)] = len(entities) + len(term_rows)
+    samples = _entity_embeddings(gatecraft, entity_ids[:1], entities[:1], reembed)
+    samples += [condition.term_embedding for condition in terms[:1]]
+    dimension = len(samples[0]) if samples else 0
+
+    index = gatecraft.policy.access_index
+    n_bytes = (len(index.entity_ids) + 7) // 8
+    blocks = {}
+    offset = 0
+    for name, dtype, shape in (
+        ('vectors', 'float32', (len(entities) + len(terms), dimension)),
+        ('index_bits', 'uint8', (len(index.columns), n_bytes)),
+        ('index_known', 'uint8', (len(index.columns), n_bytes)),
+    ):
+        blocks[name] = {'offset': offset, 'dtype': dtype, 'shape': shape}
+        offset = _align(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+    header = json.dumps({
+        'embedding_model': database.embedding_model,
+        'dimension': dimension,
+        'users': users,
+        'roles': roles,
+        'conditions': [
+            _encode_condition(condition, term_rows.get(id(condition)), positions) for condition in conditions
+        ],
+        'indexed_conditions': indexed,
+        'entities': {
+            'ids': entity_ids,
+            'texts': [entity.data for entity in entities],
+            'metadata': [
+                [row, dict(entity.metadata_or_none)] for row, entity in enumerate(entities) if entity.metadata_or_none
+            ],
+            'tenants': [
+                [row, gatecraft._entity_tenants[entity_id]] for row, entity_id in enumerate(entity_ids)
+                if entity_id in gatecraft._entity_tenants
+            ],
+        },
+        'access_index': {'keys': list(index.columns), 'entity_ids': index.entity_ids},
+        'blocks': blocks,
+    }).encode('utf-8')
+
+    # Write to a temporary file so a failed save never leaves a truncated snapshot
+    partial = f"{path}.tmp"
+    try:
+        with open(partial, 'wb') as f:
+            f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            data_start = _align(f.tell())
+            _pad(f, data_start)
+
+            for start in range(0, len(entities), chunk_size):
+                chunk = _entity_embeddings(gatecraft, entity_ids[start:start + chunk_size],
+                                           entities[start:start + chunk_size], reembed)
+                f.write(_stack(chunk, dimension).tobytes())
+            f.write(_stack([condition.term_embedding for condition in terms], dimension).tobytes())
+
+            for name, part in (('index_bits', 0), ('index_known', 1)):
+                _pad(f, data_start + blocks[name]['offset'])
+                for key in index.columns:
+                    bitset = bytes(index.columns[key][part][:n_bytes])
+                    f.write(bitset + bytes(n_bytes - len(bitset)))
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def load_snapshot(gatecraft, path, upsert_vectors=False, upsert_batch_size=100):
+    """
+    Restores a snapshot written by save_snapshot() into a fresh Gatecraft.
+
+    The embedding block is memory-mapped read-only and attached to the
+    embedding cache, so no embedding calls are made. The vector store is
+    assumed to still hold the entity vectors unless upsert_vectors is set.
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a Gatecraft snapshot.")
+        header = json.loads(f.read(struct.unpack('<Q', prefix[len(MAGIC):])[0]).decode('utf-8'))
+        data_start = _align(f.tell())
+
+    database = gatecraft.semantic_db
+    if header['embedding_model'] != database.embedding_model:
+        raise ValueError(
+            f"Snapshot was embedded with {header['embedding_model']}, "
+            f"not {database.embedding_model}."
+        )
+    blocks = {name: _map_block(path, data_start, block) for name, block in header['blocks'].items()}
+    vectors = blocks['vectors']
+
+    conditions = []
+    for spec in header['conditions']:
+        conditions.append(_decode_condition(spec, vectors, conditions))
+    for spec in header['roles']:
+        role = Role(spec['role_id'], spec['name'], gatecraft.role_registry)
+        for position in spec['conditions']:
+            role.add_condition(conditions[position])
+        gatecraft.roles[spec['role_id']] = role
+    for spec in header['users']:
+        user = User(spec['user_id'], spec['name'], gatecraft.role_registry)
+        for role_id in spec['roles']:
+            user.add_role(gatecraft.roles[role_id])
+        gatecraft.users[spec['user_id']] = user
+
+    entities = header['entities']
+    metadata = dict((row, value) for row, value in entities['metadata'])
+    tenants = dict((row, tenant) for row, tenant in entities['tenants'])
+    vector_ids = []
+    for row, (entity_id, data) in enumerate(zip(entities['ids'], entities['texts'])):
+        gatecraft.entities[entity_id] = Entity(entity_id, data, metadata.get(row))
+        vector_ids.append(gatecraft._vector_id(entity_id, tenants.get(row)))
+
+    # Sharded stores only search the shards of the tenants they know about
+    shard_for = getattr(gatecraft.vector_store, 'shard_for', None)
+    if shard_for is not None:
+        for tenant in set(tenants.values()):
+            shard_for(tenant)
+
+    texts = entities['texts'] + [
+        spec['term'] for spec in header['conditions'] if spec['type'] == 'semantic'
+    ]
+    database.embedding_cache.attach(
+        [database.embedding_cache.make_key(database.embedding_model, text) for text in texts], vectors
+    )
+
+    index = AccessIndex()
+    saved_index = header['access_index']
+    index.entity_ids = saved_index['entity_ids']
+    for row, entity_id in enumerate(index.entity_ids):
+        if entity_id is None:
+            index._free_rows.append(row)
+        else:
+            index.rows[entity_id] = row
+    for j, key in enumerate(saved_index['keys']):
+        index.columns[key_from_json(key)] = (bytearray(blocks['index_bits'][j].tobytes()),
+                                       bytearray(blocks['index_known'][j].tobytes()))
+    gatecraft.policy.access_index = index
+    gatecraft.policy.indexed_conditions = {
+        key_from_json(json.loads(key)): conditions[position]
+        for key, position in header['indexed_conditions'].items()
+    }
+
+    if upsert_vectors:
+        rows_by_tenant = {}
+        for row in range(len(vector_ids)):
+            rows_by_tenant.setdefault(tenants.get(row), []).append(row)
+        for tenant, rows in rows_by_tenant.items():
+            for start in range(0, len(rows), upsert_batch_size):
+                database.store_embeddings([
+                    (vector_ids[row], vectors[row], metadata[row]) if row in metadata
+                    else (vector_ids[row], vectors[row])
+                    for row in rows[start:start + upsert_batch_size]
+                ], tenant=tenant)
+    return gatecraft
+
+
+def _entity_embeddings(gatecraft, entity_ids, entities, reembed):
+    # Cached embeddings first, then the vectors kept by the vector store
+    database = gatecraft.semantic_db
+    cache = database.embedding_cache
+    embeddings = [cache.get(cache.make_key(database.embedding_model, entity.data)) for entity in entities]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    by_tenant = {}
+    for i in missing:
+        by_tenant.setdefault(gatecraft._entity_tenants.get(entity_ids[i]), []).append(i)
+    for tenant, rows in by_tenant.items():
+        try:
+            stored = database.fetch_embeddings([gatecraft._vector_id_of(entity_ids[i]) for i in rows], tenant=tenant)
+        except NotImplementedError:
+            break
+        for i in rows:
+            embeddings[i] = stored.get(gatecraft._vector_id_of(entity_ids[i]))
+
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        if not reembed:
+            raise ValueError(
+                f"{len(missing)} entity embeddings are neither cached nor stored in the vector store; "
+                f"pass reembed=True to embed them again."
+            )
+        for i, embedding in zip(missing, database.get_embeddings([entities[i].data for i in missing])):
+            embeddings[i] = embedding
+    return embeddings
+
+
+def _parts(condition):
+    if isinstance(condition, (AndCondition, OrCondition)):
+        return condition.conditions
+    if isinstance(condition, NotCondition):
+        return [condition.condition]
+    return []
+
+
+def _encode_condition(condition, term_row, positions):
+    if isinstance(condition, SemanticCondition):
+        return {'type': 'semantic', 'term': condition.term, 'threshold': condition.threshold,
+                'inverse': condition.inverse, 'embedding': term_row}
+    if isinstance(condition, MetadataCondition):
+        return {'type': 'metadata', 'key': condition.key, 'values': list(condition.values),
+                'inverse': condition.inverse}
+    if isinstance(condition, OwnerCondition):
+        return {'type': 'owner', 'key': condition.key}
+    if isinstance(condition, KeywordCondition):
+        return {'type': 'keyword', 'keywords': list(condition.keywords),
+                'case_sensitive': condition.case_sensitive, 'inverse': condition.inverse}
+    if isinstance(condition, RegexCondition):
+        return {'type': 'regex', 'pattern': condition.pattern, 'flags': condition.flags,
+                'inverse': condition.inverse}
+    if isinstance(condition, (AndCondition, OrCondition)):
+        return {'type': condition.kind, 'conditions': [positions[id(part)] for part in condition.conditions]}
+    if isinstance(condition, NotCondition):
+        return {'type': 'not', 'conditions': [positions[id(condition.condition)]]}
+    raise TypeError(f"Conditions of type {type(condition).__name__} can't be saved in a snapshot.")
+
+
+def _decode_condition(spec, vectors, decoded):
+    kind = spec['type']
+    if kind == 'semantic':
+        condition = SemanticCondition(spec['term'], threshold=spec['threshold'], inverse=spec['inverse'])
+        if spec['embedding'] is not None:
+            condition.term_embedding = vectors[spec['embedding']]
+        return condition
+    if kind == 'metadata':
+        return MetadataCondition(spec['key'], spec['values'], inverse=spec['inverse'])
+    if kind == 'owner':
+        return OwnerCondition(spec['key'])
+    if kind == 'keyword':
+        return KeywordCondition(spec['keywords'], case_sensitive=spec['case_sensitive'], inverse=spec['inverse'])
+    if kind == 'regex':
+        return RegexCondition(spec['pattern'], flags=spec['flags'], inverse=spec['inverse'])
+    if kind in ('and', 'or', 'not'):
+        parts = [decoded[position] for position in spec['conditions']]
+        if kind == 'not':
+            return NotCondition(*parts)
+        return (AndCondition if kind == 'and' else OrCondition)(*parts)
+    raise ValueError(f"Unknown condition type in snapshot: {kind}.")
+
+
+
+def _stack(embeddings, dimension):
+    if not embeddings:
+        return np.zeros((0, dimension), dtype=np.float32)
+    if any(np.shape(embedding) != (dimension,) for embedding in embeddings):
+        raise ValueError(f"Snapshots need embeddings of a single dimension ({dimension}).")
+    return np.stack(embeddings).astype(np.float32)
+
+
+def _map_block(path, data_start, block):
+    shape = tuple(block['shape'])
+    if 0 in shape:
+        return np.zeros(shape, dtype=block['dtype'])
+    return np.memmap(path, dtype=block['dtype'], mode='r', offset=data_start + block['offset'], shape=shape)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _pad(f, offset):
+    f.write(bytes(offset - f.tell()))
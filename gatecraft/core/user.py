@@ -1,24 +1,56 @@
-from gatecraft.core.role import Role
+from gatecraft.core.role import Role, RoleRegistry
 
 
 class User(metaclass=type):
     """
     Represents a user in the RBAC system.
+
+    Role membership is kept as a bitset over the dense role indices of one
+    RoleRegistry: the given one, else that of the first registered role
+    added. Unregistered roles are registered in it when added.
     """
 
-    def __init__(self, user_id, name):
+    __slots__ = ('user_id', 'name', 'role_bits', 'registry')
+
+    def __init__(self, user_id, name, registry=None):
         self.user_id = user_id
         self.name = name
-        self.roles = set()
+        self.role_bits = 0
+        self.registry = registry
 
     def add_role(self, role):
         if not isinstance(role, Role):
             raise TypeError("Expected a Role instance.")
-        self.roles.add(role)
+        if self.registry is None:
+            self.registry = role.registry if role.registry is not None else RoleRegistry()
+        if role.registry is None:
+            self.registry.register(role)
+        elif role.registry is not self.registry:
+            raise ValueError(f"Role {role.name} belongs to another Gatecraft than user {self.user_id}.")
+        self.role_bits |= 1 << role.index
 
     def remove_role(self, role):
-        self.roles.discard(role)
+        if role.registry is not None and role.registry is self.registry:
+            self.role_bits &= ~(1 << role.index)
+
+    def has_role(self, role):
+        return role.registry is not None and role.registry is self.registry and bool(self.role_bits >> role.index & 1)
+
+    def role_indices(self):
+        indices = []
+        bits = self.role_bits
+        while bits:
+            lowest = bits & -bits
+            indices.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return indices
 
     def get_roles(self):
-        return self.roles 
-    
\ No newline at end of file
+        registry = self.registry
+        return [registry[index] for index in self.role_indices()]
+
+    @property
+    def roles(self):
+        # Computed from role_bits; use add_role / remove_role to change it
+        return frozenset(self.get_roles())
+    
@@ -0,0 +1,185 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from gatecraft.db.quantization import MODES, quantize
+
+
+class EmbeddingCache(metaclass=type):
+    """
+    Content-addressed embedding cache.
+
+    Embeddings are keyed by the embedding model plus a hash of the text, so the
+    same text is only ever embedded once per model. Entries live in an
+    in-memory LRU tier and, when a path is given, in an on-disk sqlite tier
+    that survives restarts. A block of vectors (such as a memory-mapped
+    snapshot) can also be attached; its rows are served without copying and
+    are never evicted. With quantization set to 'float16' or 'int8', vectors
+    are stored (and returned) in that form. Writes to the sqlite tier are
+    committed every commit_every changes and on flush() / close().
+    """
+
+    def __init__(self, max_entries=4096, path=None, quantization=None, commit_every=1000):
+        if quantization not in MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected one of {MODES}.")
+        self.max_entries = max_entries
+        self.path = path
+        self.quantization = quantization
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection = None
+        self._attached = None
+        self._attached_rows = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings '
+                '(key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL)'
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(model, text):
+        digest = hashlib.sha256()
+        digest.update(model.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+            row = self._attached_rows.get(key)
+            if row is not None:
+                self.hits += 1
+                return self._attached[row]
+
+            embedding = self._read_from_disk(key)
+            if embedding is not None:
+                # Promote disk hits into the memory tier
+                self._remember(key, embedding)
+                self.hits += 1
+                self.disk_hits += 1
+                return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, key, embedding):
+        embedding = quantize(embedding, self.quantization)
+        # Cached arrays are shared between callers, so they must not be mutated
+        embedding.setflags(write=False)
+        with self._lock:
+            self._remember(key, embedding)
+            if self._connection is not None:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)',
+                    (key, embedding.dtype.str, embedding.tobytes())
+                )
+                self._changed()
+        return embedding
+
+    def attach(self, keys, vectors):
+        """
+        Serves row i of vectors for keys[i], replacing any previously attached
+        block. vectors should be read-only, e.g. a memory-mapped array.
+        """
+        with self._lock:
+            self._attached = vectors
+            self._attached_rows = {key: row for row, key in enumerate(keys)}
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._attached_rows.pop(key, None)
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM embeddings WHERE key = ?', (key,))
+                self._changed()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._attached = None
+            self._attached_rows = {}
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM embeddings')
+                self._connection.commit()
+                self._uncommitted = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'attached': len(self._attached_rows),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def flush(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
+                self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
+
+    def _changed(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def _remember(self, key, embedding):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _read_from_disk(self, key):
+        if self._connection is None:
+            return None
+        row = self._connection.execute(
+            'SELECT dtype, vector FROM embeddings WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        embedding = np.frombuffer(row[1], dtype=np.dtype(row[0]))
+        if self.quantization is not None and embedding.dtype != np.dtype(self.quantization):
+            # Written by a cache with another quantization
+            embedding = quantize(embedding, self.quantization)
+            embedding.setflags(write=False)
+        return embedding
+
+    def __contains__(self, key):
+        with self._lock:
+            return (key in self._entries or key in self._attached_rows
+                    or self._read_from_disk(key) is not None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gatecraft.utils.histogram import Histogram
+
+
+class EmbeddingDispatcher(metaclass=type):
+    """
+    Coalesces concurrent embedding calls into batched requests.
+
+    Texts submitted from any thread or event loop are queued until max_batch_size
+    of them are waiting or the oldest has waited max_wait seconds, then sent as
+    one embed_batch call on a worker pool. Every caller gets its own vector back,
+    and a text that is already queued or in flight shares the pending result
+    instead of being embedded again.
+    """
+
+    def __init__(self, embed_batch, max_batch_size=64, max_wait=0.005, max_workers=4):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = []
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = None
+        self._closed = False
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512])
+        self.queue_wait = Histogram([0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1.0])
+        self.deduplicated = 0
+
+    def submit(self, text):
+        """Queues text and returns a Future resolving to its embedding."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("EmbeddingDispatcher is closed.")
+            future = self._pending.get(text)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = Future()
+            self._pending[text] = future
+            self._queue.append((text, time.perf_counter()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='embedding-dispatcher', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return future
+
+    def embed(self, text):
+        return self.submit(text).result()
+
+    async def aembed(self, text):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self):
+        return {
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait': self.queue_wait.snapshot(),
+            'deduplicated': self.deduplicated,
+        }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            batch = None
+            try:
+                with self._condition:
+                    while not self._queue and not self._closed:
+                        self._condition.wait()
+                    if not self._queue:
+                        return
+
+                    # Wait for a full batch, but never past the oldest item's deadline
+                    deadline = self._queue[0][1] + self.max_wait
+                    while len(self._queue) < self.max_batch_size and not self._closed:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+
+                    batch = self._queue[:self.max_batch_size]
+                    del self._queue[:self.max_batch_size]
+
+                now = time.perf_counter()
+                for _, enqueued_at in batch:
+                    self.queue_wait.observe(now - enqueued_at)
+                self.batch_sizes.observe(len(batch))
+                self._executor.submit(self._embed, [text for text, _ in batch])
+            except Exception as exc:
+                # Fail the callers of the batch (or of the whole queue) instead
+                # of leaving them waiting on a dead thread
+                with self._condition:
+                    if batch is None:
+                        batch = self._queue[:]
+                        del self._queue[:]
+                self._resolve([text for text, _ in batch], error=exc)
+
+    def _embed(self, texts):
+        try:
+            embeddings = list(self.embed_batch(texts))
+            if len(embeddings) != len(texts):
+                raise ValueError(f"embed_batch returned {len(embeddings)} embeddings for {len(texts)} texts.")
+        except Exception as exc:
+            self._resolve(texts, error=exc)
+        else:
+            self._resolve(texts, embeddings)
+
+    def _resolve(self, texts, embeddings=None, error=None):
+        with self._condition:
+            futures = [self._pending.pop(text, None) for text in texts]
+        for i, future in enumerate(futures):
+            if future is None or future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(embeddings[i])
@@ -0,0 +1,238 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from gatecraft.utils.aio import run_sync
+from gatecraft.utils.batching import estimate_tokens
+from gatecraft.utils.retry import aretry_with_backoff, retry_with_backoff
+
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def _load_env():
+    # .env is read once per process, on the first OpenAI call, so startup
+    # doesn't pay for it but a key kept there is still found
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import find_dotenv, load_dotenv
+
+            # Searched from the working directory, where applications keep it
+            load_dotenv(find_dotenv(usecwd=True))
+            _env_loaded = True
+
+
+def _is_retryable_openai_error(exc):
+    import openai
+
+    return isinstance(exc, (
+        openai.error.RateLimitError,
+        openai.error.APIConnectionError,
+        openai.error.ServiceUnavailableError,
+        openai.error.Timeout,
+    ))
+
+
+class EmbeddingProvider(metaclass=type):
+    """
+    Interface for embedding providers.
+
+    A provider turns texts into vectors of a fixed dimension and names the
+    model it uses, so that cached embeddings of different models never mix.
+    Vector stores that are given a provider take their dimension from it.
+    """
+
+    embedding_model = None
+    dimension = None
+
+    def embed(self, data):
+        return self.embed_batch([data])[0]
+
+    def embed_batch(self, data_list):
+        raise NotImplementedError("embed_batch method must be implemented.")
+
+    async def aembed(self, data):
+        return await run_sync(self.embed, data)
+
+    async def aembed_batch(self, data_list):
+        return await run_sync(self.embed_batch, data_list)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        self.close()
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds texts with the OpenAI embeddings API. The openai module is
+    imported on first use; async calls share a pooled aiohttp session.
+    """
+
+    # Output dimension of the known OpenAI embedding models
+    DIMENSIONS = {
+        'text-embedding-ada-002': 1536,
+        'text-embedding-3-small': 1536,
+        'text-embedding-3-large': 3072,
+    }
+
+    def __init__(self, model='text-embedding-ada-002', api_key=None, max_retries=6, dimension=None):
+        if dimension is None and model not in self.DIMENSIONS:
+            raise ValueError(f"Unknown dimension of {model}; pass it as dimension.")
+        self.embedding_model = model
+        self.dimension = dimension or self.DIMENSIONS[model]
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self._session = None
+
+    def _openai(self):
+        _load_env()
+        import openai
+
+        if self.api_key is not None:
+            openai.api_key = self.api_key
+        elif openai.api_key is None:
+            # openai only reads the environment when it is first imported
+            openai.api_key = os.getenv('OPENAI_API_KEY')
+        return openai
+
+    def embed(self, data):
+        response = self._openai().Embedding.create(input=[data], engine=self.embedding_model)
+        return np.array(response['data'][0]['embedding'])
+
+    def embed_batch(self, data_list):
+        # Generate embeddings for many texts in a single OpenAI request
+        response = retry_with_backoff(
+            lambda: self._openai().Embedding.create(input=list(data_list), engine=self.embedding_model),
+            _is_retryable_openai_error,
+            max_retries=self.max_retries
+        )
+        rows = sorted(response['data'], key=lambda row: row['index'])
+        return [np.array(row['embedding']) for row in rows]
+
+    async def aembed(self, data):
+        # openai reuses the aiohttp session set in its context variable
+        session = await self._get_session()
+        openai = self._openai()
+        token = openai.aiosession.set(session)
+        try:
+            response = await aretry_with_backoff(
+                lambda: openai.Embedding.acreate(input=[data], engine=self.embedding_model),
+                _is_retryable_openai_error,
+                max_retries=self.max_retries
+            )
+        finally:
+            openai.aiosession.reset(token)
+        return np.array(response['data'][0]['embedding'])
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self):
+        import aiohttp
+
+        # One pooled session per provider, created inside the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100))
+        return self._session
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Runs a local embedding model on the CPU.
+
+    encode takes a list of texts and returns one vector per text, e.g. the
+    encode method of a sentence-transformers model or a wrapper around an ONNX
+    session. Inputs are grouped into buckets of similar length, so a batch is
+    padded to roughly the length of its texts rather than to the longest text
+    of the request, and the batches run concurrently on a thread pool (the
+    inference runtimes release the GIL).
+    """
+
+    def __init__(self, encode, dimension, embedding_model, max_batch_size=32, max_workers=4,
+                 bucket_width=16, length=None):
+        self.encode = encode
+        self.dimension = dimension
+        self.embedding_model = embedding_model
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.bucket_width = bucket_width
+        self.length = length or estimate_tokens
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sentence_transformers(cls, model_name, device='cpu', **kwargs):
+        """Loads a sentence-transformers model (requires sentence-transformers)."""
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("LocalEmbeddingProvider.from_sentence_transformers requires sentence-transformers.")
+        model = SentenceTransformer(model_name, device=device)
+        tokenizer = getattr(model, 'tokenizer', None)
+        if tokenizer is not None and 'length' not in kwargs:
+            kwargs['length'] = lambda text: len(tokenizer.tokenize(text))
+        return cls(
+            lambda texts: model.encode(texts, batch_size=len(texts), convert_to_numpy=True),
+            model.get_sentence_embedding_dimension(),
+            f"sentence-transformers/{model_name}",
+            **kwargs
+        )
+
+    def embed_batch(self, data_list):
+        data_list = list(data_list)
+        batches = self.batches(data_list)
+        if len(batches) == 1 or self.max_workers <= 1:
+            results = [self._encode(data_list, batch) for batch in batches]
+        else:
+            executor = self._get_executor()
+            results = list(executor.map(lambda batch: self._encode(data_list, batch), batches))
+
+        # Put the vectors back in input order
+        embeddings = [None] * len(data_list)
+        for batch, vectors in zip(batches, results):
+            for position, vector in zip(batch, vectors):
+                embeddings[position] = vector
+        return embeddings
+
+    def batches(self, data_list):
+        """
+        Splits the positions of data_list into batches of at most
+        max_batch_size texts whose lengths fall in the same bucket.
+        """
+        buckets = {}
+        for position, data in enumerate(data_list):
+            buckets.setdefault(self.length(data) // self.bucket_width, []).append(position)
+        return [
+            positions[start:start + self.max_batch_size]
+            for _, positions in sorted(buckets.items())
+            for start in range(0, len(positions), self.max_batch_size)
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _encode(self, data_list, batch):
+        vectors = np.asarray(self.encode([data_list[position] for position in batch]))
+        if vectors.shape != (len(batch), self.dimension):
+            raise ValueError(
+                f"{self.embedding_model} returned shape {vectors.shape}, expected ({len(batch)}, {self.dimension})."
+            )
+        return list(vectors)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='gatecraft-embed')
+            return self._executor
@@ -0,0 +1,44 @@
+import hashlib
+import re
+
+import numpy as np
+
+from gatecraft.db.embedding_provider import EmbeddingProvider
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbedder(EmbeddingProvider):
+    """
+    Deterministic, offline embedder for tests and benchmarks.
+
+    Word unigrams and character trigrams are feature-hashed into a fixed number
+    of signed dimensions with blake2b, so the same text always gets the same
+    vector in every process, and texts sharing words get similar vectors.
+    """
+
+    def __init__(self, dimension=256, seed=0):
+        self.dimension = dimension
+        self.seed = seed
+        self.embedding_model = f"hashing-{dimension}-{seed}"
+        self._salt = seed.to_bytes(8, 'little')
+
+    def embed(self, data):
+        vector = np.zeros(self.dimension)
+        for feature, weight in self._features(data):
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8, salt=self._salt).digest()
+            value = int.from_bytes(digest, 'little')
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dimension] += sign * weight
+        return vector
+
+    def embed_batch(self, data_list):
+        return [self.embed(data) for data in data_list]
+
+    def _features(self, data):
+        words = _TOKEN.findall(data.lower())
+        for word in words:
+            yield 'w:' + word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield 't:' + padded[i:i + 3], 0.5
@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from gatecraft.db.metadata_filter import matches_filter
+from gatecraft.db.similarity import normalize, similarity, similarity_many
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class LocalVectorStore(VectorStoreInterface):
+    """
+    In-process vector store backed by a float32 matrix.
+
+    Vectors are normalized on upsert so cosine scores are plain dot products.
+    Small collections are searched exhaustively with one BLAS matrix-vector
+    product; once the collection reaches ann_threshold vectors an IVF index
+    (spherical k-means lists) restricts each query to the n_probe closest
+    lists. When a path is given, vectors live in a memory-mapped file inside
+    that directory and the ids are written by flush(). Texts are embedded with
+    embedding_provider, which also gives the dimension, or with embed_function.
+    Namespaces are separate child stores (in subdirectories of path).
+    Metadata is kept per id; filtered queries score the matching vectors
+    exhaustively.
+    """
+
+    def __init__(self, dimension=None, embed_function=None, path=None, embedding_model='local',
+                 ann_threshold=50000, n_lists=None, n_probe=8, embedding_provider=None):
+        if embedding_provider is not None:
+            if dimension is not None and dimension != embedding_provider.dimension:
+                raise ValueError(
+                    f"{embedding_provider.embedding_model} embeds into {embedding_provider.dimension} "
+                    f"dimensions, not {dimension}."
+                )
+            dimension = embedding_provider.dimension
+            embedding_model = embedding_provider.embedding_model
+        if dimension is None:
+            raise ValueError("LocalVectorStore needs a dimension or an embedding_provider.")
+        self.dimension = dimension
+        self.embed_function = embed_function
+        self.embedding_provider = embedding_provider
+        self.embedding_model = embedding_model
+        self.path = path
+        self.ann_threshold = ann_threshold
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+
+        self._lock = threading.RLock()
+        self._namespaces = {}
+        self._ids = []
+        self._rows = {}
+        self._metadata = {}
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+
+        # IVF state, rebuilt lazily when the collection has grown enough
+        self._centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._open()
+
+    def embed(self, data):
+        if self.embedding_provider is not None:
+            return self.embedding_provider.embed(data)
+        if self.embed_function is None:
+            raise NotImplementedError("LocalVectorStore needs an embed_function to embed data.")
+        return np.asarray(self.embed_function(data))
+
+    def embed_batch(self, data_list):
+        if self.embedding_provider is not None:
+            return self.embedding_provider.embed_batch(data_list)
+        return [self.embed(data) for data in data_list]
+
+    def for_namespace(self, namespace):
+        if namespace is None:
+            return self
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            if store is None:
+                path = None if self.path is None else os.path.join(self.path, 'ns-' + quote(str(namespace), safe=''))
+                store = LocalVectorStore(
+                    self.dimension, embed_function=self.embed_function, path=path,
+                    embedding_model=self.embedding_model, ann_threshold=self.ann_threshold,
+                    n_lists=self.n_lists, n_probe=self.n_probe, embedding_provider=self.embedding_provider
+                )
+                self._namespaces[namespace] = store
+            return store
+
+    def namespaces(self):
+        # Namespaces written before a restart are the ns-* subdirectories;
+        # their names come back as strings
+        with self._lock:
+            names = list(self._namespaces)
+        if self.path is not None:
+            for entry in sorted(os.listdir(self.path)):
+                if entry.startswith('ns-') and os.path.isdir(os.path.join(self.path, entry)):
+                    name = unquote(entry[3:])
+                    if not any(str(known) == name for known in names):
+                        names.append(name)
+        return names
+
+    def similarity(self, vector1, vector2):
+        return similarity(vector1, vector2)
+
+    def upsert(self, id, vector, metadata=None):
+        self.upsert_batch([(id, vector, metadata)])
+
+    def upsert_batch(self, items):
+        with self._lock:
+            for id, vector, *metadata in items:
+                id = str(id)
+                if metadata and metadata[0]:
+                    self._metadata[id] = metadata[0]
+                else:
+                    self._metadata.pop(id, None)
+                row = self._rows.get(id)
+                if row is None:
+                    row = len(self._ids)
+                    self._reserve(row + 1)
+                    self._ids.append(id)
+                    self._rows[id] = row
+                self._vectors[row] = _normalize(vector)
+                if self._centroids is not None:
+                    self._assignments[row] = self._nearest_list(self._vectors[row])
+
+    def delete(self, ids):
+        with self._lock:
+            for id in ids:
+                row = self._rows.pop(str(id), None)
+                if row is None:
+                    continue
+                self._metadata.pop(str(id), None)
+                # Keep rows dense by moving the last vector into the hole
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                    self._vectors[row] = self._vectors[last]
+                    self._assignments[row] = self._assignments[last]
+                self._ids.pop()
+
+    def fetch(self, ids):
+        with self._lock:
+            rows = {str(id): self._rows.get(str(id)) for id in ids}
+            return {id: np.array(self._vectors[row]) for id, row in rows.items() if row is not None}
+
+    def query(self, vector, top_k=1, filter=None):
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or top_k <= 0:
+                return []
+            query = _normalize(vector)
+
+            if filter is not None:
+                candidates = np.array([
+                    row for row, id in enumerate(self._ids) if matches_filter(self._metadata.get(id), filter)
+                ], dtype=np.int64)
+            elif count >= self.ann_threshold:
+                if self._centroids is None or count >= 2 * self._trained_size:
+                    self._train()
+                candidates = self._candidate_rows(query, top_k)
+            else:
+                candidates = None
+
+            # Stored rows are normalized on upsert
+            if candidates is None:
+                scores = similarity_many(query, self._vectors[:count], unit_rows=True)
+                rows = np.arange(count)
+            else:
+                scores = similarity_many(query, self._vectors[candidates], unit_rows=True)
+                rows = candidates
+
+            k = min(top_k, len(rows))
+            if k < len(rows):
+                best = np.argpartition(-scores, k - 1)[:k]
+            else:
+                best = np.arange(len(rows))
+            best = best[np.argsort(-scores[best], kind='stable')]
+            return [{'id': self._ids[rows[i]], 'score': float(scores[i])} for i in best]
+
+    def describe_index_stats(self):
+        """Get statistics about the local index"""
+        with self._lock:
+            return {
+                'dimension': self.dimension,
+                'total_vector_count': len(self._ids),
+                'index_type': 'ivf' if self._centroids is not None else 'flat',
+                'n_lists': 0 if self._centroids is None else len(self._centroids),
+            }
+
+    def flush(self):
+        """Persists the ids and flushes the memory-mapped vectors to disk."""
+        if self.path is None:
+            return
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            meta_path = os.path.join(self.path, 'meta.json')
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({'dimension': self.dimension, 'ids': self._ids, 'metadata': self._metadata}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+            for store in self._namespaces.values():
+                store.flush()
+
+    def close(self):
+        self.flush()
+
+    def _open(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        vectors_path = os.path.join(self.path, 'vectors.f32')
+        if os.path.exists(meta_path) and os.path.exists(vectors_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['dimension'] != self.dimension:
+                raise ValueError(
+                    f"Store at {self.path} has dimension {meta['dimension']}, not {self.dimension}."
+                )
+            self._ids = meta['ids']
+            self._rows = {id: row for row, id in enumerate(self._ids)}
+            self._metadata = meta.get('metadata', {})
+            capacity = os.path.getsize(vectors_path) // (4 * self.dimension)
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+',
+                                      shape=(capacity, self.dimension))
+            self._assignments = np.zeros(capacity, dtype=np.int32)
+        else:
+            self._resize(1024)
+
+    def _reserve(self, size):
+        if size > len(self._vectors):
+            self._resize(max(size, 2 * len(self._vectors), 1024))
+
+    def _resize(self, capacity):
+        count = len(self._ids)
+        old = np.array(self._vectors[:count])
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        else:
+            # Grow the backing file and map it again
+            vectors_path = os.path.join(self.path, 'vectors.f32')
+            self._vectors = None
+            with open(vectors_path, 'ab') as f:
+                f.truncate(capacity * self.dimension * 4)
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+',
+                                shape=(capacity, self.dimension))
+        vectors[:count] = old
+        self._vectors = vectors
+
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:count] = self._assignments[:count]
+        self._assignments = assignments
+
+    def _train(self, iterations=10, seed=0):
+        count = len(self._ids)
+        n_lists = self.n_lists or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, 256 * n_lists)
+        sample = self._vectors[rng.choice(count, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+
+        # Spherical k-means on a sample of the collection
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for j in range(n_lists):
+                members = sample[labels == j]
+                if len(members):
+                    centroids[j] = _normalize(members.sum(axis=0))
+
+        self._centroids = centroids
+        for start in range(0, count, 65536):
+            block = self._vectors[start:min(start + 65536, count)]
+            self._assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self._trained_size = count
+
+    def _nearest_list(self, vector):
+        return int(np.argmax(self._centroids @ vector))
+
+    def _candidate_rows(self, query, top_k):
+        # Probe the closest lists, widening until they hold at least top_k vectors
+        count = len(self._ids)
+        sizes = np.bincount(self._assignments[:count], minlength=len(self._centroids))
+        order = np.argsort(-(self._centroids @ query))
+        n_probe = min(self.n_probe, len(order))
+        while n_probe < len(order) and sizes[order[:n_probe]].sum() < top_k:
+            n_probe += 1
+        return np.nonzero(np.isin(self._assignments[:count], order[:n_probe]))[0]
+
+
+def _normalize(vector):
+    return normalize(np.asarray(vector, dtype=np.float32))
@@ -0,0 +1,98 @@
+_COMPARISONS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value > operand,
+    '$gte': lambda value, operand: value >= operand,
+    '$lt': lambda value, operand: value < operand,
+    '$lte': lambda value, operand: value <= operand,
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+}
+
+# Operators that hold for a list field only if they hold for none of its items
+_NEGATIVE = ('$ne', '$nin')
+
+# Operator pairs that hold for exactly the opposite metadata, missing fields
+# and list fields included
+_COMPLEMENTS = {'$eq': '$ne', '$ne': '$eq', '$in': '$nin', '$nin': '$in'}
+
+
+def matches_filter(metadata, filter):
+    """
+    Evaluates a metadata filter in the Pinecone filter language against a
+    metadata dict, so that stores without server-side filtering agree with
+    those that have it.
+
+    A filter maps fields to a value (equality) or to operators ($eq, $ne,
+    $gt, $gte, $lt, $lte, $in, $nin, $exists), and can combine filters with
+    $and / $or. A list field matches $eq and $in if any of its items does,
+    and $ne and $nin if none does. A missing field only matches $ne, $nin
+    and $exists: False.
+    """
+    metadata = metadata or {}
+    for field, condition in filter.items():
+        if field == '$and':
+            if not all(matches_filter(metadata, part) for part in condition):
+                return False
+        elif field == '$or':
+            if not any(matches_filter(metadata, part) for part in condition):
+                return False
+        elif not _matches_field(metadata, field, condition):
+            return False
+    return True
+
+
+def negate_filter(filter):
+    """
+    Returns the filter that matches exactly the metadata that filter doesn't,
+    or None if there is none: range operators fail for missing fields both
+    ways, so they have no complement.
+    """
+    parts = []
+    for field, condition in filter.items():
+        if field in ('$and', '$or'):
+            negated = [negate_filter(part) for part in condition]
+            if not negated or any(part is None for part in negated):
+                return None
+            parts.append({'$or' if field == '$and' else '$and': negated})
+            continue
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, operand in condition.items():
+            if operator == '$exists':
+                parts.append({field: {'$exists': not operand}})
+            elif operator in _COMPLEMENTS:
+                parts.append({field: {_COMPLEMENTS[operator]: operand}})
+            else:
+                return None
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else {'$or': parts}
+
+
+def _matches_field(metadata, field, condition):
+    if not isinstance(condition, dict):
+        condition = {'$eq': condition}
+    present = field in metadata
+    value = metadata.get(field)
+    for operator, operand in condition.items():
+        if operator == '$exists':
+            if present != bool(operand):
+                return False
+            continue
+        compare = _COMPARISONS.get(operator)
+        if compare is None:
+            raise ValueError(f"Unsupported metadata filter operator: {operator}.")
+        if not present:
+            if operator not in _NEGATIVE:
+                return False
+        elif isinstance(value, (list, tuple)):
+            if operator in _NEGATIVE:
+                positive = '$eq' if operator == '$ne' else '$in'
+                if any(_COMPARISONS[positive](item, operand) for item in value):
+                    return False
+            elif not any(compare(item, operand) for item in value):
+                return False
+        elif not compare(value, operand):
+            return False
+    return True
@@ -1,3 +1,4 @@
+from gatecraft.db.similarity import similarity
 from gatecraft.db.vector_store_interface import VectorStoreInterface
 import numpy as np
 
@@ -7,16 +8,15 @@ class MockVectorStore(VectorStoreInterface):
     Mock vector store for demonstration purposes.
     """
 
+    embedding_model = 'mock-ascii'
+
     def embed(self, data):
         # Mock embedding: Convert string data to a vector of ASCII values
         return np.array([ord(char) for char in data]).astype(float)
 
     def similarity(self, vector1, vector2):
-        # Compute cosine similarity
+        # Empty texts have empty vectors, which can't be compared
         if len(vector1) == 0 or len(vector2) == 0:
             return 0.0
-        dot_product = np.dot(vector1, vector2)
-        norm_a = np.linalg.norm(vector1)
-        norm_b = np.linalg.norm(vector2)
-        return dot_product / (norm_a * norm_b) 
+        return similarity(vector1, vector2) 
     
\ No newline at end of file
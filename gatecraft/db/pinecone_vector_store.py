@@ -1,68 +1,249 @@
-import pinecone
-import openai
+import copy
+import threading
+
 import numpy as np
+
+from gatecraft.db.embedding_provider import OpenAIEmbeddingProvider
+from gatecraft.db.similarity import similarity
 from gatecraft.db.vector_store_interface import VectorStoreInterface
+from gatecraft.utils.aio import run_sync
+from gatecraft.utils.batching import chunked
+from gatecraft.utils.retry import aretry_with_backoff, retry_with_backoff
+
+
+def _is_retryable_pinecone_error(exc):
+    # Pinecone API exceptions carry the HTTP status of the failed request
+    return getattr(exc, 'status', None) in (429, 500, 502, 503, 504)
 
 
 class PineconeVectorStore(VectorStoreInterface):
     """
     Vector store implementation using Pinecone.
+
+    The openai and pinecone modules are imported, and the Pinecone client and
+    index handle created, on first use. Index existence checks are cached per
+    process, so constructing a store never touches the network. Texts are
+    embedded by embedding_provider (OpenAI by default), which also sets the
+    dimension of new indexes. All reads and writes go to namespace; use
+    for_namespace() for views of the same index in other namespaces.
     """
 
-    def __init__(self, api_key, environment, index_name):
-        # Create an instance of the Pinecone client
-        self.pinecone_client = pinecone.Pinecone(api_key=api_key)
+    # (api_key, index_name) pairs already known to exist
+    _checked_indexes = set()
+    _checked_indexes_lock = threading.Lock()
+
+    def __init__(self, api_key, environment, index_name, upsert_batch_size=100, max_retries=6,
+                 openai_api_key=None, embedding_provider=None, namespace=None):
+        self.api_key = api_key
+        self.environment = environment
+        self.openai_api_key = openai_api_key
+        if embedding_provider is None:
+            embedding_provider = OpenAIEmbeddingProvider(api_key=openai_api_key, max_retries=max_retries)
+        self.embedding_provider = embedding_provider
 
         # Set the index name
         self.index_name = index_name
+        self.namespace = namespace
+        self.upsert_batch_size = upsert_batch_size
+        self.max_retries = max_retries
+        self._session = None
+        self._host = None
+        self._pinecone_client = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def embedding_model(self):
+        return self.embedding_provider.embedding_model
+
+    @property
+    def dimension(self):
+        return self.embedding_provider.dimension
+
+    @property
+    def pinecone_client(self):
+        if self._pinecone_client is None:
+            import pinecone
+
+            # Create an instance of the Pinecone client
+            self._pinecone_client = pinecone.Pinecone(api_key=self.api_key)
+        return self._pinecone_client
 
-        # Check if the index exists
-        existing_indexes = self.pinecone_client.list_indexes().names()
-        if self.index_name not in existing_indexes:
-            # Create a new index if it doesn't exist
-            self.pinecone_client.create_index(
-                name=self.index_name,
-                dimension=1536,  # OpenAI's embedding dimension is 1536
-                metric='cosine',
-                spec=pinecone.ServerlessSpec(
-                    cloud='aws',
-                    region=environment
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._ensure_index()
+                self._index = self.pinecone_client.Index(self.index_name)
+            return self._index
+
+    def _ensure_index(self):
+        key = (self.api_key, self.index_name)
+        with self._checked_indexes_lock:
+            if key in self._checked_indexes:
+                return
+
+            # Check if the index exists
+            existing_indexes = self.pinecone_client.list_indexes().names()
+            if self.index_name not in existing_indexes:
+                import pinecone
+
+                # Create a new index if it doesn't exist
+                self.pinecone_client.create_index(
+                    name=self.index_name,
+                    dimension=self.dimension,
+                    metric='cosine',
+                    spec=pinecone.ServerlessSpec(
+                        cloud='aws',
+                        region=self.environment
+                    )
                 )
-            )
-        self.index = self.pinecone_client.Index(self.index_name)
+            self._checked_indexes.add(key)
+
+    def for_namespace(self, namespace):
+        if namespace == self.namespace:
+            return self
+        # Views share the credentials and embedding provider of this store
+        view = copy.copy(self)
+        view.namespace = namespace
+        view._session = None
+        view._index = None
+        view._lock = threading.Lock()
+        return view
 
     def embed(self, data):
-        # Generate embeddings using OpenAI
-        response = openai.Embedding.create(
-            input=[data],
-            engine='text-embedding-ada-002'
-        )
-        embedding = response['data'][0]['embedding']
-        return np.array(embedding)
+        return self.embedding_provider.embed(data)
+
+    def embed_batch(self, data_list):
+        return self.embedding_provider.embed_batch(data_list)
 
-    def upsert(self, id, vector):
+    def upsert(self, id, vector, metadata=None):
         # Upsert the vector into Pinecone
-        self.index.upsert(vectors=[(str(id), vector.tolist())])
+        self.index.upsert(vectors=[_vector(id, vector, metadata)], namespace=self.namespace)
+
+    def upsert_batch(self, items):
+        # Upsert vectors into Pinecone in bulk chunks
+        vectors = [_vector(id, vector, *metadata) for id, vector, *metadata in items]
+        for chunk in chunked(vectors, self.upsert_batch_size):
+            retry_with_backoff(
+                lambda: self.index.upsert(vectors=chunk, namespace=self.namespace),
+                _is_retryable_pinecone_error,
+                max_retries=self.max_retries
+            )
 
     def similarity(self, vector1, vector2):
-        # Compute cosine similarity between two vectors
-        if np.linalg.norm(vector1) == 0 or np.linalg.norm(vector2) == 0:
-            return 0.0
-        dot_product = np.dot(vector1, vector2)
-        norm_product = np.linalg.norm(vector1) * np.linalg.norm(vector2)
-        return dot_product / norm_product
-
-    def query(self, vector, top_k=1):
+        return similarity(vector1, vector2)
+
+    def query(self, vector, top_k=1, filter=None):
         # Query Pinecone for the most similar vectors
         response = self.index.query(
             vector=vector.tolist(),
             top_k=top_k,
             include_values=False,
-            include_metadata=False
+            include_metadata=False,
+            namespace=self.namespace,
+            filter=filter
         )
         return response.matches
 
+    def delete(self, ids):
+        # Delete vectors from Pinecone in bulk chunks
+        for chunk in chunked([str(id) for id in ids], self.upsert_batch_size):
+            retry_with_backoff(
+                lambda: self.index.delete(ids=chunk, namespace=self.namespace),
+                _is_retryable_pinecone_error,
+                max_retries=self.max_retries
+            )
+
+    def fetch(self, ids):
+        # Fetch stored vectors from Pinecone in bulk chunks
+        vectors = {}
+        for chunk in chunked([str(id) for id in ids], self.upsert_batch_size):
+            response = retry_with_backoff(
+                lambda: self.index.fetch(ids=chunk, namespace=self.namespace),
+                _is_retryable_pinecone_error,
+                max_retries=self.max_retries
+            )
+            for id, record in response.vectors.items():
+                vectors[id] = np.asarray(record['values'], dtype=np.float32)
+        return vectors
+
+    def namespaces(self):
+        # Pinecone reports the default namespace as ''
+        return [namespace for namespace in self.index.describe_index_stats()['namespaces'] if namespace]
+
     def describe_index_stats(self):
-        """Get statistics about the Pinecone index"""
-        return self.index.describe_index_stats()
-  
\ No newline at end of file
+        """Get statistics about the Pinecone index, or about the namespace of a view"""
+        stats = self.index.describe_index_stats()
+        if self.namespace is None:
+            return stats
+        summary = stats['namespaces'].get(self.namespace)
+        return {
+            'namespace': self.namespace,
+            'dimension': stats['dimension'],
+            'total_vector_count': summary['vector_count'] if summary else 0,
+        }
+
+    async def aembed(self, data):
+        return await self.embedding_provider.aembed(data)
+
+    async def aupsert(self, id, vector, metadata=None):
+        record = {'id': str(id), 'values': vector.tolist()}
+        if metadata:
+            record['metadata'] = metadata
+        await self._apost('/vectors/upsert', self._with_namespace({'vectors': [record]}))
+
+    async def aquery(self, vector, top_k=1, filter=None):
+        payload = {
+            'vector': vector.tolist(),
+            'topK': top_k,
+            'includeValues': False,
+            'includeMetadata': False
+        }
+        if filter is not None:
+            payload['filter'] = filter
+        response = await self._apost('/query', self._with_namespace(payload))
+        return response.get('matches', [])
+
+    def _with_namespace(self, payload):
+        if self.namespace is not None:
+            payload['namespace'] = self.namespace
+        return payload
+
+    async def aclose(self):
+        await self.embedding_provider.aclose()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self):
+        import aiohttp
+
+        # One pooled session per store, created inside the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100))
+        return self._session
+
+    async def _apost(self, path, payload):
+        if self._host is None:
+            description = await run_sync(self.pinecone_client.describe_index, self.index_name)
+            self._host = description.host
+        session = await self._get_session()
+
+        async def post():
+            async with session.post(
+                f"https://{self._host}{path}",
+                json=payload,
+                headers={'Api-Key': self.api_key},
+                raise_for_status=True
+            ) as response:
+                return await response.json()
+
+        return await aretry_with_backoff(post, _is_retryable_pinecone_error, max_retries=self.max_retries)
+
+
+def _vector(id, vector, metadata=None):
+    # Pinecone takes (id, values) or (id, values, metadata) tuples
+    if metadata:
+        return (str(id), vector.tolist(), metadata)
+    return (str(id), vector.tolist())
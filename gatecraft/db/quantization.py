@@ -0,0 +1,78 @@
+import numpy as np
+
+from gatecraft.db.similarity import similarity
+
+MODES = (None, 'float16', 'int8')
+
+# Distances from the threshold by which flipped verdicts are grouped
+DEFAULT_MARGINS = (0.001, 0.005, 0.01, 0.05)
+
+
+def quantize(vector, mode):
+    """
+    Quantizes an embedding for storage.
+
+    'float16' halves the precision. 'int8' scales every vector by its own
+    largest magnitude so that it spans [-127, 127] and rounds it; cosine
+    similarity doesn't depend on that scale, so only the codes are kept.
+    """
+    vector = np.asarray(vector)
+    if mode is None:
+        return vector
+    if mode == 'float16':
+        return vector.astype(np.float16)
+    if mode == 'int8':
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        if peak == 0 or not np.isfinite(peak):
+            return np.zeros(vector.shape, dtype=np.int8)
+        return np.round(vector * (127 / peak)).astype(np.int8)
+    raise ValueError(f"Unknown quantization {mode!r}; expected one of {MODES}.")
+
+
+def threshold_flip_report(conditions, embeddings, mode, term_embeddings=None, margins=DEFAULT_MARGINS):
+    """
+    Measures how quantizing to mode changes the verdicts of semantic
+    conditions over full-precision entity embeddings. term_embeddings maps
+    terms to full-precision vectors and defaults to each term_embedding.
+
+    Every (condition, embedding) pair is decided with the exact cosine
+    similarity and with the similarity of the quantized vectors. Returns the
+    number of flipped verdicts, the similarity error, and the flips grouped
+    by how close the exact similarity was to the threshold.
+    """
+    if term_embeddings is None:
+        term_embeddings = {
+            condition.term: condition.term_embedding for condition in conditions
+            if condition.term_embedding is not None
+        }
+    quantized = [quantize(embedding, mode) for embedding in embeddings]
+    errors = []
+    flips = 0
+    by_margin = dict.fromkeys(margins, 0)
+
+    for condition in conditions:
+        if condition.term not in term_embeddings:
+            continue
+        term = np.asarray(term_embeddings[condition.term], dtype=np.float64)
+        quantized_term = quantize(term, mode)
+        for embedding, quantized_embedding in zip(embeddings, quantized):
+            exact = similarity(term, np.asarray(embedding, dtype=np.float64))
+            approximate = similarity(quantized_term, quantized_embedding)
+            errors.append(abs(approximate - exact))
+            if condition.decide(exact) != condition.decide(approximate):
+                flips += 1
+                distance = abs(exact - condition.threshold)
+                for margin in margins:
+                    if distance <= margin:
+                        by_margin[margin] += 1
+
+    pairs = len(errors)
+    return {
+        'mode': mode,
+        'pairs': pairs,
+        'flips': flips,
+        'flip_rate': flips / pairs if pairs else 0.0,
+        'max_error': max(errors) if errors else 0.0,
+        'mean_error': sum(errors) / pairs if pairs else 0.0,
+        'flips_within_margin': by_margin,
+    }
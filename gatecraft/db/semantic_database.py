@@ -1,27 +1,130 @@
+from gatecraft.db.embedding_cache import EmbeddingCache
+from gatecraft.db.sharded_vector_store import ShardedVectorStore
+from gatecraft.db.similarity import normalize, similarity
+from gatecraft.utils.instrumentation import count, instrumented, span
+
+
 class SemanticDatabase(metaclass=type):
     """
     Manages semantic operations using the vector store.
+
+    Texts are embedded by embedding_provider when one is given, and by the
+    vector store's own embed methods otherwise. Embeddings are normalized
+    once before they are cached, so similarities are plain dot products.
+
+    A quantized cache only changes the vectors used by the policy. Callers
+    that send vectors to the vector store (upserts and queries) ask for
+    full_precision ones, which a quantized cache can't give back, so those
+    texts are embedded again.
     """
 
-    def __init__(self, vector_store, similarity_threshold=0.85):
+    def __init__(self, vector_store, similarity_threshold=0.85, embedding_cache=None,
+                 embedding_dispatcher=None, embedding_provider=None):
         self.vector_store = vector_store
         self.similarity_threshold = similarity_threshold
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        self.embedding_dispatcher = embedding_dispatcher
+        self.embedding_provider = embedding_provider
+        self.embedder = embedding_provider if embedding_provider is not None else vector_store
+        self.embedding_model = getattr(self.embedder, 'embedding_model', None) or type(self.embedder).__name__
+
+    @instrumented('semantic_db.get_embedding')
+    def get_embedding(self, data, full_precision=False):
+        # Serve from the content-addressed cache before calling the embedder
+        key = self.embedding_cache.make_key(self.embedding_model, data)
+        embedding = self._cached(key, full_precision)
+        if embedding is None:
+            count('embedding_cache.misses')
+            with span('embedder.embed'):
+                if self.embedding_dispatcher is not None:
+                    embedding = self.embedding_dispatcher.embed(data)
+                else:
+                    embedding = self.embedder.embed(data)
+            embedding = self._put(key, embedding, full_precision)
+        return embedding
+
+    async def aget_embedding(self, data, full_precision=False):
+        key = self.embedding_cache.make_key(self.embedding_model, data)
+        embedding = self._cached(key, full_precision)
+        if embedding is None:
+            if self.embedding_dispatcher is not None:
+                embedding = await self.embedding_dispatcher.aembed(data)
+            else:
+                embedding = await self.embedder.aembed(data)
+            embedding = self._put(key, embedding, full_precision)
+        return embedding
+
+    def get_embeddings(self, data_list, full_precision=False):
+        # Only the texts missing from the cache are sent to the embedder
+        keys = [self.embedding_cache.make_key(self.embedding_model, data) for data in data_list]
+        embeddings = [self._cached(key, full_precision) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh = self.embedder.embed_batch([data_list[i] for i in missing])
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = self._put(keys[i], embedding, full_precision)
+        return embeddings
+
+    def _cached(self, key, full_precision):
+        if full_precision and self.embedding_cache.quantization is not None:
+            return None
+        return self.embedding_cache.get(key)
 
-    def get_embedding(self, data):
-        return self.vector_store.embed(data)
+    def _put(self, key, embedding, full_precision):
+        # The cache keeps (and returns) its quantized copy of the vector
+        embedding = normalize(embedding)
+        cached = self.embedding_cache.put(key, embedding)
+        return embedding if full_precision else cached
+
+    def discard_embedding(self, data):
+        """Drops the cached embedding of data."""
+        self.embedding_cache.discard(self.embedding_cache.make_key(self.embedding_model, data))
 
     def compute_similarity(self, embedding1, embedding2):
+        # Quantized embeddings are compared without dequantizing them
+        if self.embedding_cache.quantization is not None:
+            return similarity(embedding1, embedding2)
         return self.vector_store.similarity(embedding1, embedding2)
 
-    def store_embedding(self, id, embedding):
-        return self.vector_store.upsert(id, embedding)
+    @instrumented('semantic_db.store_embedding')
+    def store_embedding(self, id, embedding, tenant=None, metadata=None):
+        return self.vector_store.upsert(id, embedding, **self._routing(tenant=tenant, metadata=metadata))
+
+    def store_embeddings(self, items, tenant=None):
+        return self.vector_store.upsert_batch(items, **self._routing(tenant=tenant))
+
+    def delete_embeddings(self, ids, tenant=None):
+        return self.vector_store.delete(ids, **self._routing(tenant=tenant))
+
+    def fetch_embeddings(self, ids, tenant=None):
+        """Returns the stored vectors of ids from the vector store, by id."""
+        return self.vector_store.fetch(ids, **self._routing(tenant=tenant))
 
-    def query_similar(self, embedding, top_k=1):
-        matches = self.vector_store.query(embedding, top_k)
+    @instrumented('semantic_db.query_similar')
+    def query_similar(self, embedding, top_k=1, tenants=None, filter=None):
+        matches = self.vector_store.query(embedding, top_k, **self._routing(tenants=tenants, filter=filter))
+        return self._filter_matches(matches)
+
+    async def aquery_similar(self, embedding, top_k=1, tenants=None, filter=None):
+        matches = await self.vector_store.aquery(embedding, top_k, **self._routing(tenants=tenants, filter=filter))
+        return self._filter_matches(matches)
+
+    def _routing(self, **routing):
+        # Options are only passed when set, for stores that don't support them;
+        # only sharded stores know about tenants
+        routing = {name: value for name, value in routing.items() if value is not None}
+        if ('tenant' in routing or 'tenants' in routing) and not isinstance(self.vector_store, ShardedVectorStore):
+            raise ValueError("Tenants need a ShardedVectorStore.")
+        return routing
+
+    def _filter_matches(self, matches):
         # Adjusted to work with the vector store's response format
         filtered_matches = [
             {'id': match['id'], 'score': match['score']}
             for match in matches if match['score'] >= self.similarity_threshold
         ]
         return filtered_matches
-    
\ No newline at end of file
+
+    def cache_stats(self):
+        """Get hit/miss/eviction counters of the embedding cache"""
+        return self.embedding_cache.stats()
@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class ShardedVectorStore(VectorStoreInterface):
+    """
+    Routes vectors to per-tenant shards.
+
+    Every tenant is assigned to one of the base stores by a stable hash of
+    its name and gets its own namespace there (see for_namespace), so a query
+    for one tenant only searches that tenant's vectors. Queries spanning
+    several tenants run on their shards in parallel and the matches are
+    merged into one top_k. With a single base store this is one namespace
+    per tenant; with several, tenants are hash-sharded across indexes.
+    Vectors without a tenant go to the default namespace of their base store.
+    Namespaces written by earlier processes are discovered from the base
+    stores (see namespaces()) the first time every shard is needed.
+    """
+
+    def __init__(self, stores, max_workers=8):
+        self.stores = list(stores) if isinstance(stores, (list, tuple)) else [stores]
+        if not self.stores:
+            raise ValueError("ShardedVectorStore needs at least one store.")
+        self.max_workers = max_workers
+        self.shards = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._discovered = False
+
+    @property
+    def embedding_model(self):
+        return getattr(self.stores[0], 'embedding_model', None)
+
+    @property
+    def embedding_provider(self):
+        return getattr(self.stores[0], 'embedding_provider', None)
+
+    @property
+    def dimension(self):
+        return getattr(self.stores[0], 'dimension', None)
+
+    def shard_for(self, tenant):
+        """Returns the store holding the vectors of tenant."""
+        shard = self.shards.get(tenant)
+        if shard is None:
+            with self._lock:
+                shard = self.shards.get(tenant)
+                if shard is None:
+                    base = self.stores[_stable_hash(tenant) % len(self.stores)]
+                    shard = self.shards[tenant] = base.for_namespace(tenant)
+        return shard
+
+    def embed(self, data):
+        return self.stores[0].embed(data)
+
+    def embed_batch(self, data_list):
+        return self.stores[0].embed_batch(data_list)
+
+    async def aembed(self, data):
+        return await self.stores[0].aembed(data)
+
+    def upsert(self, id, vector, metadata=None, tenant=None):
+        if metadata is None:
+            self.shard_for(tenant).upsert(id, vector)
+        else:
+            self.shard_for(tenant).upsert(id, vector, metadata)
+
+    def upsert_batch(self, items, tenant=None):
+        self.shard_for(tenant).upsert_batch(items)
+
+    async def aupsert(self, id, vector, metadata=None, tenant=None):
+        await self.shard_for(tenant).aupsert(id, vector, metadata)
+
+    def query(self, vector, top_k=1, tenants=None, filter=None):
+        """
+        Returns the top_k matches over the shards of tenants, or over every
+        shard in use when tenants is None. filter is applied by every shard.
+        """
+        shards = self._shards(tenants)
+        options = {} if filter is None else {'filter': filter}
+        if len(shards) == 1:
+            return list(shards[0].query(vector, top_k, **options))
+        results = self._get_executor().map(lambda shard: shard.query(vector, top_k, **options), shards)
+        return _merge(results, top_k)
+
+    async def aquery(self, vector, top_k=1, tenants=None, filter=None):
+        shards = self._shards(tenants)
+        results = await asyncio.gather(*(shard.aquery(vector, top_k, filter) for shard in shards))
+        return _merge(results, top_k)
+
+    def delete(self, ids, tenant=None):
+        """Deletes ids from the shard of tenant; a None tenant is the default namespace."""
+        self.shard_for(tenant).delete(ids)
+
+    def fetch(self, ids, tenant=None):
+        return self.shard_for(tenant).fetch(ids)
+
+    def describe_index_stats(self):
+        """Statistics of every shard, keyed by tenant, plus the total."""
+        self._discover()
+        tenants = list(self.shards)
+        stats = list(self._get_executor().map(lambda tenant: self.shards[tenant].describe_index_stats(), tenants))
+        return {
+            'total_vector_count': sum(shard_stats['total_vector_count'] for shard_stats in stats),
+            'shards': dict(zip(tenants, stats)),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    async def aclose(self):
+        # Namespace views may hold their own sessions
+        stores = {id(store): store for store in [*self.stores, *self.shards.values()]}
+        for store in stores.values():
+            await store.aclose()
+        self.close()
+
+    def _discover(self):
+        # Registers the shards of namespaces this process hasn't touched yet
+        if self._discovered:
+            return
+        self.shard_for(None)
+        found = [(store, namespace) for store in self.stores for namespace in store.namespaces()]
+        with self._lock:
+            for store, namespace in found:
+                if not any(tenant is not None and str(tenant) == str(namespace) for tenant in self.shards):
+                    self.shards[namespace] = store.for_namespace(namespace)
+            self._discovered = True
+
+    def _shards(self, tenants):
+        if tenants is None:
+            self._discover()
+            shards = list(self.shards.values())
+        else:
+            shards = [self.shard_for(tenant) for tenant in tenants]
+        # Namespaces that resolve to the same store are only queried once
+        return list({id(shard): shard for shard in shards}.values()) or [self.shard_for(None)]
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='gatecraft-shard')
+            return self._executor
+
+
+def _stable_hash(tenant):
+    # Python's hash() of strings changes between processes
+    return zlib.crc32(repr(tenant).encode('utf-8'))
+
+
+def _merge(results, top_k):
+    return heapq.nlargest(top_k, (match for matches in results for match in matches),
+                          key=lambda match: match['score'])
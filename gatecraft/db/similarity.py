@@ -0,0 +1,86 @@
+import weakref
+
+import numpy as np
+
+# Arrays known to have unit norm, by id; entries go away with the arrays
+_unit_vectors = {}
+
+
+def normalize(vector):
+    """
+    Returns vector scaled to unit norm, read-only and tagged as unit-norm so
+    that similarity() can skip the norms. Floating-point vectors keep their
+    dtype, others become float64. Zero vectors are returned unscaled and
+    untagged.
+    """
+    vector = np.asarray(vector)
+    if not np.issubdtype(vector.dtype, np.floating):
+        vector = vector.astype(np.float64)
+    norm = np.linalg.norm(vector.astype(np.float64, copy=False))
+    if norm == 0 or not np.isfinite(norm):
+        return vector
+    unit = (vector / norm).astype(vector.dtype, copy=False)
+    return mark_unit(unit)
+
+
+def normalize_rows(matrix):
+    """Row-wise normalize(); zero rows stay zero. The result is tagged."""
+    matrix = np.asarray(matrix)
+    if not np.issubdtype(matrix.dtype, np.floating):
+        matrix = matrix.astype(np.float64)
+    norms = np.linalg.norm(matrix.astype(np.float64, copy=False), axis=-1, keepdims=True)
+    unit = (matrix / np.where(norms == 0, 1.0, norms)).astype(matrix.dtype, copy=False)
+    return mark_unit(unit)
+
+
+def mark_unit(array):
+    """Tags an array as unit-norm (row-wise for matrices) and makes it read-only."""
+    array.setflags(write=False)
+    key = id(array)
+    _unit_vectors[key] = weakref.ref(array, lambda _, key=key: _unit_vectors.pop(key, None))
+    return array
+
+
+def is_unit(array):
+    reference = _unit_vectors.get(id(array))
+    return reference is not None and reference() is array
+
+
+def similarity(vector1, vector2):
+    """
+    Cosine similarity of two vectors. Two unit-norm tagged vectors cost a
+    single dot product; int8 codes are multiplied in integer arithmetic.
+    Returns 0.0 if either vector is zero.
+    """
+    if is_unit(vector1) and is_unit(vector2):
+        return float(np.dot(vector1, vector2))
+
+    vector1 = np.asarray(vector1)
+    vector2 = np.asarray(vector2)
+    if vector1.dtype == np.int8 and vector2.dtype == np.int8:
+        vector1 = vector1.astype(np.int64)
+        vector2 = vector2.astype(np.int64)
+    else:
+        vector1 = vector1.astype(np.float64, copy=False)
+        vector2 = vector2.astype(np.float64, copy=False)
+    norm_product = np.sqrt(float(np.dot(vector1, vector1)) * float(np.dot(vector2, vector2)))
+    if norm_product == 0:
+        return 0.0
+    return float(np.dot(vector1, vector2)) / norm_product
+
+
+def similarity_many(query, matrix, unit_rows=None):
+    """
+    Cosine similarities of query to every row of matrix, with one matrix-vector
+    product. unit_rows tells whether the rows are already unit-norm and
+    defaults to whether matrix is tagged; zero rows score 0.
+    """
+    if unit_rows is None:
+        unit_rows = is_unit(matrix)
+    if not unit_rows:
+        matrix = normalize_rows(matrix)
+    if not is_unit(query):
+        query = normalize(query)
+    if len(matrix) == 0:
+        return np.zeros(0, dtype=np.float64)
+    return matrix @ query.astype(matrix.dtype, copy=False)
@@ -1,11 +1,83 @@
+from gatecraft.db.similarity import similarity
+from gatecraft.utils.aio import run_sync
+
+
 class VectorStoreInterface(metaclass=type):
     """
     Interface for vector store implementations.
+
+    Vectors may carry a metadata dict, and queries may pass a metadata filter
+    in the Pinecone filter language (see metadata_filter.matches_filter).
     """
 
     def embed(self, data):
         raise NotImplementedError("embed method must be implemented.")
 
+    def embed_batch(self, data_list):
+        # Stores with a batched embedding endpoint should override this
+        return [self.embed(data) for data in data_list]
+
+    def upsert(self, id, vector, metadata=None):
+        raise NotImplementedError("upsert method must be implemented.")
+
+    def upsert_batch(self, items):
+        # Items are (id, vector) or (id, vector, metadata); stores with a bulk
+        # write endpoint should override this
+        for id, vector, *metadata in items:
+            self.upsert(id, vector, *metadata)
+
+    def query(self, vector, top_k=1, filter=None):
+        raise NotImplementedError("query method must be implemented.")
+
+    def delete(self, ids):
+        raise NotImplementedError("delete method must be implemented.")
+
+    def fetch(self, ids):
+        # Returns a dict of the stored vectors of the ids that exist
+        raise NotImplementedError("fetch method must be implemented.")
+
+    def for_namespace(self, namespace):
+        """
+        Returns a store for the given namespace of the same backend, whose
+        vectors are kept apart from those of other namespaces.
+        """
+        if namespace is None:
+            return self
+        raise NotImplementedError(f"{type(self).__name__} doesn't support namespaces.")
+
+    def namespaces(self):
+        """
+        Returns the namespaces (other than the default one) that hold vectors
+        in the backend, including those written by earlier processes.
+        """
+        return []
+
+    def describe_index_stats(self):
+        raise NotImplementedError("describe_index_stats method must be implemented.")
+
     def similarity(self, vector1, vector2):
-        raise NotImplementedError("similarity method must be implemented.") 
-    
\ No newline at end of file
+        # Cosine similarity with the shared kernel; override for other metrics
+        return similarity(vector1, vector2)
+
+    # Async counterparts run the blocking methods in the default executor;
+    # stores with non-blocking clients should override them
+
+    async def aembed(self, data):
+        return await run_sync(self.embed, data)
+
+    async def aembed_batch(self, data_list):
+        return await run_sync(self.embed_batch, data_list)
+
+    async def aupsert(self, id, vector, metadata=None):
+        if metadata is None:
+            return await run_sync(self.upsert, id, vector)
+        return await run_sync(self.upsert, id, vector, metadata)
+
+    async def aquery(self, vector, top_k=1, filter=None):
+        if filter is None:
+            return await run_sync(self.query, vector, top_k)
+        return await run_sync(self.query, vector, top_k, filter)
+
+    async def aclose(self):
+        pass
+    
@@ -1,80 +1,491 @@
+import asyncio
+import math
 import os
-import openai  # Import OpenAI library
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from .core.user import User
-from .core.role import Role
+from .core.role import Role, RoleRegistry
 from .core.entity import Entity
+from .core.entity_store import EntityStore, content_hash
 from .core.policy import AccessControlPolicy
+from .core.audit import audit_access
+from .core.snapshot import load_snapshot, save_snapshot
+from .db.quantization import threshold_flip_report
 from .db.semantic_database import SemanticDatabase
-from .db.pinecone_vector_store import PineconeVectorStore
+from .utils.conditions import AndCondition, NotCondition, OrCondition
 from .utils.semantic_condition import SemanticCondition
-from dotenv import load_dotenv
+from .utils.batching import IngestionStats, chunked, estimate_tokens, token_budget_batches
 
 class Gatecraft:
-    def __init__(self, vector_store=None, similarity_threshold=0.85):
-        load_dotenv()  # Load environment variables
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        print(os.getenv('PINECONE_API_KEY'))
-        print(os.getenv('PINECONE_ENVIRONMENT'))
-
+    def __init__(self, vector_store=None, similarity_threshold=0.85, embedding_cache=None,
+                 access_index=None, embedding_dispatcher=None, entity_store=None,
+                 decision_cache=None, embedding_provider=None):
         if vector_store is None:
+            # The default backend and its credentials are only loaded when used
+            from dotenv import load_dotenv
+            from .db.pinecone_vector_store import PineconeVectorStore
+
+            load_dotenv()  # Load environment variables
+
             # Initialize default vector store
             self.vector_store = PineconeVectorStore(
                 api_key=os.getenv('PINECONE_API_KEY'),
                 environment=os.getenv('PINECONE_ENVIRONMENT'),
-                index_name=os.getenv('PINECONE_INDEX_NAME', 'default-index')
+                index_name=os.getenv('PINECONE_INDEX_NAME', 'default-index'),
+                openai_api_key=os.getenv('OPENAI_API_KEY'),
+                embedding_provider=embedding_provider
             )
         else:
             self.vector_store = vector_store
 
-        self.semantic_db = SemanticDatabase(self.vector_store, similarity_threshold)
-        self.policy = AccessControlPolicy(self.semantic_db)
+        if embedding_provider is None:
+            embedding_provider = getattr(self.vector_store, 'embedding_provider', None)
+        self.semantic_db = SemanticDatabase(self.vector_store, similarity_threshold, embedding_cache,
+                                            embedding_dispatcher, embedding_provider)
+        self.policy = AccessControlPolicy(self.semantic_db, access_index)
         self.users = {}
         self.roles = {}
-        self.entities = {}
+        self.role_registry = RoleRegistry()
+        self.entities = entity_store if entity_store is not None else EntityStore()
+        self.decision_cache = decision_cache
+        # Vector store ids of the entities, and the tenant of entities that have one
+        self._vector_entities = {}
+        self._entity_tenants = {}
         
+    def save(self, path, reembed=False):
+        """
+        Writes users, roles, conditions, entities, embeddings and the access
+        index to a snapshot file that load() can restore without embedding.
+        Embeddings evicted from the cache are read back from the vector store;
+        if it can't return them, saving fails unless reembed is set.
+        """
+        save_snapshot(self, path, reembed=reembed)
+
+    @classmethod
+    def load(cls, path, vector_store=None, upsert_vectors=False, **kwargs):
+        """
+        Restores a Gatecraft written by save(). Embeddings are memory-mapped
+        from the snapshot; set upsert_vectors to also write the entity vectors
+        to vector_store (e.g. an empty LocalVectorStore). Other keyword
+        arguments are passed to the constructor.
+        """
+        return load_snapshot(cls(vector_store=vector_store, **kwargs), path, upsert_vectors=upsert_vectors)
+
     def create_user(self, user_id, name):
-        user = User(user_id, name)
+        user = User(user_id, name, self.role_registry)
         self.users[user_id] = user
         return user
     
     def create_role(self, role_id, name, condition=None):
-        role = Role(role_id, name)
+        role = Role(role_id, name, self.role_registry)
         if condition:
             role.add_condition(condition)
+            self.policy.index_condition(condition, self.entities.values())
         self.roles[role_id] = role
         return role
     
     def assign_role(self, user, role):
         user.add_role(role)
     
-    def add_entity(self, entity_id, data):
-        entity = Entity(entity_id, data)
+    def add_entity(self, entity_id, data, tenant=None, metadata=None):
+        entity = Entity(entity_id, data, metadata)
         self.entities[entity_id] = entity
-        embedding = self.semantic_db.get_embedding(data)
-        self.semantic_db.store_embedding(f"entity_{entity_id}", embedding)
+        embedding = self.semantic_db.get_embedding(data, full_precision=True)
+        self.semantic_db.store_embedding(self._vector_id(entity_id, tenant), embedding, tenant=tenant,
+                                         metadata=entity.metadata_or_none)
+        self.policy.index_entities([entity])
         return entity
 
+    def add_entities(self, entities, max_batch_tokens=60000, max_batch_size=256,
+                     max_workers=4, upsert_batch_size=100, progress=None, tenant=None):
+        """
+        Adds many entities from an iterable of (entity_id, data) pairs or
+        (entity_id, data, metadata) triples.
+
+        Texts are grouped into token-budgeted embedding batches, up to max_workers
+        batches are embedded concurrently, and vectors are upserted in chunks of
+        upsert_batch_size. The input is consumed lazily, so it can be a generator.
+        With a ShardedVectorStore, tenant routes all of them to that tenant's shard.
+        progress, if given, is called with the IngestionStats after every batch.
+        """
+        stats = IngestionStats()
+        batches = token_budget_batches(entities, max_batch_tokens, max_batch_size,
+                                       text=lambda item: item[1])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for batch in batches:
+                future = executor.submit(self.semantic_db.get_embeddings, [item[1] for item in batch],
+                                         full_precision=True)
+                pending.append((batch, future))
+                # Bound the number of batches in flight
+                if len(pending) >= max_workers:
+                    self._store_batch(*pending.popleft(), upsert_batch_size, stats, progress, tenant)
+            while pending:
+                self._store_batch(*pending.popleft(), upsert_batch_size, stats, progress, tenant)
+
+        stats.finish()
+        return stats
+
+    def _store_batch(self, batch, future, upsert_batch_size, stats, progress, tenant):
+        embeddings = future.result()
+        items = []
+        entities = []
+        for (entity_id, data, *metadata), embedding in zip(batch, embeddings):
+            entity = Entity(entity_id, data, *metadata)
+            self.entities[entity_id] = entity
+            entities.append(entity)
+            vector_id = self._vector_id(entity_id, tenant)
+            # Metadata is only sent along when there is some
+            metadata = entity.metadata_or_none
+            items.append((vector_id, embedding, metadata) if metadata else (vector_id, embedding))
+        for chunk in chunked(items, upsert_batch_size):
+            self.semantic_db.store_embeddings(chunk, tenant=tenant)
+        self.policy.index_entities(entities)
+
+        stats.record_batch(len(batch), sum(estimate_tokens(item[1]) for item in batch))
+        if progress is not None:
+            progress(stats)
+
+    def upsert_entities(self, entities, tenant=None, delete_missing=False, **ingestion):
+        """
+        Synchronizes entities from an iterable of (entity_id, data) pairs or
+        (entity_id, data, metadata) triples.
+
+        Entities whose text has the same content hash as the stored one (and
+        the same tenant and metadata) are skipped. New and changed entities
+        are embedded and stored like add_entities, to which the ingestion
+        keyword arguments are passed; the cached embedding of a changed text is
+        dropped and its access verdicts are recomputed. With delete_missing, the tenant's
+        entities that are not in the input are deleted. An id repeated in the
+        input is counted once as added; later occurrences with other content
+        count as changed and the last one wins. Returns the number of added,
+        changed, unchanged and deleted entities.
+        """
+        summary = dict.fromkeys(('added', 'changed', 'unchanged', 'deleted'), 0)
+        seen = set()
+        # Content of the entities yielded so far, whose stored copy may lag
+        # behind while their batch is being embedded
+        yielded = {}
+
+        def pending():
+            for item in entities:
+                entity_id, data = item[0], item[1]
+                seen.add(entity_id)
+                # Entities keep empty metadata as None
+                metadata = (item[2] if len(item) > 2 else None) or None
+                content = (content_hash(data), metadata)
+                if entity_id in yielded:
+                    # A repeated id: the last occurrence wins
+                    if yielded[entity_id] == content:
+                        summary['unchanged'] += 1
+                        continue
+                    summary['changed'] += 1
+                    yielded[entity_id] = content
+                    yield item
+                    continue
+                if entity_id not in self.entities:
+                    summary['added'] += 1
+                    yielded[entity_id] = content
+                    yield item
+                    continue
+                same_text = self.entities.text_hash(entity_id) == content[0]
+                if (same_text and self._entity_tenants.get(entity_id) == tenant
+                        and self.entities.metadata(entity_id) == metadata):
+                    summary['unchanged'] += 1
+                    continue
+                summary['changed'] += 1
+                if not same_text:
+                    self.semantic_db.discard_embedding(self.entities[entity_id].data)
+                yielded[entity_id] = content
+                yield item
+
+        self.add_entities(pending(), tenant=tenant, **ingestion)
+        if delete_missing:
+            missing = [
+                entity_id for entity_id in self.entities
+                if entity_id not in seen and self._entity_tenants.get(entity_id) == tenant
+            ]
+            summary['deleted'] = self.delete_entities(missing)['deleted']
+        return summary
+
+    def delete_entities(self, entity_ids):
+        """
+        Deletes entities with their vectors, cached embeddings and access
+        verdicts. Vectors are deleted in batches per tenant; unknown ids are
+        ignored. Returns the number of deleted entities.
+        """
+        vector_ids = {}
+        deleted = 0
+        for entity_id in entity_ids:
+            if entity_id not in self.entities:
+                continue
+            self.semantic_db.discard_embedding(self.entities[entity_id].data)
+            vector_id = self._vector_id_of(entity_id)
+            self._vector_entities.pop(vector_id, None)
+            vector_ids.setdefault(self._entity_tenants.pop(entity_id, None), []).append(vector_id)
+            self.policy.remove_entity(entity_id)
+            del self.entities[entity_id]
+            deleted += 1
+
+        for tenant, ids in vector_ids.items():
+            self.semantic_db.delete_embeddings(ids, tenant=tenant)
+        return {'deleted': deleted}
+
     def is_access_allowed(self, user, entity_id):
+        if entity_id not in self.entities:
+            return False
+        if self.decision_cache is None:
+            return self.policy.is_access_allowed(user, self.entities[entity_id])
+
+        key, version = self._decision_key(user, entity_id)
+        allowed = self.decision_cache.get(key, version)
+        if allowed is None:
+            allowed = self.policy.is_access_allowed(user, self.entities[entity_id])
+            self.decision_cache.put(key, version, allowed)
+        return allowed
+
+    def _decision_key(self, user, entity_id):
+        # Role membership, the conditions of the user's roles and entity
+        # content all version a decision
+        roles = tuple(role.version for role in user.get_roles())
+        version = (user.role_bits, roles, self.entities.version(entity_id))
+        return (user.user_id, entity_id), version
+
+    async def ais_access_allowed(self, user, entity_id):
+        """
+        Async counterpart of is_access_allowed. The embeddings the check needs
+        (entity text and condition terms) are fetched concurrently, then the
+        policy is evaluated against the warm cache.
+        """
         entity = self.entities.get(entity_id)
         if not entity:
             return False
-        return self.policy.is_access_allowed(user, entity)
+        if self.decision_cache is not None:
+            key, version = self._decision_key(user, entity_id)
+            allowed = self.decision_cache.get(key, version)
+            if allowed is not None:
+                return allowed
+
+        pending = [
+            semantic for role in user.get_roles() for condition in role.get_conditions()
+            for semantic in self._unmaterialized_semantic(condition, entity)
+        ]
+        if pending:
+            terms = {condition.term for condition in pending if condition.term_embedding is None}
+            texts = list(dict.fromkeys([entity.data] + sorted(terms)))
+            embeddings = await asyncio.gather(*(self.semantic_db.aget_embedding(text) for text in texts))
+            term_embeddings = dict(zip(texts, embeddings))
+            for condition in pending:
+                if condition.term_embedding is None:
+                    condition.term_embedding = term_embeddings[condition.term]
+
+        allowed = self.policy.is_access_allowed(user, entity)
+        if self.decision_cache is not None:
+            self.decision_cache.put(key, version, allowed)
+        return allowed
+
+    def _unmaterialized_semantic(self, condition, entity):
+        # Semantic conditions, also nested in And / Or / Not, that evaluating
+        # condition for entity may need to embed
+        if self.policy.is_materialized(condition, entity):
+            return
+        if isinstance(condition, SemanticCondition):
+            yield condition
+        elif isinstance(condition, (AndCondition, OrCondition)):
+            for part in condition.conditions:
+                yield from self._unmaterialized_semantic(part, entity)
+        elif isinstance(condition, NotCondition):
+            yield from self._unmaterialized_semantic(condition.condition, entity)
+
+    def is_access_allowed_many(self, user, entity_ids):
+        entity_ids = list(entity_ids)
+        entities = [self.entities.get(entity_id) for entity_id in entity_ids]
+        known = [entity for entity in entities if entity]
+        verdicts = iter(self.policy.is_access_allowed_many(user, known))
+        return [next(verdicts) if entity else False for entity in entities]
+
+    def audit_access(self, users=None, entities=None, max_workers=None, shard_size=4096, output=None):
+        """
+        Computes the full users x entities access matrix, sharding the entities
+        across a process pool. users defaults to every user and entities (a list
+        of entity ids) to every entity. Returns an AccessAuditResult; if output
+        is a .csv or .parquet path the allowed pairs are also streamed there.
+        """
+        users = list(self.users.values()) if users is None else list(users)
+        entity_ids = list(self.entities) if entities is None else list(entities)
+        known = [self.entities.get(entity_id) for entity_id in entity_ids]
+        return audit_access(self.policy, users, [entity for entity in known if entity],
+                            max_workers=max_workers, shard_size=shard_size, output=output)
+
+    def quantization_report(self, mode='int8', sample_size=1000, seed=0):
+        """
+        Estimates how many semantic condition verdicts would flip if embeddings
+        were stored quantized to mode ('float16' or 'int8'), over a sample of
+        up to sample_size entities. The comparison needs full-precision
+        vectors, so if the embedding cache is already quantized the sample and
+        the condition terms are embedded again.
+        """
+        entity_ids = list(self.entities)
+        if len(entity_ids) > sample_size:
+            entity_ids = random.Random(seed).sample(entity_ids, sample_size)
+        texts = [self.entities[entity_id].data for entity_id in entity_ids]
+        conditions = list({
+            id(condition): condition for role in self.roles.values() for condition in role.get_conditions()
+            if isinstance(condition, SemanticCondition)
+        }.values())
+        terms = sorted({condition.term for condition in conditions})
+
+        if self.semantic_db.embedding_cache.quantization is None:
+            embeddings = self.semantic_db.get_embeddings(texts)
+            term_embeddings = dict(zip(terms, self.semantic_db.get_embeddings(terms)))
+        else:
+            embedder = self.semantic_db.embedder
+            embeddings = embedder.embed_batch(texts) if texts else []
+            term_embeddings = dict(zip(terms, embedder.embed_batch(terms) if terms else []))
+        return threshold_flip_report(conditions, embeddings, mode, term_embeddings)
 
     def add_condition_to_role(self, role, condition):
-        role.add_condition(condition) 
+        role.add_condition(condition)
+        self.policy.index_condition(condition, self.entities.values())
 
-    def retrieve_entities(self, query, top_k=1):
+    def retrieve_entities(self, query, top_k=1, tenants=None, filter=None):
         # Get the embedding for the query
-        query_embedding = self.semantic_db.get_embedding(query)
+        query_embedding = self.semantic_db.get_embedding(query, full_precision=True)
         
         # Query the vector store for similar entities
-        matches = self.semantic_db.query_similar(query_embedding, top_k=top_k)
+        matches = self.semantic_db.query_similar(query_embedding, top_k=top_k, tenants=tenants,
+                                                 filter=self._metadata_filter(filter))
         
         # Retrieve the matching entities
+        return self._entities_from_matches(matches)
+
+    async def aretrieve_entities(self, query, top_k=1, tenants=None, filter=None):
+        query_embedding = await self.semantic_db.aget_embedding(query, full_precision=True)
+        matches = await self.semantic_db.aquery_similar(query_embedding, top_k=top_k, tenants=tenants,
+                                                        filter=self._metadata_filter(filter))
+        return self._entities_from_matches(matches)
+
+    async def aclose(self):
+        await self.vector_store.aclose()
+        provider = self.semantic_db.embedding_provider
+        # A provider owned by the vector store was closed with it
+        if provider is not None and provider is not getattr(self.vector_store, 'embedding_provider', None):
+            await provider.aclose()
+
+    def retrieve_accessible_entities(self, user, query, top_k=1, overfetch=4,
+                                     max_rounds=3, max_fetch=10000, tenants=None, filter=None):
+        """
+        Retrieves the top_k entities most similar to query that the user is
+        allowed to access, in rank order.
+
+        The vector store is asked for overfetch * top_k candidates, which are
+        authorized in one batch. If too few are accessible, the next request is
+        widened according to the acceptance rate observed so far, for at most
+        max_rounds round trips. tenants restricts the search to the shards of
+        those tenants when the vector store is a ShardedVectorStore, and filter
+        (a metadata filter dict or a condition with to_filter()) to the
+        entities whose metadata matches it.
+        """
+        filter = self._metadata_filter(filter)
+        query_embedding = self.semantic_db.get_embedding(query, full_precision=True)
+        accessible = []
+        checked = set()
+        fetch_k = min(top_k * overfetch, max_fetch)
+
+        for _ in range(max_rounds):
+            matches = self.semantic_db.query_similar(query_embedding, top_k=fetch_k, tenants=tenants,
+                                                     filter=filter)
+            candidates = [
+                entity for entity in self._entities_from_matches(matches)
+                if entity.entity_id not in checked
+            ]
+            checked.update(entity.entity_id for entity in candidates)
+            verdicts = self.policy.is_access_allowed_many(user, candidates)
+            accessible.extend(entity for entity, allowed in zip(candidates, verdicts) if allowed)
+
+            # A short page means the store has no further qualifying matches
+            if len(accessible) >= top_k or len(matches) < fetch_k or fetch_k >= max_fetch:
+                break
+
+            missing = top_k - len(accessible)
+            acceptance = len(accessible) / len(checked) if checked else 0.0
+            if acceptance > 0:
+                wanted = fetch_k + math.ceil(missing / acceptance * 1.5)
+            else:
+                wanted = fetch_k * overfetch
+            fetch_k = min(max(wanted, fetch_k * 2), max_fetch)
+
+        return accessible[:top_k]
+
+    def iter_retrieve(self, user, query, page_size=10, max_fetch=10000, tenants=None, filter=None):
+        """
+        Yields (entity, score) pairs for the entities matching query that the
+        user may access, in rank order.
+
+        Each candidate is authorized just before it is yielded, and a further
+        page (twice as large, up to max_fetch) is only requested from the
+        vector store once the current one is exhausted, so no embedding,
+        similarity or query work happens after the consumer stops iterating.
+        """
+        filter = self._metadata_filter(filter)
+        query_embedding = self.semantic_db.get_embedding(query, full_precision=True)
+        seen = set()
+        fetch_k = min(page_size, max_fetch)
+
+        while True:
+            matches = self.semantic_db.query_similar(query_embedding, top_k=fetch_k, tenants=tenants,
+                                                     filter=filter)
+            for match in matches:
+                if match['id'] in seen:
+                    continue
+                seen.add(match['id'])
+                entity = self._entity_from_match(match)
+                if entity and self.policy.is_access_allowed(user, entity):
+                    yield entity, match['score']
+
+            # A short page means the store has no further qualifying matches
+            if len(matches) < fetch_k or fetch_k >= max_fetch:
+                return
+            fetch_k = min(fetch_k * 2, max_fetch)
+
+    def _metadata_filter(self, filter):
+        # Conditions are translated into the vector store filter language
+        if filter is None or isinstance(filter, dict):
+            return filter
+        translated = filter.to_filter()
+        if translated is None:
+            raise ValueError(f"{type(filter).__name__} can't be turned into a metadata filter.")
+        return translated
+
+    def _vector_id_of(self, entity_id):
+        return f"entity_{entity_id}"
+
+    def _vector_id(self, entity_id, tenant=None):
+        # Registers the vector store id of an entity and remembers its tenant
+        vector_id = self._vector_id_of(entity_id)
+        previous = self._entity_tenants.get(entity_id)
+        if vector_id in self._vector_entities and previous != tenant:
+            # The entity moves to another tenant's shard
+            self.semantic_db.delete_embeddings([vector_id], tenant=previous)
+        self._vector_entities[vector_id] = entity_id
+        if tenant is None:
+            self._entity_tenants.pop(entity_id, None)
+        else:
+            self._entity_tenants[entity_id] = tenant
+        return vector_id
+
+    def _entity_from_match(self, match):
+        entity_id = self._vector_entities.get(match['id'])
+        if entity_id is None:
+            return None
+        return self.entities.get(entity_id)
+
+    def _entities_from_matches(self, matches):
         entities = []
         for match in matches:
-            entity_id = int(match['id'].replace('entity_', ''))
-            entity = self.entities.get(entity_id)
+            entity = self._entity_from_match(match)
             if entity:
                 entities.append(entity)
         return entities
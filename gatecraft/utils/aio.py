@@ -0,0 +1,10 @@
+import asyncio
+import functools
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Runs a blocking function in the event loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,79 @@
+import time
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for budgeting requests (about four characters per token).
+    """
+    return max(1, len(text) // 4)
+
+
+def token_budget_batches(items, max_tokens, max_items, text=lambda item: item):
+    """
+    Lazily groups items into lists whose estimated token count stays within
+    max_tokens and whose length stays within max_items. An item larger than
+    the budget on its own is emitted as a single-item batch.
+    """
+    batch = []
+    batch_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(text(item))
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def chunked(items, size):
+    """
+    Splits a list into consecutive chunks of at most size items.
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class IngestionStats(metaclass=type):
+    """
+    Progress and throughput of a batch ingestion run.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.tokens = 0
+        self.batches = 0
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def record_batch(self, documents, tokens):
+        self.documents += documents
+        self.tokens += tokens
+        self.batches += 1
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def documents_per_second(self):
+        elapsed = self.elapsed
+        return self.documents / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_second(self):
+        elapsed = self.elapsed
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (
+            f"IngestionStats(documents={self.documents}, tokens={self.tokens}, "
+            f"batches={self.batches}, elapsed={self.elapsed:.2f}s, "
+            f"docs/s={self.documents_per_second:.1f}, tokens/s={self.tokens_per_second:.1f})"
+        )
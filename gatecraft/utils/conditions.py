@@ -1,8 +1,122 @@
+from gatecraft.db.metadata_filter import negate_filter
+
+
 class Condition(metaclass=type):
     """
     Abstract base class for conditions.
+
+    cost is the rough relative cost of deciding the condition for one entity:
+    conditions of cost 0 never need an embedding and are tried first.
+    Inverse conditions of a role only grant access when all of them hold.
+    """
+
+    cost = 1
+    inverse = False
+    # Whether the verdict depends on the user and not only on the entity
+    user_dependent = False
+
+    def evaluate(self, user, entity, database):
+        raise NotImplementedError("evaluate method must be implemented.")
+
+    def index_key(self):
+        # Conditions whose verdict depends only on the entity return a hashable,
+        # JSON-serializable key so their verdicts can be materialized
+        return None
+
+    def to_filter(self):
+        # Conditions decided by entity metadata alone return the equivalent
+        # vector store metadata filter (in the Pinecone filter language)
+        return None
+
+
+class _CompositeCondition(Condition):
+    # Shared by AndCondition and OrCondition; keys and filters follow the
+    # given order, evaluation goes cheapest first
+
+    kind = None
+
+    def __init__(self, *conditions):
+        if not conditions:
+            raise ValueError(f"{type(self).__name__} needs at least one condition.")
+        self.conditions = list(conditions)
+        self._ordered = sorted(conditions, key=_cost)
+
+    @property
+    def cost(self):
+        return sum(_cost(condition) for condition in self.conditions)
+
+    @property
+    def user_dependent(self):
+        return any(getattr(condition, 'user_dependent', False) for condition in self.conditions)
+
+    def index_key(self):
+        return _composite_key(self.kind, self.conditions)
+
+    def to_filter(self):
+        filters = [condition.to_filter() for condition in self.conditions]
+        if any(filter is None for filter in filters):
+            return None
+        return {f'${self.kind}': filters}
+
+
+class AndCondition(_CompositeCondition):
+    """
+    Holds if all of its conditions hold. Conditions are tried cheapest
+    first and evaluation stops at the first one that fails.
+    """
+
+    kind = 'and'
+
+    def evaluate(self, user, entity, database):
+        return all(condition.evaluate(user, entity, database) for condition in self._ordered)
+
+
+class OrCondition(_CompositeCondition):
+    """
+    Holds if any of its conditions holds. Conditions are tried cheapest
+    first and evaluation stops at the first one that holds.
+    """
+
+    kind = 'or'
+
+    def evaluate(self, user, entity, database):
+        return any(condition.evaluate(user, entity, database) for condition in self._ordered)
+
+
+class NotCondition(Condition):
     """
+    Holds if its condition doesn't.
+    """
+
+    def __init__(self, condition):
+        self.condition = condition
+
+    @property
+    def cost(self):
+        return _cost(self.condition)
+
+    @property
+    def user_dependent(self):
+        return getattr(self.condition, 'user_dependent', False)
 
     def evaluate(self, user, entity, database):
-        raise NotImplementedError("evaluate method must be implemented.") 
-    
\ No newline at end of file
+        return not self.condition.evaluate(user, entity, database)
+
+    def index_key(self):
+        return _composite_key('not', [self.condition])
+
+    def to_filter(self):
+        filter = self.condition.to_filter()
+        return None if filter is None else negate_filter(filter)
+
+
+def _cost(condition):
+    return getattr(condition, 'cost', 1)
+
+
+def _composite_key(kind, conditions):
+    keys = [condition.index_key() for condition in conditions]
+    if any(key is None for key in keys):
+        return None
+    return (kind, tuple(keys))
+
@@ -0,0 +1,255 @@
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+
+from gatecraft.utils.histogram import Histogram
+
+# Span duration buckets in seconds, from 1 µs to 10 s
+DEFAULT_BUCKETS = [
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+]
+
+# Installed instrumentation; None means the no-op default
+_active = None
+
+
+class Instrumentation(metaclass=type):
+    """
+    No-op instrumentation. Subclasses receive every span through start() and
+    finish() and every counter increment through count().
+    """
+
+    def start(self, name):
+        """Called when a span opens; the return value is passed to finish()."""
+        return None
+
+    def finish(self, name, token, seconds):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+
+def set_instrumentation(instrumentation):
+    """
+    Installs instrumentation for the whole process and returns the previous
+    one. Passing None restores the no-op default.
+    """
+    global _active
+    previous = get_instrumentation()
+    _active = None if type(instrumentation) is Instrumentation else instrumentation
+    return previous
+
+
+def get_instrumentation():
+    return _active if _active is not None else Instrumentation()
+
+
+def span(name):
+    """Context manager timing the enclosed block as a span called name."""
+    instrumentation = _active
+    if instrumentation is None:
+        return _NULL_SPAN
+    return _Span(instrumentation, name)
+
+
+def count(name, value=1):
+    instrumentation = _active
+    if instrumentation is not None:
+        instrumentation.count(name, value)
+
+
+def instrumented(name):
+    """Decorator timing every call of a function as a span called name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            instrumentation = _active
+            if instrumentation is None:
+                return func(*args, **kwargs)
+            token = instrumentation.start(name)
+            begin = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instrumentation.finish(name, token, time.perf_counter() - begin)
+        return wrapper
+    return decorator
+
+
+class _Span(metaclass=type):
+    __slots__ = ('instrumentation', 'name', 'token', 'begin')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.token = self.instrumentation.start(self.name)
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.finish(self.name, self.token, time.perf_counter() - self.begin)
+
+
+class _NullSpan(metaclass=type):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class InMemoryInstrumentation(Instrumentation):
+    """
+    Keeps one duration histogram per span name and a total per counter.
+
+    In debug mode every top-level call is also recorded as a tree of nested
+    spans, so the time of a slow request can be broken down into embedding,
+    vector store and condition evaluation. The last max_traces trees are kept.
+    """
+
+    def __init__(self, buckets=None, debug=False, max_traces=100):
+        self.buckets = buckets or DEFAULT_BUCKETS
+        self.debug = debug
+        self.histograms = {}
+        self.counters = {}
+        self.traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self._current = contextvars.ContextVar('gatecraft_span', default=None)
+
+    def start(self, name):
+        if not self.debug:
+            return None
+        parent = self._current.get()
+        node = {'name': name, 'seconds': None, 'children': []}
+        if parent is not None:
+            parent['children'].append(node)
+        return node, parent is None, self._current.set(node)
+
+    def finish(self, name, token, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+        if token is not None:
+            node, is_root, reset = token
+            node['seconds'] = seconds
+            self._current.reset(reset)
+            if is_root:
+                self.traces.append(node)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        return {
+            'spans': {name: histogram.snapshot() for name, histogram in list(self.histograms.items())},
+            'counters': dict(self.counters),
+        }
+
+    def breakdown(self, trace=None):
+        """
+        Seconds spent in each span name within a debug trace (the latest one
+        by default), excluding time spent in nested spans.
+        """
+        if trace is None:
+            if not self.traces:
+                return {}
+            trace = self.traces[-1]
+        totals = {}
+        pending = [trace]
+        while pending:
+            node = pending.pop()
+            children = sum(child['seconds'] for child in node['children'])
+            totals[node['name']] = totals.get(node['name'], 0.0) + node['seconds'] - children
+            pending.extend(node['children'])
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.traces.clear()
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Exports spans as OpenTelemetry spans and duration histogram points, and
+    counters as OpenTelemetry counters. Requires opentelemetry-api.
+    """
+
+    def __init__(self, tracer=None, meter=None):
+        try:
+            from opentelemetry import context, metrics, trace
+        except ImportError:
+            raise ImportError("OpenTelemetryInstrumentation requires opentelemetry-api.")
+        self._context = context
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer('gatecraft')
+        self.meter = meter or metrics.get_meter('gatecraft')
+        self._durations = self.meter.create_histogram(
+            'gatecraft.span.duration', unit='s', description='Duration of gatecraft operations'
+        )
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def start(self, name):
+        otel_span = self.tracer.start_span(name)
+        token = self._context.attach(self._trace.set_span_in_context(otel_span))
+        return otel_span, token
+
+    def finish(self, name, token, seconds):
+        otel_span, context_token = token
+        self._context.detach(context_token)
+        otel_span.end()
+        self._durations.record(seconds, {'span': name})
+
+    def count(self, name, value=1):
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.get(name)
+                if counter is None:
+                    counter = self._counters[name] = self.meter.create_counter(f'gatecraft.{name}')
+        counter.add(value)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Exports spans as a Prometheus histogram labelled by span name and counters
+    as a Prometheus counter labelled by event name. Requires prometheus_client.
+    """
+
+    def __init__(self, registry=None, namespace='gatecraft', buckets=None):
+        try:
+            import prometheus_client
+        except ImportError:
+            raise ImportError("PrometheusInstrumentation requires prometheus_client.")
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        self._durations = prometheus_client.Histogram(
+            'span_seconds', 'Duration of gatecraft operations', ['span'],
+            namespace=namespace, registry=registry, buckets=buckets or DEFAULT_BUCKETS
+        )
+        self._events = prometheus_client.Counter(
+            'events', 'Gatecraft event counters', ['event'],
+            namespace=namespace, registry=registry
+        )
+
+    def finish(self, name, token, seconds):
+        self._durations.labels(span=name).observe(seconds)
+
+    def count(self, name, value=1):
+        self._events.labels(event=name).inc(value)
@@ -0,0 +1,55 @@
+import re
+
+from gatecraft.utils.conditions import Condition
+
+
+class KeywordCondition(Condition):
+    """
+    Condition on the words of the entity text.
+    When inverse=False (default): Returns True if any keyword occurs as a word
+    When inverse=True: Returns True if none of them occurs
+    """
+
+    cost = 0
+
+    def __init__(self, keywords, case_sensitive=False, inverse=False):
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        if not keywords:
+            raise ValueError("KeywordCondition needs at least one keyword.")
+        self.keywords = tuple(keywords)
+        self.case_sensitive = case_sensitive
+        self.inverse = inverse
+        # Keywords are matched at word boundaries in a single pass
+        alternatives = '|'.join(re.escape(keyword) for keyword in self.keywords)
+        self._pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', 0 if case_sensitive else re.IGNORECASE)
+
+    def index_key(self):
+        return ('keyword', self.keywords, self.case_sensitive, self.inverse)
+
+    def evaluate(self, user, entity, database):
+        found = self._pattern.search(entity.data) is not None
+        return not found if self.inverse else found
+
+
+class RegexCondition(Condition):
+    """
+    Condition matching a regular expression anywhere in the entity text.
+    When inverse=False (default): Returns True if the pattern matches
+    When inverse=True: Returns True if it doesn't
+    """
+
+    cost = 0
+
+    def __init__(self, pattern, flags=0, inverse=False):
+        self.pattern = pattern
+        self.flags = int(flags)
+        self.inverse = inverse
+        self._regex = re.compile(pattern, self.flags)
+
+    def index_key(self):
+        return ('regex', self.pattern, self.flags, self.inverse)
+
+    def evaluate(self, user, entity, database):
+        found = self._regex.search(entity.data) is not None
+        return not found if self.inverse else found
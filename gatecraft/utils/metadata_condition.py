@@ -0,0 +1,55 @@
+from gatecraft.db.metadata_filter import matches_filter
+from gatecraft.utils.conditions import Condition
+
+
+class MetadataCondition(Condition):
+    """
+    Condition on a field of the entity metadata.
+    When inverse=False (default): Returns True if the field has one of values
+    When inverse=True: Returns True if it has none of them (or is missing)
+    A list field, such as tags, matches if any of its items is one of values.
+    """
+
+    cost = 0
+
+    def __init__(self, key, values, inverse=False):
+        if isinstance(values, (list, tuple, set, frozenset)):
+            values = sorted(values, key=repr) if isinstance(values, (set, frozenset)) else list(values)
+        else:
+            values = [values]
+        self.key = key
+        self.values = tuple(values)
+        self.inverse = inverse
+        self._filter = self.to_filter()
+
+    def index_key(self):
+        return ('metadata', self.key, self.values, self.inverse)
+
+    def to_filter(self):
+        return {self.key: {'$nin' if self.inverse else '$in': list(self.values)}}
+
+    def evaluate(self, user, entity, database):
+        # Same semantics as the vector store filter
+        return matches_filter(entity.metadata_or_none, self._filter)
+
+
+class OwnerCondition(Condition):
+    """
+    Condition that holds for the entities whose metadata field key names the
+    user (by user_id), or lists the user when it is a list.
+    """
+
+    cost = 0
+    user_dependent = True
+
+    def __init__(self, key='owner_id'):
+        self.key = key
+
+    def evaluate(self, user, entity, database):
+        metadata = entity.metadata_or_none
+        if user is None or not metadata:
+            return False
+        owner = metadata.get(self.key)
+        if isinstance(owner, (list, tuple)):
+            return user.user_id in owner
+        return owner == user.user_id
@@ -0,0 +1,37 @@
+import asyncio
+import random
+import time
+
+
+def retry_with_backoff(func, is_retryable, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """
+    Calls func() and retries it with exponential backoff and full jitter while
+    is_retryable(exception) holds, re-raising once max_retries is exhausted.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as exc:
+            if attempt >= max_retries or not is_retryable(exc):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+
+
+async def aretry_with_backoff(func, is_retryable, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """
+    Async counterpart of retry_with_backoff: awaits func() and retries it with
+    exponential backoff and full jitter while is_retryable(exception) holds.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as exc:
+            if attempt >= max_retries or not is_retryable(exc):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            await asyncio.sleep(random.uniform(0, delay))
+            attempt += 1
@@ -1,4 +1,5 @@
 from gatecraft.utils.conditions import Condition
+from gatecraft.utils.instrumentation import instrumented
 
 
 class SemanticCondition(Condition):
@@ -6,6 +7,9 @@ class SemanticCondition(Condition):
     Condition that evaluates based on semantic similarity.
     When inverse=False (default): Returns True if similarity >= threshold
     When inverse=True: Returns True if similarity < threshold
+
+    The policy computes similarities in bulk and asks decide() for the
+    verdict; subclasses that override evaluate are evaluated one by one.
     """
 
     def __init__(self, term, threshold=0.8, inverse=False):
@@ -14,6 +18,24 @@ class SemanticCondition(Condition):
         self.inverse = inverse
         self.term_embedding = None
 
+    @property
+    def cost(self):
+        # Embedding the term costs about as much as the comparisons
+        return 1 if self.term_embedding is not None else 2
+
+    def index_key(self):
+        return ('semantic', self.term, self.threshold, self.inverse)
+
+    @property
+    def similarity_based(self):
+        # Whether the verdict is decide() of the term / entity similarity
+        return type(self).evaluate is SemanticCondition.evaluate
+
+    def decide(self, similarity):
+        """Returns the verdict of the condition for a similarity."""
+        return similarity < self.threshold if self.inverse else similarity >= self.threshold
+
+    @instrumented('condition.evaluate')
     def evaluate(self, user, entity, database):
         # Get or create term embedding
         if self.term_embedding is None:
@@ -25,7 +47,5 @@ class SemanticCondition(Condition):
         # Calculate similarity
         similarity = database.compute_similarity(self.term_embedding, entity_embedding)
 
-        # For inverse conditions, return True when similarity is below threshold
-        # For regular conditions, return True when similarity is above threshold
-        return similarity < self.threshold if self.inverse else similarity >= self.threshold
+        return self.decide(similarity)
     
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gatecraft import AndCondition, Gatecraft, KeywordCondition, MetadataCondition, SemanticCondition
+from gatecraft.core.access_index import AccessIndex
+from gatecraft.core.policy import AccessControlPolicy
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class RandomVectorStore(VectorStoreInterface):
+
+    def __init__(self):
+        self.similarity_calls = 0
+
+    def embed(self, data):
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(data))
+        return np.random.default_rng(seed).normal(size=16)
+
+    def similarity(self, vector1, vector2):
+        self.similarity_calls += 1
+        return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+    def upsert(self, id, vector):
+        pass
+
+
+class TestAccessIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.vector_store = RandomVectorStore()
+        self.gc = Gatecraft(vector_store=self.vector_store)
+        self.user = self.gc.create_user(1, 'Alice')
+
+        for i in range(10):
+            self.gc.add_entity(i, f"document {i}")
+        allow = self.gc.create_role(1, 'Allow', SemanticCondition('topic a', threshold=0.1))
+        deny = self.gc.create_role(2, 'Deny')
+        self.gc.add_condition_to_role(deny, SemanticCondition('topic b', threshold=0.1, inverse=True))
+        for i in range(10, 20):
+            self.gc.add_entity(i, f"document {i}")
+        self.gc.assign_role(self.user, allow)
+        self.gc.assign_role(self.user, deny)
+
+    def expected(self):
+        # Fresh policy without an index evaluates every condition
+        policy = AccessControlPolicy(self.gc.semantic_db)
+        return [policy.is_access_allowed(self.user, self.gc.entities[i]) for i in range(20)]
+
+    def test_index_serves_verdicts_without_similarity(self):
+        expected = self.expected()
+        self.vector_store.similarity_calls = 0
+
+        verdicts = [self.gc.is_access_allowed(self.user, i) for i in range(20)]
+        self.assertEqual(verdicts, expected)
+        self.assertEqual(self.gc.is_access_allowed_many(self.user, range(20)), expected)
+        self.assertEqual(self.vector_store.similarity_calls, 0)
+
+    def test_readding_entity_refreshes_row(self):
+        self.gc.add_entity(3, "document 17")
+        self.assertEqual(self.gc.is_access_allowed(self.user, 3),
+                         self.gc.is_access_allowed(self.user, 17))
+
+    def test_save_and_load(self):
+        index = self.gc.policy.access_index
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'access_index.npz')
+            index.save(path)
+            loaded = AccessIndex.load(path)
+
+        self.assertEqual(loaded.rows, index.rows)
+        for key in index.columns:
+            for entity_id in range(20):
+                self.assertEqual(loaded.lookup(key, entity_id), index.lookup(key, entity_id))
+
+    def test_save_and_load_nested_keys(self):
+        conditions = [
+            MetadataCondition('department', ['finance', 'legal']),
+            KeywordCondition(['document', 'report']),
+            AndCondition(MetadataCondition('level', 3), KeywordCondition('draft', inverse=True)),
+        ]
+        role = self.gc.create_role(3, 'Lexical')
+        for condition in conditions:
+            self.gc.add_condition_to_role(role, condition)
+        index = self.gc.policy.access_index
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'access_index.npz')
+            index.save(path)
+            loaded = AccessIndex.load(path)
+
+        for condition in conditions:
+            key = condition.index_key()
+            self.assertTrue(loaded.has_column(key))
+            self.assertEqual([loaded.lookup(key, i) for i in range(20)], [index.lookup(key, i) for i in range(20)])
+
+    def test_removed_entity_is_unknown(self):
+        index = self.gc.policy.access_index
+        key = SemanticCondition('topic a', threshold=0.1).index_key()
+        self.assertIsNotNone(index.lookup(key, 5))
+        index.remove_entity(5)
+        self.assertIsNone(index.lookup(key, 5))
+        self.assertEqual(index.add_entity(42), 5)
+
+
+    def test_verdict_matrix_matches_lookup(self):
+        index = self.gc.policy.access_index
+        keys = [SemanticCondition('topic a', threshold=0.1).index_key(),
+                SemanticCondition('topic b', threshold=0.1, inverse=True).index_key()]
+        matrix = index.verdict_matrix(keys, list(range(19, -1, -1)))
+        self.assertEqual(matrix.tolist(), [[index.lookup(key, i) for key in keys] for i in range(19, -1, -1)])
+
+        self.assertIsNone(index.verdict_matrix(keys, [0, 'missing']))
+        self.assertIsNone(index.verdict_matrix(keys + [('unknown',)], [0]))
+        index.forget(keys[1], 3)
+        self.assertIsNone(index.verdict_matrix(keys, [2, 3]))
+        self.assertEqual(index.verdict_matrix(keys[:1], [2, 3]).shape, (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from gatecraft import AndCondition, Gatecraft, KeywordCondition, NotCondition, OrCondition, SemanticCondition
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class SlowVectorStore(VectorStoreInterface):
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.vectors = {}
+
+    def embed(self, data):
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(data))
+        return np.random.default_rng(seed).normal(size=8)
+
+    async def aembed(self, data):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.embed(data)
+
+    def similarity(self, vector1, vector2):
+        return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+    def upsert(self, id, vector):
+        self.vectors[id] = vector
+
+    def query(self, vector, top_k=1):
+        scored = [{'id': id, 'score': self.similarity(vector, v)} for id, v in self.vectors.items()]
+        return sorted(scored, key=lambda match: -match['score'])[:top_k]
+
+
+class TestAsync(unittest.TestCase):
+
+    def test_ais_access_allowed_embeds_concurrently(self):
+        vector_store = SlowVectorStore()
+        gc = Gatecraft(vector_store=vector_store)
+        user = gc.create_user(1, 'Alice')
+        role = gc.create_role(1, 'Reader')
+        gc.assign_role(user, role)
+        # Conditions added directly to the role are not materialized
+        for term in ['a', 'b', 'c']:
+            role.add_condition(SemanticCondition(term, threshold=0.2))
+        entity = gc.add_entity(1, 'document')
+
+        expected = gc.policy.is_access_allowed(user, entity)
+        for condition in role.get_conditions():
+            condition.term_embedding = None
+        gc.semantic_db.embedding_cache.clear()
+
+        allowed = asyncio.run(gc.ais_access_allowed(user, 1))
+        self.assertEqual(allowed, expected)
+        self.assertEqual(vector_store.max_in_flight, 4)
+
+    def test_ais_access_allowed_prefetches_nested_conditions(self):
+        vector_store = SlowVectorStore()
+        gc = Gatecraft(vector_store=vector_store)
+        user = gc.create_user(1, 'Alice')
+        role = gc.create_role(1, 'Reader')
+        gc.assign_role(user, role)
+        role.add_condition(OrCondition(
+            KeywordCondition('missing'),
+            AndCondition(SemanticCondition('a', threshold=-1.0), NotCondition(SemanticCondition('b', threshold=1.0))),
+        ))
+        gc.add_entity(1, 'document')
+        gc.semantic_db.embedding_cache.clear()
+
+        # Evaluation runs against the warm cache without blocking embeds
+        embedded = []
+        vector_store.embed = lambda data, embed=vector_store.embed: embedded.append(data) or embed(data)
+        self.assertTrue(asyncio.run(gc.ais_access_allowed(user, 1)))
+        self.assertEqual(embedded, ['document', 'a', 'b'])
+        self.assertEqual(vector_store.max_in_flight, 3)
+
+    def test_aretrieve_entities(self):
+        gc = Gatecraft(vector_store=SlowVectorStore(), similarity_threshold=0.0)
+        gc.add_entity(1, 'first document')
+        gc.add_entity(2, 'second document')
+
+        entities = asyncio.run(gc.aretrieve_entities('first document', top_k=1))
+        self.assertEqual([entity.entity_id for entity in entities], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
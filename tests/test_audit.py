@@ -0,0 +1,62 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.core.policy import AccessControlPolicy
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+
+TOPICS = ['cat', 'dog', 'bird', 'fish', 'horse']
+
+
+class TestAudit(unittest.TestCase):
+
+    def setUp(self):
+        embedder = HashingEmbedder(dimension=64)
+        self.gc = Gatecraft(vector_store=LocalVectorStore(64, embed_function=embedder.embed))
+        for i in range(120):
+            self.gc.add_entity(i, f"{TOPICS[i % 5]} story number {i} about {TOPICS[i % 3]}")
+
+        cats = self.gc.create_role(1, 'Cats', SemanticCondition('cat', threshold=0.3))
+        no_dogs = self.gc.create_role(2, 'No dogs', SemanticCondition('dog', threshold=0.3, inverse=True))
+        birds = self.gc.create_role(3, 'Birds', SemanticCondition('bird', threshold=0.3))
+        for user_id, roles in enumerate([[cats], [no_dogs], [cats, birds], []]):
+            user = self.gc.create_user(user_id, f"user {user_id}")
+            for role in roles:
+                self.gc.assign_role(user, role)
+
+    def expected(self):
+        policy = AccessControlPolicy(self.gc.semantic_db)
+        return {
+            (user.user_id, entity_id)
+            for user in self.gc.users.values() for entity_id in self.gc.entities
+            if policy.is_access_allowed(user, self.gc.entities[entity_id])
+        }
+
+    def test_process_pool_matches_policy(self):
+        result = self.gc.audit_access(max_workers=2, shard_size=25)
+        self.assertEqual(set(result.pairs()), self.expected())
+        self.assertGreater(len(result), 0)
+
+    def test_in_process_and_subsets(self):
+        users = [self.gc.users[0], self.gc.users[1]]
+        result = self.gc.audit_access(users=users, entities=range(10, 30))
+        expected = {(u, e) for u, e in self.expected() if u in (0, 1) and 10 <= e < 30}
+        self.assertEqual(set(result.pairs()), expected)
+        self.assertEqual(result.to_dense().shape, (2, 20))
+
+    def test_streams_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.csv')
+            result = self.gc.audit_access(max_workers=2, shard_size=50, output=path)
+            with open(path) as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0], ['user_id', 'entity_id'])
+        self.assertEqual({(int(u), int(e)) for u, e in rows[1:]}, set(result.pairs()))
+
+
+if __name__ == '__main__':
+    unittest.main()
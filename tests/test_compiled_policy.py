@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+from gatecraft.core.entity import Entity
+from gatecraft.core.policy import AccessControlPolicy
+from gatecraft.core.role import Role
+from gatecraft.core.user import User
+from gatecraft.db.mock_vector_store import MockVectorStore
+from gatecraft.db.semantic_database import SemanticDatabase
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class RandomVectorStore(MockVectorStore):
+
+    def embed(self, data):
+        # Deterministic pseudo-random vector per text
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(data))
+        return np.random.default_rng(seed).normal(size=32)
+
+
+class TestCompiledPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.database = SemanticDatabase(RandomVectorStore())
+        self.policy = AccessControlPolicy(self.database)
+        self.entities = [Entity(i, f"document {i}") for i in range(200)]
+
+    def assert_matches_loop(self, user):
+        expected = [self.policy.is_access_allowed(user, entity) for entity in self.entities]
+        self.assertEqual(self.policy.is_access_allowed_many(user, self.entities), expected)
+        return expected
+
+    def test_matches_scalar_loop(self):
+        rng = np.random.default_rng(1)
+        user = User(1, 'user')
+        for role_id in range(3):
+            role = Role(role_id, f"role {role_id}")
+            for term_id in range(rng.integers(0, 4)):
+                role.add_condition(SemanticCondition(
+                    f"term {rng.integers(0, 8)}",
+                    threshold=float(rng.uniform(0.0, 0.3)),
+                    inverse=bool(rng.integers(0, 2))
+                ))
+            user.add_role(role)
+
+        verdicts = self.assert_matches_loop(user)
+        self.assertTrue(any(verdicts))
+        self.assertFalse(all(verdicts))
+
+    def test_threshold_exactly_at_similarity(self):
+        user = User(1, 'user')
+        role = Role(1, 'role')
+        condition = SemanticCondition('term', inverse=True)
+        entity_embedding = self.database.get_embedding(self.entities[0].data)
+        term_embedding = self.database.get_embedding('term')
+        condition.threshold = self.database.compute_similarity(term_embedding, entity_embedding)
+        role.add_condition(condition)
+        user.add_role(role)
+
+        self.assertFalse(self.assert_matches_loop(user)[0])
+
+    def test_user_without_conditions(self):
+        user = User(1, 'user')
+        user.add_role(Role(1, 'empty'))
+        self.assertEqual(self.policy.is_access_allowed_many(user, self.entities),
+                         [False] * len(self.entities))
+
+    def test_compiled_policy_is_cached_per_role_set(self):
+        user = User(1, 'user')
+        role = Role(1, 'role')
+        role.add_condition(SemanticCondition('term'))
+        user.add_role(role)
+        other = User(2, 'other')
+        other.add_role(role)
+
+        compiled = self.policy.compile(user)
+        self.assertIs(self.policy.compile(other), compiled)
+        role.add_condition(SemanticCondition('another term', inverse=True))
+        self.assertIsNot(self.policy.compile(user), compiled)
+        self.assert_matches_loop(user)
+
+    def test_variable_length_embeddings(self):
+        policy = AccessControlPolicy(SemanticDatabase(MockVectorStore()))
+        user = User(1, 'user')
+        role = Role(1, 'role')
+        role.add_condition(SemanticCondition('cat', threshold=0.9, inverse=True))
+        user.add_role(role)
+        entities = [Entity(1, 'cat'), Entity(2, 'dog')]
+
+        expected = [policy.is_access_allowed(user, entity) for entity in entities]
+        self.assertEqual(policy.is_access_allowed_many(user, entities), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
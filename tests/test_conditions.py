@@ -0,0 +1,183 @@
+import os
+import re
+import tempfile
+import unittest
+
+from gatecraft import (
+    AndCondition, Gatecraft, KeywordCondition, MetadataCondition, NotCondition, OrCondition,
+    OwnerCondition, RegexCondition, SemanticCondition,
+)
+from gatecraft.core.entity import Entity
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.db.metadata_filter import matches_filter, negate_filter
+
+
+class RecordingEmbedder(HashingEmbedder):
+
+    def __init__(self):
+        super().__init__(dimension=32)
+        self.embedded = []
+
+    def embed(self, data):
+        self.embedded.append(data)
+        return super().embed(data)
+
+
+class TestMetadataFilter(unittest.TestCase):
+
+    def test_operators(self):
+        metadata = {'department': 'finance', 'level': 3, 'tags': ['public', 'q3']}
+        self.assertTrue(matches_filter(metadata, {'department': 'finance'}))
+        self.assertTrue(matches_filter(metadata, {'level': {'$gte': 3, '$lt': 5}}))
+        self.assertTrue(matches_filter(metadata, {'tags': {'$in': ['q3', 'q4']}}))
+        self.assertFalse(matches_filter(metadata, {'tags': {'$nin': ['public']}}))
+        self.assertTrue(matches_filter(metadata, {'owner': {'$ne': 'bob'}}))
+        self.assertFalse(matches_filter(metadata, {'owner': 'bob'}))
+        self.assertTrue(matches_filter(metadata, {'$or': [{'level': 1}, {'tags': 'public'}]}))
+        self.assertFalse(matches_filter(metadata, {'$and': [{'level': 3}, {'owner': {'$exists': True}}]}))
+        with self.assertRaises(ValueError):
+            matches_filter(metadata, {'level': {'$near': 3}})
+
+    def test_negated_filters_match_the_complement(self):
+        filters = [
+            {'department': 'finance'},
+            {'tags': {'$in': ['q3', 'q4']}},
+            {'owner': {'$exists': True}, 'level': {'$ne': 3}},
+            {'$or': [{'level': 1}, {'tags': {'$nin': ['public']}}]},
+        ]
+        records = [
+            {'department': 'finance', 'level': 3, 'tags': ['public', 'q3']},
+            {'department': 'hr', 'level': 1, 'owner': 'bob'},
+            {'tags': ['q4']},
+            {},
+        ]
+        for filter in filters:
+            negated = negate_filter(filter)
+            for metadata in records:
+                self.assertNotEqual(matches_filter(metadata, filter), matches_filter(metadata, negated))
+        self.assertIsNone(negate_filter({'level': {'$gte': 3}}))
+
+
+class TestConditions(unittest.TestCase):
+
+    def setUp(self):
+        self.finance = Entity('1', 'Quarterly revenue report', {'department': 'finance', 'owner_id': 7})
+        self.untagged = Entity('2', 'Office party photos')
+
+    def test_metadata_condition(self):
+        condition = MetadataCondition('department', ['finance', 'legal'])
+        self.assertTrue(condition.evaluate(None, self.finance, None))
+        self.assertFalse(condition.evaluate(None, self.untagged, None))
+        self.assertEqual(condition.to_filter(), {'department': {'$in': ['finance', 'legal']}})
+
+        inverse = MetadataCondition('department', 'finance', inverse=True)
+        self.assertFalse(inverse.evaluate(None, self.finance, None))
+        self.assertTrue(inverse.evaluate(None, self.untagged, None))
+
+    def test_lexical_conditions(self):
+        keyword = KeywordCondition(['revenue', 'budget'])
+        self.assertTrue(keyword.evaluate(None, self.finance, None))
+        self.assertFalse(KeywordCondition('rev').evaluate(None, self.finance, None))
+        self.assertFalse(KeywordCondition('Revenue', case_sensitive=True).evaluate(None, self.finance, None))
+
+        regex = RegexCondition(r'quarter\w*', flags=re.IGNORECASE)
+        self.assertTrue(regex.evaluate(None, self.finance, None))
+        self.assertTrue(RegexCondition(r'\d', inverse=True).evaluate(None, self.untagged, None))
+
+    def test_composition(self):
+        finance = MetadataCondition('department', 'finance')
+        photos = KeywordCondition('photos')
+        self.assertFalse(AndCondition(finance, photos).evaluate(None, self.finance, None))
+        self.assertTrue(OrCondition(finance, photos).evaluate(None, self.untagged, None))
+        self.assertTrue(NotCondition(finance).evaluate(None, self.untagged, None))
+
+        self.assertEqual(AndCondition(finance, photos).index_key(),
+                         ('and', (finance.index_key(), photos.index_key())))
+        self.assertIsNone(AndCondition(finance, OwnerCondition()).index_key())
+        self.assertIsNone(OrCondition(finance, photos).to_filter())
+        self.assertEqual(OrCondition(finance, MetadataCondition('level', 3)).to_filter(),
+                         {'$or': [finance.to_filter(), {'level': {'$in': [3]}}]})
+        self.assertEqual(AndCondition(SemanticCondition('x'), finance).cost, 2)
+        self.assertEqual(NotCondition(finance).to_filter(), {'department': {'$nin': ['finance']}})
+        self.assertIsNone(NotCondition(photos).to_filter())
+
+
+class TestCheapConditionsInPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.embedder = RecordingEmbedder()
+        self.gc = Gatecraft(vector_store=LocalVectorStore(embedding_provider=self.embedder),
+                            similarity_threshold=-1.0)
+        self.gc.add_entity('1', 'Quarterly revenue report', metadata={'department': 'finance', 'owner_id': 7})
+        self.gc.add_entity('2', 'Office party photos', metadata={'department': 'hr'})
+        self.embedder.embedded.clear()
+
+    def test_cheap_condition_of_another_role_skips_embeddings(self):
+        user = self.gc.create_user(7, 'Alice')
+        # Added directly, so the semantic condition isn't materialized
+        semantic = self.gc.create_role('semantic', 'Semantic')
+        semantic.add_condition(SemanticCondition('money matters', threshold=0.5))
+        self.gc.assign_role(user, semantic)
+        self.gc.assign_role(user, self.gc.create_role('finance', 'Finance', MetadataCondition('department', 'finance')))
+
+        self.assertTrue(self.gc.is_access_allowed(user, '1'))
+        self.assertEqual(self.embedder.embedded, [])
+
+        # Only an undecided verdict falls through to the semantic condition
+        self.gc.is_access_allowed(user, '2')
+        self.assertEqual(self.embedder.embedded, ['money matters'])
+
+    def test_owner_condition(self):
+        owner = self.gc.create_user(7, 'Alice')
+        other = self.gc.create_user(8, 'Bob')
+        role = self.gc.create_role('owners', 'Owners', OwnerCondition())
+        self.gc.assign_role(owner, role)
+        self.gc.assign_role(other, role)
+
+        self.assertTrue(self.gc.is_access_allowed(owner, '1'))
+        self.assertFalse(self.gc.is_access_allowed(other, '1'))
+        self.assertEqual(self.gc.policy.is_access_allowed_many(owner, self.gc.entities.values()), [True, False])
+        with self.assertRaises(ValueError):
+            self.gc.audit_access()
+
+    def test_retrieve_with_metadata_filter(self):
+        entities = self.gc.retrieve_entities('party', top_k=2, filter=MetadataCondition('department', 'finance'))
+        self.assertEqual([entity.entity_id for entity in entities], ['1'])
+        entities = self.gc.retrieve_entities('party', top_k=2, filter={'department': {'$ne': 'finance'}})
+        self.assertEqual([entity.entity_id for entity in entities], ['2'])
+        not_finance = NotCondition(MetadataCondition('department', 'finance'))
+        entities = self.gc.retrieve_entities('party', top_k=2, filter=not_finance)
+        self.assertEqual([entity.entity_id for entity in entities], ['2'])
+        with self.assertRaises(ValueError):
+            self.gc.retrieve_entities('party', filter=KeywordCondition('party'))
+
+    def test_metadata_change_is_synced_without_embedding(self):
+        summary = self.gc.upsert_entities([('2', 'Office party photos', {'department': 'finance'})])
+        self.assertEqual(summary['changed'], 1)
+        self.assertEqual(self.embedder.embedded, [])
+        entities = self.gc.retrieve_entities('party', top_k=2, filter=MetadataCondition('department', 'finance'))
+        self.assertEqual({entity.entity_id for entity in entities}, {'1', '2'})
+
+    def test_snapshot_round_trip(self):
+        user = self.gc.create_user(1, 'Alice')
+        condition = OrCondition(
+            AndCondition(MetadataCondition('department', 'hr'), NotCondition(RegexCondition(r'\d'))),
+            KeywordCondition('revenue', inverse=True),
+        )
+        self.gc.assign_role(user, self.gc.create_role('mixed', 'Mixed', condition))
+        self.gc.assign_role(user, self.gc.create_role('owner', 'Owner', OwnerCondition('owner_id')))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.gcsnap')
+            self.gc.save(path)
+            loaded = Gatecraft.load(path, vector_store=LocalVectorStore(embedding_provider=self.embedder))
+
+        self.assertEqual(set(loaded.policy.indexed_conditions), {condition.index_key()})
+        loaded_user = loaded.users[1]
+        self.assertTrue(loaded.is_access_allowed(loaded_user, '2'))
+        self.assertFalse(loaded.is_access_allowed(loaded_user, '1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
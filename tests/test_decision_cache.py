@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.core.decision_cache import DecisionCache
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+
+
+class TestDecisionCache(unittest.TestCase):
+
+    def test_version_mismatch_is_a_miss(self):
+        cache = DecisionCache()
+        cache.put(('u', 1), (1, 0, 1), True)
+        self.assertTrue(cache.get(('u', 1), (1, 0, 1)))
+        self.assertIsNone(cache.get(('u', 1), (1, 0, 2)))
+        self.assertEqual(cache.stats()['stale'], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl_and_size_eviction(self):
+        cache = DecisionCache(max_entries=2, ttl=10)
+        with mock.patch('gatecraft.core.decision_cache.time.monotonic', return_value=100.0):
+            cache.put('a', 0, True)
+            cache.put('b', 0, False)
+            cache.get('a', 0)
+            cache.put('c', 0, True)
+        self.assertEqual(cache.evictions, 1)
+        with mock.patch('gatecraft.core.decision_cache.time.monotonic', return_value=105.0):
+            self.assertIsNone(cache.get('b', 0))
+            self.assertTrue(cache.get('a', 0))
+        with mock.patch('gatecraft.core.decision_cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('c', 0))
+        self.assertEqual(cache.expirations, 1)
+
+
+class TestGatecraftDecisionCache(unittest.TestCase):
+
+    def setUp(self):
+        embedder = HashingEmbedder(dimension=64)
+        store = LocalVectorStore(64, embed_function=embedder.embed,
+                                 embedding_model=embedder.embedding_model)
+        self.cache = DecisionCache()
+        self.gc = Gatecraft(vector_store=store, decision_cache=self.cache)
+        self.role = self.gc.create_role(1, 'cats', SemanticCondition('cat', threshold=0.5))
+        self.other = self.gc.create_role(2, 'dogs', SemanticCondition('dog', threshold=0.5))
+        self.user = self.gc.create_user(1, 'alice')
+        self.gc.add_entity(1, 'cat')
+        self.gc.add_entity(2, 'dog')
+
+    def test_repeated_checks_hit(self):
+        self.gc.assign_role(self.user, self.role)
+        self.assertTrue(self.gc.is_access_allowed(self.user, 1))
+        self.assertTrue(self.gc.is_access_allowed(self.user, 1))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.stats()['hit_rate'], 0.5)
+
+    def test_ingesting_other_entities_keeps_hits(self):
+        self.gc.assign_role(self.user, self.role)
+        self.assertTrue(self.gc.is_access_allowed(self.user, 1))
+        self.gc.add_entity(3, 'bird')
+        self.gc.add_entities([(4, 'fish')])
+        self.assertTrue(self.gc.is_access_allowed(self.user, 1))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.stale, 0)
+
+    def test_role_changes_invalidate(self):
+        self.assertFalse(self.gc.is_access_allowed(self.user, 2))
+        self.gc.assign_role(self.user, self.other)
+        self.assertTrue(self.gc.is_access_allowed(self.user, 2))
+        self.user.remove_role(self.other)
+        self.assertFalse(self.gc.is_access_allowed(self.user, 2))
+
+    def test_condition_changes_invalidate(self):
+        self.gc.assign_role(self.user, self.role)
+        self.assertFalse(self.gc.is_access_allowed(self.user, 2))
+        self.gc.add_condition_to_role(self.role, SemanticCondition('dog', threshold=0.5))
+        self.assertTrue(self.gc.is_access_allowed(self.user, 2))
+
+    def test_readding_entity_invalidates(self):
+        self.gc.assign_role(self.user, self.role)
+        self.assertFalse(self.gc.is_access_allowed(self.user, 2))
+        self.gc.add_entity(2, 'cat')
+        self.assertTrue(self.gc.is_access_allowed(self.user, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gatecraft.core.entity import Entity
+from gatecraft.db.embedding_cache import EmbeddingCache
+from gatecraft.db.mock_vector_store import MockVectorStore
+from gatecraft.db.semantic_database import SemanticDatabase
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class CountingVectorStore(MockVectorStore):
+
+    def __init__(self):
+        self.embed_calls = 0
+
+    def embed(self, data):
+        # Letter histogram so that vectors of different texts can be compared
+        self.embed_calls += 1
+        vector = np.zeros(26)
+        for char in data.lower():
+            if 'a' <= char <= 'z':
+                vector[ord(char) - ord('a')] += 1
+        return vector
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_condition_evaluation_reuses_entity_embedding(self):
+        vector_store = CountingVectorStore()
+        database = SemanticDatabase(vector_store)
+        condition = SemanticCondition('cat', threshold=0.5)
+        entity = Entity(1, 'A cute cat playing with yarn')
+
+        database.get_embedding(entity.data)
+        for _ in range(3):
+            condition.evaluate(None, entity, database)
+
+        # One call for the entity text, one for the condition term
+        self.assertEqual(vector_store.embed_calls, 2)
+        self.assertEqual(database.cache_stats()['hits'], 3)
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put('a', np.ones(3))
+        cache.put('b', np.ones(3))
+        cache.get('a')
+        cache.put('c', np.ones(3))
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_keys_depend_on_model(self):
+        self.assertNotEqual(
+            EmbeddingCache.make_key('model-a', 'text'),
+            EmbeddingCache.make_key('model-b', 'text')
+        )
+
+    def test_disk_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'embeddings.db')
+            cache = EmbeddingCache(path=path)
+            cache.put('key', np.array([0.1, 0.2, 0.3]))
+            cache.close()
+
+            restarted = EmbeddingCache(path=path)
+            embedding = restarted.get('key')
+            restarted.close()
+
+        np.testing.assert_array_equal(embedding, np.array([0.1, 0.2, 0.3]))
+        self.assertEqual(restarted.stats()['disk_hits'], 1)
+
+    def test_disk_writes_are_committed_in_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'embeddings.db')
+            cache = EmbeddingCache(path=path, commit_every=3)
+            reader = EmbeddingCache(path=path)
+            for i in range(4):
+                cache.put(f'key {i}', np.array([float(i)]))
+            # Only the first three puts were committed
+            self.assertIn('key 2', reader)
+            self.assertNotIn('key 3', reader)
+
+            cache.flush()
+            self.assertIn('key 3', reader)
+            cache.close()
+            reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from gatecraft.db.embedding_dispatcher import EmbeddingDispatcher
+from gatecraft.utils.histogram import Histogram
+
+
+class RecordingEmbedder:
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def embed_batch(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        time.sleep(0.005)
+        return [np.array([len(text), 1.0]) for text in texts]
+
+
+class TestEmbeddingDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.embedder = RecordingEmbedder()
+        self.dispatcher = EmbeddingDispatcher(self.embedder.embed_batch, max_batch_size=16, max_wait=0.02)
+
+    def tearDown(self):
+        self.dispatcher.close()
+
+    def test_concurrent_calls_are_batched(self):
+        texts = [f"query {i}" * (i % 3 + 1) for i in range(48)]
+        with ThreadPoolExecutor(max_workers=48) as executor:
+            embeddings = list(executor.map(self.dispatcher.embed, texts))
+
+        for text, embedding in zip(texts, embeddings):
+            self.assertEqual(embedding[0], len(text))
+        self.assertLess(len(self.embedder.batches), 48)
+        self.assertTrue(all(len(batch) <= 16 for batch in self.embedder.batches))
+        self.assertEqual(self.dispatcher.stats()['batch_size']['count'], len(self.embedder.batches))
+
+    def test_identical_texts_are_deduplicated(self):
+        futures = [self.dispatcher.submit('same text') for _ in range(5)]
+        results = [future.result() for future in futures]
+
+        self.assertEqual(sum(len(batch) for batch in self.embedder.batches), 1)
+        self.assertEqual(self.dispatcher.deduplicated, 4)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_asyncio_callers(self):
+        async def main():
+            return await asyncio.gather(*(self.dispatcher.aembed(f"text {i}") for i in range(10)))
+
+        embeddings = asyncio.run(main())
+        self.assertEqual(len(embeddings), 10)
+        self.assertEqual(len(self.embedder.batches), 1)
+
+    def test_errors_reach_every_caller(self):
+        dispatcher = EmbeddingDispatcher(lambda texts: 1 / 0, max_wait=0.001)
+        with self.assertRaises(ZeroDivisionError):
+            dispatcher.embed('text')
+        dispatcher.close()
+
+    def test_short_batches_fail_every_caller(self):
+        dispatcher = EmbeddingDispatcher(lambda texts: [np.zeros(2)], max_wait=0.01)
+        futures = [dispatcher.submit(f"text {i}") for i in range(3)]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=1)
+        dispatcher.close()
+
+    def test_dispatcher_survives_unexpected_errors(self):
+        observe = self.dispatcher.batch_sizes.observe
+        self.dispatcher.batch_sizes.observe = lambda value: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.dispatcher.submit('first').result(timeout=1)
+
+        self.dispatcher.batch_sizes.observe = observe
+        self.assertEqual(self.dispatcher.submit('second').result(timeout=1)[0], len('second'))
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram([1, 2, 4, 8])
+        for value in [1, 1, 1, 3, 100]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(80), 4)
+        self.assertEqual(histogram.percentile(100), 100)
+        self.assertEqual(histogram.snapshot()['count'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import threading
+import unittest
+
+import numpy as np
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.db.embedding_provider import LocalEmbeddingProvider, OpenAIEmbeddingProvider
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.db.pinecone_vector_store import PineconeVectorStore
+
+
+class LengthModel:
+    """Fake model embedding a text as (length, padded length, 1)."""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        padded = max(len(text) for text in texts)
+        return np.array([[len(text), padded, 1.0] for text in texts])
+
+
+class TestLocalEmbeddingProvider(unittest.TestCase):
+
+    def test_batches_by_length_bucket_and_keeps_order(self):
+        model = LengthModel()
+        provider = LocalEmbeddingProvider(model.encode, 3, 'length-model', max_batch_size=2,
+                                          max_workers=2, bucket_width=4, length=len)
+        texts = ['aa', 'bbbbbbbbbb', 'c', 'dddddddddd', 'ee', 'ffffffffff']
+        embeddings = provider.embed_batch(texts)
+        provider.close()
+
+        self.assertEqual([int(e[0]) for e in embeddings], [len(text) for text in texts])
+        # Short texts are never padded to the length of long ones
+        self.assertEqual(sorted(sorted(batch) for batch in model.batches),
+                         [['aa', 'c'], ['bbbbbbbbbb', 'dddddddddd'], ['ee'], ['ffffffffff']])
+        self.assertTrue(all(e[1] - e[0] < 4 for e in embeddings))
+
+    def test_rejects_wrong_dimension(self):
+        provider = LocalEmbeddingProvider(lambda texts: np.zeros((len(texts), 2)), 3, 'broken')
+        with self.assertRaises(ValueError):
+            provider.embed('text')
+
+
+class TestProviderWiring(unittest.TestCase):
+
+    def test_store_dimension_comes_from_provider(self):
+        provider = HashingEmbedder(dimension=48)
+        store = LocalVectorStore(embedding_provider=provider)
+        self.assertEqual(store.dimension, 48)
+        self.assertEqual(store.embedding_model, provider.embedding_model)
+        with self.assertRaises(ValueError):
+            LocalVectorStore(32, embedding_provider=provider)
+
+        pinecone_store = PineconeVectorStore('key', 'us-east-1', 'index', embedding_provider=provider)
+        self.assertEqual(pinecone_store.dimension, 48)
+        self.assertEqual(PineconeVectorStore('key', 'us-east-1', 'index').dimension, 1536)
+        self.assertEqual(OpenAIEmbeddingProvider('text-embedding-3-large').dimension, 3072)
+
+    def test_semantic_database_uses_provider(self):
+        provider = HashingEmbedder(dimension=32)
+        store = LocalVectorStore(32)
+        gc = Gatecraft(vector_store=store, embedding_provider=provider)
+        self.assertEqual(gc.semantic_db.embedding_model, provider.embedding_model)
+
+        role = gc.create_role(1, 'cats', SemanticCondition('cat', threshold=0.5))
+        user = gc.create_user(1, 'alice')
+        gc.assign_role(user, role)
+        gc.add_entities([(1, 'cat'), (2, 'dog')])
+        self.assertTrue(gc.is_access_allowed(user, 1))
+        self.assertFalse(gc.is_access_allowed(user, 2))
+        vector = provider.embed('cat')
+        np.testing.assert_allclose(gc.semantic_db.get_embedding('cat'), vector / np.linalg.norm(vector))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.core.entity import Entity
+from gatecraft.core.entity_store import EntityStore, SqliteTextStore
+from gatecraft.core.role import Role
+from gatecraft.core.user import User
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+
+
+class TestCompactModel(unittest.TestCase):
+
+    def test_role_membership_bitset(self):
+        user = User(1, 'Alice')
+        first, second = Role(1, 'first'), Role(2, 'second')
+        user.add_role(first)
+        user.add_role(second)
+        user.add_role(first)
+        user.remove_role(second)
+
+        self.assertEqual(user.get_roles(), [first])
+        self.assertIn(first, user.roles)
+        self.assertTrue(user.has_role(first))
+        self.assertFalse(user.has_role(second))
+        with self.assertRaises(TypeError):
+            user.add_role('admin')
+        with self.assertRaises(AttributeError):
+            user.roles.add(second)
+
+    def test_role_registries_are_per_gatecraft(self):
+        first, second = (
+            Gatecraft(vector_store=LocalVectorStore(embedding_provider=HashingEmbedder(dimension=8)))
+            for _ in range(2)
+        )
+        role = first.create_role(1, 'role')
+        other = second.create_role(1, 'role')
+        self.assertEqual((role.index, other.index), (0, 0))
+
+        role.add_condition(SemanticCondition('cat'))
+        first.add_entities([(i, f'document {i}') for i in range(20)])
+        self.assertEqual(len(first.role_registry), 1)
+        self.assertEqual(second.role_registry.epoch, 0)
+
+        user = first.create_user(1, 'Alice')
+        with self.assertRaises(ValueError):
+            user.add_role(other)
+
+    def test_direct_roles_join_the_registry_of_their_user(self):
+        gc = Gatecraft(vector_store=LocalVectorStore(embedding_provider=HashingEmbedder(dimension=8)),
+                       similarity_threshold=-1.0)
+        gc.add_entity(1, 'cat food')
+        direct = Role(9, 'direct')
+        # Nothing keeps a reference to roles that were never used
+        self.assertIsNone(direct.registry)
+
+        direct.add_condition(SemanticCondition('cat', threshold=-1.0))
+        user = gc.create_user(5, 'x')
+        gc.assign_role(user, direct)
+        self.assertIs(direct.registry, gc.role_registry)
+        self.assertEqual(user.get_roles(), [direct])
+        self.assertTrue(gc.is_access_allowed(user, 1))
+
+    def test_slots(self):
+        for instance in (User(1, 'Alice'), Role(1, 'role'), Entity(1, 'data')):
+            self.assertFalse(hasattr(instance, '__dict__'))
+
+
+class TestEntityStore(unittest.TestCase):
+
+    def check_store(self, store):
+        store[10] = Entity(10, 'first', {'owner': 'alice'})
+        store[20] = Entity(20, 'second')
+        store[10] = Entity(10, 'first, edited')
+        del store[20]
+        store[30] = Entity(30, 'third')
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(set(store), {10, 30})
+        self.assertIsNone(store.get(20))
+        self.assertEqual(store[10].data, 'first, edited')
+        self.assertEqual(store[10].metadata, {})
+        # Rows of deleted entities are reused
+        self.assertEqual(store.row(30), 1)
+        self.assertEqual(store[30].data, 'third')
+
+    def test_returned_metadata_is_read_only(self):
+        store = EntityStore()
+        metadata = {'owner': 'alice'}
+        store[10] = Entity(10, 'first', metadata)
+        store[20] = Entity(20, 'second')
+        version = store.version(10)
+
+        for entity_id in (10, 20):
+            with self.assertRaises(TypeError):
+                store[entity_id].metadata['owner'] = 'bob'
+        metadata['owner'] = 'bob'
+        self.assertEqual(store[10].metadata, {'owner': 'alice'})
+        self.assertEqual(store.version(10), version)
+
+        store[10] = Entity(10, 'first', dict(store[10].metadata, owner='bob'))
+        self.assertEqual(store.metadata(10), {'owner': 'bob'})
+        self.assertNotEqual(store.version(10), version)
+
+    def test_in_memory(self):
+        self.check_store(EntityStore())
+
+    def test_offloaded_texts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            text_store = SqliteTextStore(os.path.join(directory, 'texts.db'))
+            store = EntityStore(text_store=text_store)
+            self.check_store(store)
+            self.assertEqual(store._texts, [None, None])
+            text_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from gatecraft import Gatecraft
+from gatecraft.core.entity_store import content_hash
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class CountingEmbedder(HashingEmbedder):
+
+    def __init__(self):
+        super().__init__(dimension=32)
+        self.embedded = []
+
+    def embed_batch(self, data_list):
+        self.embedded.extend(data_list)
+        return super().embed_batch(data_list)
+
+
+class TestEntitySync(unittest.TestCase):
+
+    def setUp(self):
+        self.embedder = CountingEmbedder()
+        self.store = LocalVectorStore(embedding_provider=self.embedder)
+        self.gc = Gatecraft(vector_store=self.store, similarity_threshold=-1.0)
+        self.gc.upsert_entities([('1', 'cat food'), ('2', 'dog leash'), ('3', 'bird seed')])
+        self.embedder.embedded.clear()
+
+    def test_unchanged_texts_are_skipped(self):
+        summary = self.gc.upsert_entities([('1', 'cat food'), ('2', 'dog leash'), ('3', 'bird seed')])
+        self.assertEqual(summary, {'added': 0, 'changed': 0, 'unchanged': 3, 'deleted': 0})
+        self.assertEqual(self.embedder.embedded, [])
+
+    def test_changed_and_added_texts_are_embedded(self):
+        version = self.gc.entities.version('1')
+        summary = self.gc.upsert_entities([('1', 'cat treats'), ('2', 'dog leash'), ('4', 'fish tank')])
+        self.assertEqual(summary, {'added': 1, 'changed': 1, 'unchanged': 1, 'deleted': 0})
+        self.assertEqual(sorted(self.embedder.embedded), ['cat treats', 'fish tank'])
+        self.assertEqual(self.gc.entities['1'].data, 'cat treats')
+        self.assertEqual(self.gc.entities.text_hash('1'), content_hash('cat treats'))
+        self.assertNotEqual(self.gc.entities.version('1'), version)
+        self.assertEqual(self.store.describe_index_stats()['total_vector_count'], 4)
+
+        # Only the old text's embedding is dropped from the cache
+        cache = self.gc.semantic_db.embedding_cache
+        model = self.gc.semantic_db.embedding_model
+        self.assertNotIn(cache.make_key(model, 'cat food'), cache)
+        self.assertIn(cache.make_key(model, 'dog leash'), cache)
+
+    def test_repeated_ids_in_one_input(self):
+        summary = self.gc.upsert_entities([('4', 'fish tank'), ('4', 'fish tank'), ('4', 'fish food'),
+                                           ('1', 'cat food'), ('1', 'cat treats')])
+        self.assertEqual(summary, {'added': 1, 'changed': 2, 'unchanged': 2, 'deleted': 0})
+        self.assertEqual(self.embedder.embedded, ['fish tank', 'fish food', 'cat treats'])
+        # The last occurrence wins
+        self.assertEqual(self.gc.entities['4'].data, 'fish food')
+        self.assertEqual(self.gc.entities['1'].data, 'cat treats')
+        self.assertEqual(self.store.describe_index_stats()['total_vector_count'], 4)
+
+    def test_delete_missing(self):
+        summary = self.gc.upsert_entities([('1', 'cat food')], delete_missing=True)
+        self.assertEqual(summary, {'added': 0, 'changed': 0, 'unchanged': 1, 'deleted': 2})
+        self.assertEqual(list(self.gc.entities), ['1'])
+        self.assertEqual(self.store.describe_index_stats()['total_vector_count'], 1)
+        matches = self.gc.retrieve_entities('dog leash', top_k=3)
+        self.assertEqual([entity.entity_id for entity in matches], ['1'])
+
+    def test_delete_entities(self):
+        self.assertEqual(self.gc.delete_entities(['2', 'unknown']), {'deleted': 1})
+        self.assertNotIn('2', self.gc.entities)
+        self.assertEqual(self.store.describe_index_stats()['total_vector_count'], 2)
+
+    def test_access_verdicts_follow_the_new_text(self):
+        user = self.gc.create_user(1, 'Alice')
+        role = self.gc.create_role(1, 'Pets', SemanticCondition('cat food', threshold=0.99))
+        self.gc.assign_role(user, role)
+        self.assertTrue(self.gc.is_access_allowed(user, '1'))
+
+        self.gc.upsert_entities([('1', 'fish tank')])
+        self.assertFalse(self.gc.is_access_allowed(user, '1'))
+        self.gc.delete_entities(['1'])
+        self.assertFalse(self.gc.is_access_allowed(user, '1'))
+        self.gc.upsert_entities([('1', 'cat food')])
+        self.assertTrue(self.gc.is_access_allowed(user, '1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+from gatecraft.db.hashing_embedder import HashingEmbedder
+
+
+def cosine(vector1, vector2):
+    return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+
+class TestHashingEmbedder(unittest.TestCase):
+
+    def test_fixed_dimension(self):
+        embedder = HashingEmbedder(dimension=64)
+        self.assertEqual(embedder.embed('a').shape, (64,))
+        self.assertEqual(embedder.embed('a much longer text than the other one').shape, (64,))
+
+    def test_deterministic_across_processes(self):
+        snippet = (
+            "from gatecraft.db.hashing_embedder import HashingEmbedder\n"
+            "print(HashingEmbedder(dimension=32).embed('cats and dogs').tolist())\n"
+        )
+        output = subprocess.run([sys.executable, '-c', snippet], check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), str(HashingEmbedder(dimension=32).embed('cats and dogs').tolist()))
+
+    def test_shared_words_are_similar(self):
+        embedder = HashingEmbedder()
+        cat = embedder.embed('cat')
+        self.assertGreater(cosine(cat, embedder.embed('a cute cat playing')),
+                           cosine(cat, embedder.embed('a dog chasing a ball')))
+
+    def test_seed_changes_vectors(self):
+        self.assertFalse(np.array_equal(HashingEmbedder(seed=0).embed('cat'),
+                                        HashingEmbedder(seed=1).embed('cat')))
+
+
+if __name__ == '__main__':
+    unittest.main()
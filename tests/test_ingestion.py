@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from gatecraft import Gatecraft
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+from gatecraft.utils.batching import token_budget_batches
+from gatecraft.utils.retry import retry_with_backoff
+
+
+class RecordingVectorStore(VectorStoreInterface):
+
+    def __init__(self):
+        self.embed_batches = []
+        self.upserted = {}
+        self.upsert_calls = 0
+
+    def embed(self, data):
+        return np.array([len(data), 1.0])
+
+    def embed_batch(self, data_list):
+        self.embed_batches.append(list(data_list))
+        return [self.embed(data) for data in data_list]
+
+    def upsert(self, id, vector):
+        self.upserted[id] = vector
+
+    def upsert_batch(self, items):
+        self.upsert_calls += 1
+        self.upserted.update(items)
+
+
+class TestIngestion(unittest.TestCase):
+
+    def test_add_entities_streams_batches(self):
+        vector_store = RecordingVectorStore()
+        gc = Gatecraft(vector_store=vector_store)
+        documents = ((i, f"document number {i}") for i in range(25))
+        reports = []
+
+        stats = gc.add_entities(documents, max_batch_size=10, max_workers=2,
+                                upsert_batch_size=4, progress=reports.append)
+
+        self.assertEqual(stats.documents, 25)
+        self.assertEqual(stats.batches, 3)
+        self.assertEqual([len(batch) for batch in vector_store.embed_batches], [10, 10, 5])
+        self.assertEqual(vector_store.upsert_calls, 3 + 3 + 2)
+        self.assertEqual(len(vector_store.upserted), 25)
+        self.assertEqual(set(gc.entities), set(range(25)))
+        self.assertEqual(len(reports), 3)
+
+    def test_token_budget(self):
+        texts = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 400]
+        batches = list(token_budget_batches(texts, max_tokens=25, max_items=100))
+        self.assertEqual(batches, [texts[:2], texts[2:3], texts[3:]])
+
+    def test_retry_with_backoff(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("rate limited")
+            return 'ok'
+
+        result = retry_with_backoff(flaky, lambda exc: isinstance(exc, ConnectionError),
+                                    base_delay=0.001)
+        self.assertEqual(result, 'ok')
+        self.assertEqual(len(attempts), 3)
+
+        with self.assertRaises(ValueError):
+            retry_with_backoff(lambda: int('x'), lambda exc: False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.utils import instrumentation
+from gatecraft.utils.instrumentation import (
+    InMemoryInstrumentation, Instrumentation, get_instrumentation, instrumented,
+    set_instrumentation, span
+)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        set_instrumentation(None)
+
+    def test_noop_by_default(self):
+        self.assertIsNone(instrumentation._active)
+        self.assertIs(type(get_instrumentation()), Instrumentation)
+        with span('anything'):
+            pass
+        self.assertEqual(instrumented('double')(lambda x: 2 * x)(3), 6)
+
+    def test_histograms_and_counters(self):
+        sink = InMemoryInstrumentation()
+        set_instrumentation(sink)
+        traced = instrumented('work')(lambda: None)
+        for _ in range(3):
+            traced()
+        instrumentation.count('events', 2)
+
+        snapshot = sink.snapshot()
+        self.assertEqual(snapshot['spans']['work']['count'], 3)
+        self.assertEqual(snapshot['counters'], {'events': 2})
+        self.assertEqual(len(sink.traces), 0)
+
+    def test_debug_breakdown_of_an_access_check(self):
+        embedder = HashingEmbedder(dimension=32)
+        store = LocalVectorStore(32, embed_function=embedder.embed,
+                                 embedding_model=embedder.embedding_model)
+        gc = Gatecraft(vector_store=store)
+        role = gc.create_role(1, 'cats')
+        # Added to the role directly so the access index doesn't answer for it
+        role.add_condition(SemanticCondition('cat', threshold=0.5))
+        user = gc.create_user(1, 'alice')
+        gc.assign_role(user, role)
+        gc.add_entity(1, 'cat food')
+
+        sink = InMemoryInstrumentation(debug=True)
+        set_instrumentation(sink)
+        gc.is_access_allowed(user, 1)
+
+        trace = sink.traces[-1]
+        self.assertEqual(trace['name'], 'policy.is_access_allowed')
+        self.assertEqual([child['name'] for child in trace['children']], ['condition.evaluate'])
+        breakdown = sink.breakdown()
+        self.assertIn('semantic_db.get_embedding', breakdown)
+        self.assertAlmostEqual(sum(breakdown.values()), trace['seconds'])
+
+    def test_set_instrumentation_returns_previous(self):
+        sink = InMemoryInstrumentation()
+        self.assertIs(type(set_instrumentation(sink)), Instrumentation)
+        self.assertIs(set_instrumentation(None), sink)
+
+
+if __name__ == '__main__':
+    unittest.main()
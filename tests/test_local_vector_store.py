@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gatecraft.db.local_vector_store import LocalVectorStore
+
+
+class TestLocalVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(500, 16))
+
+    def brute_force(self, query, top_k):
+        normalized = self.vectors / np.linalg.norm(self.vectors, axis=1)[:, None]
+        scores = normalized @ (query / np.linalg.norm(query))
+        return [str(i) for i in np.argsort(-scores)[:top_k]]
+
+    def test_flat_query(self):
+        store = LocalVectorStore(dimension=16)
+        store.upsert_batch(list(enumerate(self.vectors)))
+        matches = store.query(self.vectors[7], top_k=5)
+
+        self.assertEqual([match['id'] for match in matches], self.brute_force(self.vectors[7], 5))
+        self.assertAlmostEqual(matches[0]['score'], 1.0, places=5)
+        self.assertEqual(store.describe_index_stats()['total_vector_count'], 500)
+
+    def test_upsert_overwrites_and_delete_keeps_rows_dense(self):
+        store = LocalVectorStore(dimension=16)
+        store.upsert_batch(list(enumerate(self.vectors[:3])))
+        store.upsert(0, self.vectors[2])
+        store.delete([1, 'missing'])
+
+        matches = store.query(self.vectors[2], top_k=3)
+        self.assertEqual(len(matches), 2)
+        self.assertAlmostEqual(matches[0]['score'], 1.0, places=5)
+        self.assertAlmostEqual(matches[1]['score'], 1.0, places=5)
+
+    def test_ivf_index(self):
+        store = LocalVectorStore(dimension=16, ann_threshold=100, n_probe=4)
+        store.upsert_batch(list(enumerate(self.vectors)))
+        matches = store.query(self.vectors[42], top_k=10)
+
+        self.assertEqual(store.describe_index_stats()['index_type'], 'ivf')
+        self.assertEqual(len(matches), 10)
+        self.assertEqual(matches[0]['id'], '42')
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'store')
+            store = LocalVectorStore(dimension=16, path=path)
+            store.upsert_batch(list(enumerate(self.vectors)))
+            store.close()
+
+            reopened = LocalVectorStore(dimension=16, path=path)
+            matches = reopened.query(self.vectors[3], top_k=3)
+            self.assertEqual([match['id'] for match in matches], self.brute_force(self.vectors[3], 3))
+
+            with self.assertRaises(ValueError):
+                LocalVectorStore(dimension=8, path=path)
+
+
+if __name__ == '__main__':
+    unittest.main()
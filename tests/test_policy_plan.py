@@ -0,0 +1,122 @@
+import unittest
+
+import numpy as np
+
+from gatecraft.core.entity import Entity
+from gatecraft.core.policy import AccessControlPolicy
+from gatecraft.core.role import Role
+from gatecraft.core.user import User
+from gatecraft.db.semantic_database import SemanticDatabase
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+from gatecraft.utils.semantic_condition import SemanticCondition
+
+
+class CountingVectorStore(VectorStoreInterface):
+
+    def __init__(self):
+        self.similarity_calls = 0
+
+    def embed(self, data):
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(data))
+        return np.random.default_rng(seed).normal(size=16)
+
+    def similarity(self, vector1, vector2):
+        self.similarity_calls += 1
+        return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+
+def reference_is_access_allowed(user, entity, database):
+    # The unplanned loop: any regular condition, or all inverse conditions, of a role
+    for role in user.get_roles():
+        regular = [c for c in role.get_conditions() if not c.inverse]
+        inverse = [c for c in role.get_conditions() if c.inverse]
+        if any(c.evaluate(user, entity, database) for c in regular):
+            return True
+        if inverse and all(c.evaluate(user, entity, database) for c in inverse):
+            return True
+    return False
+
+
+class BandCondition(SemanticCondition):
+    # Only holds within 0.1 above the threshold
+
+    def decide(self, similarity):
+        return self.threshold <= similarity < self.threshold + 0.1
+
+
+class AlwaysCondition(SemanticCondition):
+
+    def evaluate(self, user, entity, database):
+        return True
+
+
+class TestPolicyPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.vector_store = CountingVectorStore()
+        self.database = SemanticDatabase(self.vector_store)
+        self.policy = AccessControlPolicy(self.database)
+        self.entities = [Entity(i, f"document {i}") for i in range(100)]
+
+    def test_matches_unplanned_loop(self):
+        rng = np.random.default_rng(3)
+        for _ in range(5):
+            user = User(1, 'user')
+            for role_id in range(4):
+                role = Role(role_id, 'role')
+                for _ in range(rng.integers(0, 4)):
+                    role.add_condition(SemanticCondition(
+                        f"term {rng.integers(0, 4)}",
+                        threshold=float(rng.choice([0.0, 0.1, 0.2])),
+                        inverse=bool(rng.integers(0, 2))
+                    ))
+                user.add_role(role)
+            for entity in self.entities:
+                self.assertEqual(self.policy.is_access_allowed(user, entity),
+                                 reference_is_access_allowed(user, entity, self.database))
+
+    def test_shared_terms_are_compared_once(self):
+        user = User(1, 'user')
+        for role_id in range(10):
+            role = Role(role_id, 'role')
+            role.add_condition(SemanticCondition('cat', threshold=0.99))
+            role.add_condition(SemanticCondition('cat', threshold=0.95 - role_id / 100))
+            user.add_role(role)
+
+        self.vector_store.similarity_calls = 0
+        self.policy.is_access_allowed(user, self.entities[0])
+        self.assertEqual(self.vector_store.similarity_calls, 1)
+        self.assertEqual(len(self.policy.plan(user).roles), 10)
+
+    def test_semantic_subclasses_are_respected(self):
+        for condition in (BandCondition('cat', threshold=0.0), AlwaysCondition('cat', threshold=2.0)):
+            user = User(1, 'user')
+            role = Role(1, 'role')
+            role.add_condition(condition)
+            user.add_role(role)
+
+            expected = [condition.evaluate(user, entity, self.database) for entity in self.entities]
+            self.assertTrue(any(expected))
+            self.assertEqual([self.policy.is_access_allowed(user, entity) for entity in self.entities], expected)
+            self.assertEqual(self.policy.is_access_allowed_many(user, self.entities), expected)
+
+    def test_plan_is_cached_and_invalidated(self):
+        user = User(1, 'user')
+        role = Role(1, 'role')
+        role.add_condition(SemanticCondition('cat', threshold=2.0))
+        user.add_role(role)
+
+        plan = self.policy.plan(user)
+        self.assertIs(self.policy.plan(user), plan)
+        self.assertFalse(self.policy.is_access_allowed(user, self.entities[0]))
+
+        role.add_condition(SemanticCondition('cat', threshold=-2.0))
+        self.assertIsNot(self.policy.plan(user), plan)
+        self.assertTrue(self.policy.is_access_allowed(user, self.entities[0]))
+
+        user.remove_role(role)
+        self.assertFalse(self.policy.is_access_allowed(user, self.entities[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
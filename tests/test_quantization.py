@@ -0,0 +1,107 @@
+import unittest
+
+import numpy as np
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.db.embedding_cache import EmbeddingCache
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.db.quantization import quantize, threshold_flip_report
+from gatecraft.db.similarity import similarity
+
+
+def cosine(vector1, vector2):
+    return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+
+class TestQuantization(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(50, 256))
+
+    def test_int8_uses_per_vector_scale(self):
+        codes = quantize(self.vectors[0] * 1000, 'int8')
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(int(np.max(np.abs(codes))), 127)
+        np.testing.assert_array_equal(codes, quantize(self.vectors[0], 'int8'))
+        self.assertEqual(quantize(np.zeros(4), 'int8').tolist(), [0, 0, 0, 0])
+        with self.assertRaises(ValueError):
+            quantize(self.vectors[0], 'int4')
+
+    def test_similarity_on_quantized_vectors(self):
+        a, b = self.vectors[0], self.vectors[1]
+        for mode, tolerance in (('float16', 1e-3), ('int8', 2e-2)):
+            self.assertAlmostEqual(similarity(quantize(a, mode), quantize(b, mode)), cosine(a, b),
+                                   delta=tolerance)
+        # int8 codes must not overflow when multiplied
+        codes = quantize(a, 'int8')
+        self.assertAlmostEqual(similarity(codes, codes), 1.0)
+
+    def test_flip_report(self):
+        condition = SemanticCondition('term', threshold=0.0)
+        condition.term_embedding = self.vectors[0]
+        report = threshold_flip_report([condition], list(self.vectors[1:]), 'int8')
+        self.assertEqual(report['pairs'], 49)
+        self.assertLessEqual(report['flips'], report['flips_within_margin'][0.05])
+        self.assertGreater(report['max_error'], 0)
+
+        exact = threshold_flip_report([condition], list(self.vectors[1:]), None)
+        self.assertEqual((exact['flips'], exact['max_error']), (0, 0.0))
+
+
+class TestQuantizedCache(unittest.TestCase):
+
+    def make_gatecraft(self, quantization):
+        embedder = HashingEmbedder(dimension=64)
+        store = LocalVectorStore(embedding_provider=embedder)
+        gc = Gatecraft(vector_store=store, embedding_cache=EmbeddingCache(quantization=quantization),
+                       similarity_threshold=0.0)
+        role = gc.create_role(1, 'cats', SemanticCondition('cat', threshold=0.3))
+        gc.add_condition_to_role(role, SemanticCondition('dog', threshold=0.6, inverse=True))
+        user = gc.create_user(1, 'alice')
+        gc.assign_role(user, role)
+        texts = ['cat food', 'dog leash', 'cat and dog', 'bird seed', 'catalog']
+        gc.add_entities(enumerate(texts))
+        return gc, user
+
+    def test_cache_stores_quantized_vectors(self):
+        gc, _ = self.make_gatecraft('int8')
+        self.assertEqual(gc.semantic_db.get_embedding('cat food').dtype, np.int8)
+        gc, _ = self.make_gatecraft('float16')
+        self.assertEqual(gc.semantic_db.get_embedding('cat food').dtype, np.float16)
+
+    def test_vector_store_gets_full_precision_vectors(self):
+        gc, _ = self.make_gatecraft('int8')
+        upserted, queried = [], []
+        store = gc.vector_store
+        store.upsert = lambda id, vector, *args, upsert=store.upsert: (
+            upserted.append(vector) or upsert(id, vector, *args))
+        store.query = lambda vector, top_k, query=store.query, **options: (
+            queried.append(vector) or query(vector, top_k, **options))
+
+        gc.add_entity(10, 'cat food')
+        gc.retrieve_entities('cat food', top_k=1)
+        self.assertEqual(upserted[0].dtype, np.float64)
+        self.assertEqual(queried[0].dtype, np.float64)
+        self.assertAlmostEqual(float(np.linalg.norm(upserted[0])), 1.0)
+        # The policy still works on the quantized copy
+        self.assertEqual(gc.semantic_db.get_embedding('cat food').dtype, np.int8)
+        stored = gc.semantic_db.fetch_embeddings(['entity_0'])['entity_0']
+        self.assertEqual(stored.dtype.kind, 'f')
+
+    def test_policy_paths_agree_on_quantized_data(self):
+        gc, user = self.make_gatecraft('int8')
+        ids = list(gc.entities)
+        single = [gc.policy.plan(user).evaluate(user, gc.entities[i], gc.policy) for i in ids]
+        self.assertEqual(gc.is_access_allowed_many(user, ids), single)
+
+    def test_report_reembeds_when_cache_is_quantized(self):
+        gc, _ = self.make_gatecraft('int8')
+        report = gc.quantization_report('int8')
+        self.assertEqual(report['pairs'], 10)
+        self.assertGreater(report['max_error'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
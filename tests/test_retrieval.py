@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class BruteForceVectorStore(VectorStoreInterface):
+
+    def __init__(self):
+        self.vectors = {}
+        self.queries = []
+
+    def embed(self, data):
+        # One dimension per topic word, so similarity is easy to reason about
+        topics = ['cat', 'dog', 'bird']
+        vector = np.array([1.0 if topic in data else 0.0 for topic in topics] + [0.1])
+        return vector
+
+    def similarity(self, vector1, vector2):
+        return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+    def upsert(self, id, vector):
+        self.vectors[id] = vector
+
+    def query(self, vector, top_k=1):
+        self.queries.append(top_k)
+        scored = [{'id': id, 'score': self.similarity(vector, v)} for id, v in self.vectors.items()]
+        scored.sort(key=lambda match: -match['score'])
+        return scored[:top_k]
+
+
+class TestRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        self.vector_store = BruteForceVectorStore()
+        self.gc = Gatecraft(vector_store=self.vector_store, similarity_threshold=0.0)
+        self.user = self.gc.create_user(1, 'Bob')
+        role = self.gc.create_role(1, 'No cats')
+        self.gc.add_condition_to_role(role, SemanticCondition('cat', threshold=0.5, inverse=True))
+        self.gc.assign_role(self.user, role)
+
+        for i in range(20):
+            self.gc.add_entity(i, f"cat story {i}")
+        for i in range(20, 23):
+            self.gc.add_entity(i, f"dog and cat story {i}")
+        self.gc.add_entity(23, "bird story")
+
+    def test_skips_denied_top_matches(self):
+        self.assertLess(self.gc.retrieve_entities('cat', top_k=1)[0].entity_id, 23)
+        self.vector_store.queries.clear()
+
+        entities = self.gc.retrieve_accessible_entities(self.user, 'cat', top_k=1)
+        self.assertEqual([entity.entity_id for entity in entities], [23])
+        self.assertEqual(self.vector_store.queries, [4, 16, 64])
+
+    def test_round_trips_are_bounded(self):
+        entities = self.gc.retrieve_accessible_entities(self.user, 'cat', top_k=1, max_rounds=2)
+        self.assertEqual(entities, [])
+        self.assertEqual(len(self.vector_store.queries), 2)
+
+    def test_stops_when_store_is_exhausted(self):
+        entities = self.gc.retrieve_accessible_entities(self.user, 'cat', top_k=5, max_rounds=10)
+        self.assertEqual([entity.entity_id for entity in entities], [23])
+        self.assertGreater(self.vector_store.queries[-1], len(self.vector_store.vectors))
+
+    def test_iter_retrieve_yields_accessible_entities_in_rank_order(self):
+        self.gc.add_entity(24, "bird and dog story")
+        results = list(self.gc.iter_retrieve(self.user, 'bird', page_size=4))
+        self.assertEqual([entity.entity_id for entity, _ in results], [23, 24])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_iter_retrieve_is_lazy(self):
+        results = self.gc.iter_retrieve(self.user, 'cat', page_size=4)
+        self.assertEqual(self.vector_store.queries, [])
+
+        entity, _ = next(results)
+        self.assertEqual(entity.entity_id, 23)
+        self.assertEqual(self.vector_store.queries, [4, 8, 16, 32])
+        results.close()
+        self.assertEqual(len(self.vector_store.queries), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from gatecraft import Gatecraft
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.db.pinecone_vector_store import PineconeVectorStore
+from gatecraft.db.sharded_vector_store import ShardedVectorStore
+
+
+class RecordingIndex:
+
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, **kwargs):
+        self.calls.append(('upsert', kwargs['namespace']))
+
+    def query(self, **kwargs):
+        self.calls.append(('query', kwargs['namespace']))
+        return type('Response', (), {'matches': []})()
+
+    def describe_index_stats(self):
+        return {'dimension': 8, 'namespaces': {'': {'vector_count': 1}, 'acme': {'vector_count': 2},
+                                               'globex': {'vector_count': 3}}}
+
+
+class TestShardedVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.embedder = HashingEmbedder(dimension=32)
+        self.base = LocalVectorStore(embedding_provider=self.embedder)
+        self.gc = Gatecraft(vector_store=ShardedVectorStore(self.base), similarity_threshold=-1.0)
+        self.gc.add_entities([('a1', 'cat food'), ('a2', 'dog leash')], tenant='acme')
+        self.gc.add_entities([('g1', 'cat food'), ('g2', 'bird seed')], tenant='globex')
+        self.gc.add_entity('shared', 'cat toy')
+
+    def test_queries_touch_only_the_tenant_shard(self):
+        queried = []
+        for tenant, shard in self.gc.vector_store.shards.items():
+            original = shard.query
+            shard.query = lambda vector, top_k, original=original, tenant=tenant: (
+                queried.append(tenant) or original(vector, top_k))
+
+        entities = self.gc.retrieve_entities('cat food', top_k=5, tenants=['acme'])
+        self.assertEqual([entity.entity_id for entity in entities], ['a1', 'a2'])
+        self.assertEqual(queried, ['acme'])
+
+    def test_fan_out_merges_top_k(self):
+        entities = self.gc.retrieve_entities('cat food', top_k=3, tenants=['acme', 'globex'])
+        self.assertEqual({entity.entity_id for entity in entities[:2]}, {'a1', 'g1'})
+        self.assertEqual(len(entities), 3)
+
+        everything = self.gc.retrieve_entities('cat food', top_k=10)
+        self.assertEqual(len(everything), 5)
+
+    def test_per_shard_stats(self):
+        stats = self.gc.vector_store.describe_index_stats()
+        self.assertEqual(stats['total_vector_count'], 5)
+        self.assertEqual(stats['shards']['acme']['total_vector_count'], 2)
+        self.assertEqual(stats['shards'][None]['total_vector_count'], 1)
+
+    def test_delete_without_tenant_only_touches_the_default_shard(self):
+        deleted = []
+        for tenant, shard in self.gc.vector_store.shards.items():
+            original = shard.delete
+            shard.delete = lambda ids, original=original, tenant=tenant: deleted.append(tenant) or original(ids)
+
+        self.gc.delete_entities(['shared', 'a1'])
+        self.assertEqual(sorted(deleted, key=str), [None, 'acme'])
+        self.assertEqual(self.gc.vector_store.describe_index_stats()['total_vector_count'], 3)
+
+    def test_aclose_closes_namespace_views(self):
+        closed = []
+        for tenant, shard in self.gc.vector_store.shards.items():
+            original = shard.aclose
+            shard.aclose = lambda original=original, tenant=tenant: closed.append(tenant) or original()
+
+        asyncio.run(self.gc.vector_store.aclose())
+        self.assertEqual(sorted(closed, key=str), [None, 'acme', 'globex'])
+
+    def test_moving_an_entity_to_another_tenant(self):
+        self.gc.add_entity('a1', 'cat food', tenant='globex')
+        stats = self.gc.vector_store.describe_index_stats()['shards']
+        self.assertEqual(stats['acme']['total_vector_count'], 1)
+        self.assertEqual(stats['globex']['total_vector_count'], 3)
+
+    def test_shards_are_discovered_after_a_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            base = LocalVectorStore(embedding_provider=self.embedder, path=directory)
+            store = ShardedVectorStore(base)
+            store.upsert('a', self.embedder.embed('cat food'), tenant='acme')
+            store.upsert('b', self.embedder.embed('cat toy'))
+            base.flush()
+
+            reopened = ShardedVectorStore(LocalVectorStore(embedding_provider=self.embedder, path=directory))
+            matches = reopened.query(self.embedder.embed('cat food'), top_k=5)
+            stats = reopened.describe_index_stats()
+
+        self.assertEqual({match['id'] for match in matches}, {'a', 'b'})
+        self.assertEqual(stats['total_vector_count'], 2)
+        self.assertEqual(stats['shards']['acme']['total_vector_count'], 1)
+
+    def test_hash_sharding_is_stable(self):
+        stores = [LocalVectorStore(embedding_provider=self.embedder) for _ in range(3)]
+        first = ShardedVectorStore(stores)
+        second = ShardedVectorStore(stores)
+        for tenant in ('acme', 'globex', 'initech', 7):
+            self.assertIs(first.shard_for(tenant), second.shard_for(tenant))
+        self.assertGreater(len({id(store) for store in stores if store._namespaces}), 1)
+
+    def test_tenants_need_a_sharded_store(self):
+        gc = Gatecraft(vector_store=LocalVectorStore(embedding_provider=self.embedder))
+        with self.assertRaises(ValueError):
+            gc.add_entity(1, 'cat', tenant='acme')
+
+    def test_snapshot_keeps_tenants(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.gcsnap')
+            self.gc.save(path)
+            store = ShardedVectorStore(LocalVectorStore(embedding_provider=self.embedder))
+            restored = Gatecraft.load(path, vector_store=store, upsert_vectors=True, similarity_threshold=-1.0)
+        entities = restored.retrieve_entities('cat food', top_k=5, tenants=['globex'])
+        self.assertEqual([entity.entity_id for entity in entities], ['g1', 'g2'])
+
+
+class TestPineconeNamespaces(unittest.TestCase):
+
+    def test_views_write_to_their_namespace(self):
+        store = PineconeVectorStore('key', 'us-east-1', 'index', embedding_provider=HashingEmbedder(8))
+        view = store.for_namespace('acme')
+        self.assertIs(store.for_namespace(None), store)
+        self.assertIs(view.embedding_provider, store.embedding_provider)
+
+        view._index = RecordingIndex()
+        view.upsert('entity_1', HashingEmbedder(8).embed('cat'))
+        view.query(HashingEmbedder(8).embed('cat'), top_k=1)
+        self.assertEqual(view._index.calls, [('upsert', 'acme'), ('query', 'acme')])
+        self.assertIsNone(store._index)
+
+    def test_namespaces_come_from_index_stats(self):
+        store = PineconeVectorStore('key', 'us-east-1', 'index', embedding_provider=HashingEmbedder(8))
+        store._index = RecordingIndex()
+        self.assertEqual(store.namespaces(), ['acme', 'globex'])
+
+
+if __name__ == '__main__':
+    unittest.main()
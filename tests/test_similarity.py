@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from gatecraft.db.mock_vector_store import MockVectorStore
+from gatecraft.db.similarity import is_unit, normalize, normalize_rows, similarity, similarity_many
+
+
+def cosine(vector1, vector2):
+    return np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+
+
+class TestSimilarityKernel(unittest.TestCase):
+
+    def setUp(self):
+        self.vectors = np.random.default_rng(0).normal(size=(20, 32))
+
+    def test_normalize_tags_unit_vectors(self):
+        unit = normalize(self.vectors[0])
+        self.assertTrue(is_unit(unit))
+        self.assertAlmostEqual(float(np.linalg.norm(unit)), 1.0)
+        self.assertFalse(unit.flags.writeable)
+        # Derived arrays are not unit-norm by construction and aren't tagged
+        self.assertFalse(is_unit(unit * 2))
+        self.assertFalse(is_unit(unit.astype(np.float32)))
+        self.assertFalse(is_unit(self.vectors[0]))
+
+        zero = normalize(np.zeros(4))
+        self.assertFalse(is_unit(zero))
+        self.assertEqual(similarity(zero, normalize(self.vectors[0][:4])), 0.0)
+
+    def test_tagged_and_untagged_vectors_agree(self):
+        a, b = self.vectors[0], self.vectors[1]
+        expected = cosine(a, b)
+        self.assertAlmostEqual(similarity(a, b), expected)
+        self.assertAlmostEqual(similarity(normalize(a), normalize(b)), expected)
+        self.assertAlmostEqual(similarity(normalize(a), b * 3), expected)
+
+    def test_similarity_many(self):
+        query = self.vectors[0]
+        expected = [cosine(query, row) for row in self.vectors]
+        np.testing.assert_allclose(similarity_many(query, self.vectors), expected)
+        np.testing.assert_allclose(similarity_many(normalize(query), normalize_rows(self.vectors)), expected)
+        matrix = self.vectors.copy()
+        matrix[3] = 0
+        self.assertEqual(similarity_many(query, matrix)[3], 0.0)
+
+    def test_backends_share_the_kernel(self):
+        store = MockVectorStore()
+        a, b = store.embed('cat'), store.embed('cot')
+        self.assertEqual(store.similarity(a, b), similarity(a, b))
+        self.assertEqual(store.similarity(store.embed(''), a), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
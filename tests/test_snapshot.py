@@ -0,0 +1,140 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gatecraft import Gatecraft, SemanticCondition
+from gatecraft.db.hashing_embedder import HashingEmbedder
+from gatecraft.db.embedding_cache import EmbeddingCache
+from gatecraft.db.local_vector_store import LocalVectorStore
+from gatecraft.db.vector_store_interface import VectorStoreInterface
+
+
+class CountingEmbedder(HashingEmbedder):
+
+    def __init__(self, dimension=32):
+        super().__init__(dimension=dimension)
+        self.calls = 0
+
+    def embed(self, data):
+        self.calls += 1
+        return super().embed(data)
+
+    def embed_batch(self, data_list):
+        self.calls += len(data_list)
+        return super().embed_batch(data_list)
+
+
+def local_store(embedder):
+    store = LocalVectorStore(32, embed_function=embedder.embed,
+                             embedding_model=embedder.embedding_model)
+    store.embed_batch = embedder.embed_batch
+    return store
+
+
+class WriteOnlyStore(VectorStoreInterface):
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.embedding_model = embedder.embedding_model
+
+    def embed(self, data):
+        return self.embedder.embed(data)
+
+    def upsert(self, id, vector, metadata=None):
+        pass
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'state.gcsnap')
+
+        self.gc = Gatecraft(vector_store=local_store(CountingEmbedder()), similarity_threshold=0.0)
+        shared = SemanticCondition('cat', threshold=0.3)
+        self.cats = self.gc.create_role(1, 'cats', shared)
+        self.no_dogs = self.gc.create_role('no-dogs', 'no dogs', SemanticCondition('dog', threshold=0.3, inverse=True))
+        self.gc.add_condition_to_role(self.no_dogs, shared)
+        alice = self.gc.create_user(1, 'alice')
+        bob = self.gc.create_user('bob', 'bob')
+        self.gc.assign_role(alice, self.cats)
+        self.gc.assign_role(bob, self.no_dogs)
+        self.gc.add_entities([(1, 'cat food'), (2, 'dog leash'), ('three', 'bird seed')])
+        entity = self.gc.entities[1]
+        entity.metadata = {'owner': 'alice'}
+        self.gc.entities[1] = entity
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_without_embedding_calls(self):
+        self.gc.save(self.path)
+
+        embedder = CountingEmbedder()
+        restored = Gatecraft.load(self.path, vector_store=local_store(embedder),
+                                  upsert_vectors=True, similarity_threshold=0.0)
+
+        self.assertEqual(set(restored.users), {1, 'bob'})
+        self.assertEqual(set(restored.roles), {1, 'no-dogs'})
+        self.assertEqual(restored.entities[1].metadata, {'owner': 'alice'})
+        self.assertEqual(restored.entities['three'].data, 'bird seed')
+        # The shared condition object stays shared
+        self.assertIs(restored.roles[1].conditions[0], restored.roles['no-dogs'].conditions[1])
+
+        for user_id in (1, 'bob'):
+            for entity_id in (1, 2, 'three'):
+                self.assertEqual(
+                    restored.is_access_allowed(restored.users[user_id], entity_id),
+                    self.gc.is_access_allowed(self.gc.users[user_id], entity_id)
+                )
+        self.assertEqual([e.entity_id for e in restored.retrieve_entities('food for a cat', top_k=1)], [1])
+        self.assertEqual(embedder.calls, 1)  # only the query
+
+        vector = restored.semantic_db.get_embedding('dog leash')
+        self.assertIsInstance(vector, np.memmap)
+        self.assertEqual(vector.dtype, np.float32)
+
+    def test_new_entities_are_indexed_after_load(self):
+        self.gc.save(self.path)
+        restored = Gatecraft.load(self.path, vector_store=local_store(CountingEmbedder()))
+        restored.add_entity(4, 'cat toy')
+        self.assertEqual(restored.is_access_allowed(restored.users[1], 4),
+                         restored.policy.plan(restored.users[1]).evaluate(
+                             restored.users[1], restored.entities[4], restored.policy))
+        self.assertTrue(restored.policy.access_index.is_known(('semantic', 'cat', 0.3, False), 4))
+
+    def test_evicted_embeddings_are_read_from_the_vector_store(self):
+        embedder = CountingEmbedder()
+        gc = Gatecraft(vector_store=local_store(embedder), embedding_cache=EmbeddingCache(max_entries=2))
+        gc.add_entities([(i, f"document {i}") for i in range(10)])
+        calls = embedder.calls
+        gc.save(self.path)
+        self.assertEqual(embedder.calls, calls)
+
+        restored = Gatecraft.load(self.path, vector_store=local_store(CountingEmbedder()))
+        np.testing.assert_allclose(restored.semantic_db.get_embedding('document 0'),
+                                   gc.vector_store.fetch(['entity_0'])['entity_0'], rtol=1e-6)
+
+    def test_missing_embeddings_fail_unless_reembedding(self):
+        embedder = CountingEmbedder()
+        gc = Gatecraft(vector_store=WriteOnlyStore(embedder), embedding_cache=EmbeddingCache(max_entries=2))
+        gc.add_entities([(i, f"document {i}") for i in range(5)])
+        with self.assertRaises(ValueError):
+            gc.save(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+        gc.save(self.path, reembed=True)
+        self.assertEqual(len(Gatecraft.load(self.path, vector_store=WriteOnlyStore(embedder)).entities), 5)
+
+    def test_rejects_other_embedding_models(self):
+        self.gc.save(self.path)
+        other = HashingEmbedder(dimension=32, seed=1)
+        store = LocalVectorStore(32, embed_function=other.embed, embedding_model=other.embedding_model)
+        with self.assertRaises(ValueError):
+            Gatecraft.load(self.path, vector_store=store)
+
+
+if __name__ == '__main__':
+    unittest.main()
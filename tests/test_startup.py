@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_backends_are_imported_lazily(self):
+        snippet = (
+            "import sys\n"
+            "from gatecraft import Gatecraft\n"
+            "from gatecraft.db.pinecone_vector_store import PineconeVectorStore\n"
+            "from gatecraft.db.local_vector_store import LocalVectorStore\n"
+            "Gatecraft(vector_store=LocalVectorStore(dimension=8))\n"
+            "PineconeVectorStore('key', 'us-east-1', 'index')\n"
+            "print(','.join(m for m in ('openai', 'pinecone', 'dotenv', 'aiohttp') if m in sys.modules))\n"
+        )
+        output = subprocess.run([sys.executable, '-c', snippet], check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), '')
+
+    def test_openai_key_is_read_from_dotenv_on_first_use(self):
+        snippet = (
+            "from gatecraft import Gatecraft\n"
+            "from gatecraft.db.pinecone_vector_store import PineconeVectorStore\n"
+            "gc = Gatecraft(vector_store=PineconeVectorStore('key', 'us-east-1', 'index'))\n"
+            "print(gc.semantic_db.embedding_provider._openai().api_key)\n"
+        )
+        env = {name: value for name, value in os.environ.items() if name != 'OPENAI_API_KEY'}
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '.env'), 'w') as f:
+                f.write('OPENAI_API_KEY=sk-from-dotenv\n')
+            output = subprocess.run([sys.executable, '-c', snippet], check=True, capture_output=True,
+                                    text=True, cwd=directory, env=env).stdout
+        self.assertEqual(output.strip(), 'sk-from-dotenv')
+
+
+if __name__ == '__main__':
+    unittest.main()